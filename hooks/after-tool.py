@@ -6,98 +6,77 @@ Wraps the chain-tracking logic for Gemini CLI.
 
 import sys
 import os
-import json
-from datetime import datetime
-from pathlib import Path
+
+# Everything else is imported where it is used, so calls for other tools exit
+# before json or the shared lib are loaded.
 
 # Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
-SHARED_LIB = Path(__file__).resolve().parent / "lib"
-sys.path.insert(0, str(SHARED_LIB))
+SHARED_LIB = os.path.join(os.path.dirname(os.path.realpath(__file__)), "lib")
+sys.path.insert(0, SHARED_LIB)
 
-def _project_root() -> Path:
+def _project_root() -> str:
     # hooks/after-tool.py -> hooks -> project_root
-    return Path(__file__).resolve().parents[1]
+    return os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
 # Default workspace root to extension root, without overriding user config
-os.environ.setdefault("MCP_WORKSPACE", str(_project_root()))
+os.environ.setdefault("MCP_WORKSPACE", _project_root())
 
-from session_state import (
-    load_session_state,
-    save_session_state,
-    parse_prompt_engine_response,
-)
+from gemini_lib import trace
+from gemini_lib.runner import run_hook
 
 
-def _log_debug(message: str) -> None:
+def _log_debug(message: str, sampled: bool = False) -> None:
     if os.getenv('GEMINI_HOOK_DEBUG', '').lower() not in {'1', 'true', 'yes'}:
         return
-    root = _project_root()
-    log_dir = root / '.gemini'
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / 'hook-debug.log'
-    ts = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-    try:
-        with open(log_file, 'a') as f:
-            f.write(f"[{ts}] AfterTool: {message}\n")
-    except Exception:
-        pass
-
-
-def parse_hook_input() -> dict:
-    try:
-        raw = sys.stdin.read()
-        preview = (raw or '')[:200].replace('\n', ' ')
-        _log_debug(f"received input: {preview}...")
-        return json.loads(raw or '{}')
-    except json.JSONDecodeError:
+    from gemini_lib import debug_log
+
+    debug_log.log("AfterTool", message, sampled)
+
+
+def parse_hook_input(raw: str):
+    from gemini_lib.event import decode
+
+    preview = (raw or '')[:200].replace('\n', ' ')
+    _log_debug(f"received input: {preview}...", sampled=True)
+    event = decode(raw)
+    if not event.valid:
         _log_debug("invalid JSON input")
-        return {}
-
-def main():
-    hook_input = parse_hook_input()
-
-    # Gemini Input Mapping
-    tool_name = (
-        hook_input.get("tool_name", "") or 
-        hook_input.get("toolName", "") or
-        hook_input.get("name", "")
-    )
-    session_id = (
-        hook_input.get("session_id", "") or
-        hook_input.get("sessionId", "")
-    )
-
-    if "prompt_engine" not in tool_name:
-        sys.exit(0)
-
-    tool_response = (
-        hook_input.get("tool_response", {}) or
-        hook_input.get("toolResponse", {}) or
-        hook_input.get("result", {})
-    )
+    return event
+
+def has_work(raw: str) -> bool:
+    """Pre-parse test: only prompt_engine calls are tracked."""
+    return "prompt_engine" in raw
+
+
+def handle(raw: str) -> dict | None:
+    with trace.span("parse"):
+        event = parse_hook_input(raw)
+
+    session_id = event.session_id
+    trace.note(session=session_id)
+
+    if "prompt_engine" not in event.tool_name:
+        return None
+
+    tool_response = event.tool_response
 
     # Extract tool_input for chain_id (matches Claude's post-prompt-engine.py)
-    tool_input = (
-        hook_input.get("tool_input", {}) or
-        hook_input.get("toolInput", {}) or
-        {}
-    )
-
-    # Parse content
-    if isinstance(tool_response, dict):
-        content = tool_response.get("content", "")
-        if isinstance(content, list):
-            content = " ".join(
-                block.get("text", "") if isinstance(block, dict) else str(block)
-                for block in content
-            )
-    else:
-        content = str(tool_response)
-
-    state = parse_prompt_engine_response(content)
+    tool_input = event.tool_input
+
+    from gemini_lib import next_step, state_store
+    from gemini_lib.response_state import parse_response
+
+    # Structured metadata when the server sends it, else a block-by-block scan
+    with trace.span("response_parse"):
+        state = parse_response(tool_response)
 
     if not state:
-        sys.exit(0)
+        # No step or gate left: the chain's last step has completed
+        if isinstance(tool_input, dict) and tool_input.get("chain_id"):
+            from gemini_lib import timeline
+
+            timeline.record(session_id, "end", c=tool_input["chain_id"])
+        return None
 
     # Extract chain_id from tool_input (higher priority than regex parsing)
     if isinstance(tool_input, dict):
@@ -105,7 +84,16 @@ def main():
         if input_chain_id:
             state["chain_id"] = input_chain_id
 
-    save_session_state(session_id, state)
+    # Resolve the step after this one now, so the continuation call is ready
+    with trace.span("state_save"):
+        state = state_store.update(
+            session_id, lambda previous: next_step.resolve(state, previous, tool_input)
+        )
+
+    from gemini_lib import timeline
+
+    with trace.span("timeline"):
+        timeline.record_step(session_id, state)
 
     output_lines = []
     if state.get("pending_gate"):
@@ -121,6 +109,13 @@ def main():
         total = state["total_steps"]
         if step < total:
             output_lines.append(f"[Chain] Step {step}/{total} - call prompt_engine to continue")
+            output_lines.extend(next_step.describe(state.get("next_step") or {}))
+
+    # Dropped when this state was already injected (gemini_lib.context_ledger)
+    from gemini_lib.context_ledger import admit
+
+    with trace.span("context_admit"):
+        output_lines = admit(session_id, "after-tool", [("state", output_lines)], state)
 
     if output_lines:
         final_output = "\n".join(output_lines)
@@ -132,10 +127,9 @@ def main():
             }
         }
         _log_debug(f"emitting additionalContext length={len(final_output)}")
-        print(json.dumps(out))
-        sys.exit(0)
-    
-    sys.exit(0)
+        return out
+
+    return None
 
 if __name__ == "__main__":
-    main()
+    run_hook("after-tool", handle, precheck=has_work)
@@ -6,152 +6,267 @@ Wraps the core prompt-suggestion logic for Gemini CLI.
 
 import sys
 import os
-import json
-from datetime import datetime
-from pathlib import Path
+
+# Everything else is imported where it is used, so a turn with nothing to do
+# exits before json, re or the shared lib are loaded.
 
 # Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
-SHARED_LIB = Path(__file__).resolve().parent / "lib"
-sys.path.insert(0, str(SHARED_LIB))
+SHARED_LIB = os.path.join(os.path.dirname(os.path.realpath(__file__)), "lib")
+sys.path.insert(0, SHARED_LIB)
 
-def _project_root() -> Path:
+def _project_root() -> str:
     # hooks/before-agent.py -> hooks -> project_root
-    return Path(__file__).resolve().parents[1]
+    return os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
 # Default workspace root to extension root, without overriding user config
-os.environ.setdefault("MCP_WORKSPACE", str(_project_root()))
+os.environ.setdefault("MCP_WORKSPACE", _project_root())
 
-from cache_manager import (
-    load_prompts_cache,
-    get_prompt_by_id,
-    match_prompts_to_intent,
-    get_chains_only,
-)
-from session_state import load_session_state, format_chain_reminder
+from gemini_lib import trace
+from gemini_lib.runner import run_hook
 
 # Duplicate logic from prompt-suggest.py but adapted for Gemini I/O
 # This ensures we don't break Claude if we change one or the other.
 
 
-def _log_debug(message: str) -> None:
+def _log_debug(message: str, sampled: bool = False) -> None:
     if os.getenv('GEMINI_HOOK_DEBUG', '').lower() not in {'1', 'true', 'yes'}:
         return
-    root = _project_root()
-    log_dir = root / '.gemini'
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / 'hook-debug.log'
-    ts = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-    try:
-        with open(log_file, 'a') as f:
-            f.write(f"[{ts}] BeforeAgent: {message}\n")
-    except Exception:
-        pass
-
-
-def parse_hook_input() -> dict:
-    try:
-        raw = sys.stdin.read()
-        preview = (raw or '')[:200].replace('\n', ' ')
-        _log_debug(f"received input: {preview}...")
-        return json.loads(raw or '{}')
-    except json.JSONDecodeError:
+    from gemini_lib import debug_log
+
+    debug_log.log("BeforeAgent", message, sampled)
+
+
+def parse_hook_input(raw: str):
+    from gemini_lib.event import decode
+
+    preview = (raw or '')[:200].replace('\n', ' ')
+    _log_debug(f"received input: {preview}...", sampled=True)
+    event = decode(raw)
+    if not event.valid:
         _log_debug("invalid JSON input")
-        return {}
+    return event
 
-def detect_prompt_invocation(message: str) -> str | None:
-    import re
-    match = re.match(r'^>>\s*([a-zA-Z0-9_-]+)', message.strip())
-    if match:
-        return match.group(1)
-    return None
+def format_suggestions(prompt_id: str, message: str) -> list[str]:
+    """Did-you-mean ids for a typo, else prompts related to the message text."""
+    from gemini_lib.prompt_index import get_index
 
-def detect_chain_syntax(message: str) -> list[str]:
-    import re
-    chain_pattern = r'>>\s*([a-zA-Z0-9_-]+)\s*(?:-->|→)'
-    matches = re.findall(chain_pattern, message)
-    final_match = re.search(r'(?:-->|→)\s*>>\s*([a-zA-Z0-9_-]+)\s*$', message)
-    if final_match:
-        matches.append(final_match.group(1))
-    return matches
-
-def detect_inline_gates(message: str) -> list[str]:
-    import re
-    quoted_pattern = r'::\s*[\'"]([^\'"]+)[\'"]'
-    id_pattern = r'::\s*([a-zA-Z][a-zA-Z0-9_-]*)\b'
-    quoted = re.findall(quoted_pattern, message)
-    ids = re.findall(id_pattern, message)
-    return quoted + ids
-
-def format_tool_call(prompt_id: str, info: dict) -> str:
-    args = info.get("arguments", [])
-    if not args:
-        return f'prompt_engine(command:">>{prompt_id}")'
-    
-    options_parts = []
-    for arg in args:
-        name = arg.get("name", "")
-        default = arg.get("default")
-        placeholder = f'"{default}"' if default else f'"<{name}>"'
-        options_parts.append(f'"{name}": {placeholder}')
-    
-    options_str = ", ".join(options_parts)
-    return f'prompt_engine(command:">>{prompt_id}", options:{{{options_str}}})'
-
-def main():
-    hook_input = parse_hook_input()
-    
-    # Gemini BeforeAgent Input: { "prompt": "..." }
-    user_message = (
-        hook_input.get("prompt", "") or 
-        hook_input.get("message", "") or
-        hook_input.get("userMessage", "") or
-        hook_input.get("input", "")
+    index = get_index()
+    if index is None:
+        return []
+    similar = index.suggest_ids(prompt_id)
+    if similar:
+        return ["  Did you mean: " + ", ".join(f">>{s}" for s in similar)]
+    related = index.match_intent(message)
+    if related:
+        return ["  Related: " + ", ".join(f">>{p} ({c or 'unknown'})" for p, c in related)]
+    return []
+
+def format_invocation(invoked_prompt: str | None, prompt_info: dict | None, chain_prompts: list[str],
+                      unknown_steps: dict[str, str | None] | None = None) -> list[str]:
+    """
+    [MCP] line and tool call for a found prompt, then the [MCP Chain] block.
+
+    With unknown steps the chain call is replaced by the unknown ids, and by
+    a corrected call when every one of them has a suggestion.
+    """
+    lines = []
+    if invoked_prompt and prompt_info:
+        from gemini_lib.next_step import format_tool_call
+
+        chain_tag = f" [Chain: {prompt_info.get('chain_steps', 0)} steps]" if prompt_info.get("is_chain") else ""
+        lines.append(f"[MCP] >>{invoked_prompt} ({prompt_info.get('category', 'unknown')}){chain_tag}")
+        lines.append(f"  {format_tool_call(invoked_prompt, prompt_info)}")
+    if chain_prompts and len(chain_prompts) > 1:
+        lines.append(f"[MCP Chain] {len(chain_prompts)} steps")
+        if unknown_steps:
+            from gemini_lib.validate import format_unknown
+
+            lines.extend(format_unknown("step", ">>", unknown_steps))
+            if not all(unknown_steps.values()):
+                return lines
+            chain_prompts = [unknown_steps.get(p) or p for p in chain_prompts]
+        full_chain = ' --> '.join([f'>>{p}' for p in chain_prompts])
+        label = "Corrected: " if unknown_steps else ""
+        lines.append(f'  {label}prompt_engine(command:"{full_chain}")')
+    return lines
+
+def cached_invocation(invoked_prompt: str | None, chain_prompts: list[str], message: str) -> list[str]:
+    """format_invocation() via the cross-process cache; the catalog only on a miss."""
+    from gemini_lib import suggest_cache
+
+    key = suggest_cache.key(invoked_prompt, chain_prompts)
+    version = suggest_cache.current_version()
+    lines = suggest_cache.get(key, version)
+    if lines is not None:
+        return lines
+
+    from gemini_lib.catalog_snapshot import get_snapshot
+
+    with trace.span("catalog_load"):
+        catalog = get_snapshot()
+    if not catalog:
+        return format_invocation(None, None, chain_prompts)
+
+    # Every chain step is resolved with the invoked prompt, in one batch
+    unknown_steps = None
+    if len(chain_prompts) > 1:
+        from gemini_lib.validate import check_steps
+
+        with trace.span("chain_check"):
+            unknown_steps = check_steps(catalog, chain_prompts)
+
+    prompt_info = catalog.get(invoked_prompt) if invoked_prompt else None
+    if invoked_prompt and not prompt_info:
+        # Suggestions depend on the message text, so this is not cached
+        lines = [f"[MCP Prompt Not Found] >>{invoked_prompt}"]
+        lines.extend(format_suggestions(invoked_prompt, message))
+        return lines + format_invocation(None, None, chain_prompts, unknown_steps)
+    lines = format_invocation(invoked_prompt, prompt_info, chain_prompts, unknown_steps)
+    suggest_cache.put(key, version, lines)
+    return lines
+
+def resumes_chain(parsed, next_step: dict) -> bool:
+    """A bare ``>>id`` of the chain's next step: no new chain and no arguments of its own."""
+    return (
+        parsed is not None
+        and parsed.invoked is not None
+        and parsed.invoked == next_step.get("prompt_id")
+        and len(parsed.steps) <= 1
+        and not parsed.arguments
     )
-    session_id = hook_input.get("session_id", "") or hook_input.get("sessionId", "")
+
+
+def next_step_info(next_step: dict) -> dict:
+    """The catalog entry of the next step, with the arguments after-tool.py filled in."""
+    from gemini_lib.catalog_snapshot import get_snapshot
+
+    with trace.span("catalog_load"):
+        catalog = get_snapshot()
+    info = dict((catalog.get(next_step["prompt_id"]) if catalog else None) or {})
+    info.setdefault("category", next_step.get("category", "unknown"))
+    if "arguments" in next_step:
+        info["arguments"] = next_step["arguments"]
+    return info
+
+
+def raw_session_id(raw: str) -> str | None:
+    """The session id from the raw payload, without parsing it (None if unsure)."""
+    for field in ('"session_id"', '"sessionId"'):
+        at = raw.find(field)
+        if at < 0:
+            continue
+        rest = raw[at + len(field):].lstrip()
+        if not rest.startswith(":"):
+            return None
+        rest = rest[1:].lstrip()
+        end = rest.find('"', 1)
+        if not rest.startswith('"') or end < 0 or "\\" in rest[:end]:
+            return None
+        return rest[1:end]
+    return ""
+
+
+def has_chain_state(session_id: str) -> bool:
+    """False only when the pending-gate index records no chain state for the session."""
+    from gemini_lib import gate_index
+
+    return gate_index.has_state(session_id) is not False
+
+
+def has_work(raw: str) -> bool:
+    """
+    Pre-parse test: prompt syntax, or a session that may have a chain reminder.
+
+    Plain turns skip parsing unless the session's sidecar (gemini_lib.gate_index)
+    is missing or records chain state; a session id that cannot be read off
+    the raw payload counts as one that may.
+    """
+    if ">>" in raw or "::" in raw:
+        return True
+    session_id = raw_session_id(raw)
+    if session_id == "":
+        return False
+    return session_id is None or has_chain_state(session_id)
+
+
+def handle(raw: str) -> dict | None:
+    with trace.span("parse"):
+        event = parse_hook_input(raw)
+
+    # Gemini BeforeAgent Input: { "prompt": "..." }
+    user_message = event.prompt
+    session_id = event.session_id
+    trace.note(session=session_id)
 
     if not user_message:
-        sys.exit(0)
+        return None
 
-    cache = load_prompts_cache()
-    if not cache:
-        sys.exit(0)
+    from gemini_lib.syntax import scan
 
-    output_lines = []
+    # Plain chat turns (no >> or ::) scan to None: only a chain reminder applies
+    with trace.span("scan"):
+        parsed = scan(user_message)
+    chain_state = bool(session_id) and has_chain_state(session_id)
+    if parsed is None and not chain_state:
+        return None
+
+    # (kind, lines) blocks, filtered by gemini_lib.context_ledger
+    blocks = []
 
     # 1. Chain State (if any)
-    if session_id:
-        session_state = load_session_state(session_id)
+    session_state = None
+    if chain_state:
+        from session_state import format_chain_reminder
+        from gemini_lib import state_store
+
+        with trace.span("state_load"):
+            session_state = state_store.load(session_id)
         if session_state:
             reminder = format_chain_reminder(session_state)
             if reminder:
-                output_lines.append(reminder)
-                output_lines.append("")
-
-    # 2. Prompt Invocation
-    invoked_prompt = detect_prompt_invocation(user_message)
-    if invoked_prompt:
-        prompt_info = get_prompt_by_id(invoked_prompt, cache)
-        if prompt_info:
-            chain_tag = f" [Chain: {prompt_info.get('chain_steps', 0)} steps]" if prompt_info.get("is_chain") else ""
-            output_lines.append(f"[MCP] >>{invoked_prompt} ({prompt_info.get('category', 'unknown')}){chain_tag}")
-            output_lines.append(f"  {format_tool_call(invoked_prompt, prompt_info)}")
-        else:
-            output_lines.append(f"[MCP Prompt Not Found] >>{invoked_prompt}")
-            # Suggestions logic could go here
-
-    # 3. Chain Syntax
-    chain_prompts = detect_chain_syntax(user_message)
-    if chain_prompts and len(chain_prompts) > 1:
-        full_chain = ' --> '.join([f'>>{p}' for p in chain_prompts])
-        output_lines.append(f"[MCP Chain] {len(chain_prompts)} steps")
-        output_lines.append(f'  prompt_engine(command:"{full_chain}")')
+                lines = [reminder]
+                # Continuation call resolved by after-tool.py
+                call = (session_state.get("next_step") or {}).get("call")
+                if call:
+                    lines.append(f"  {call}")
+                lines.append("")
+                blocks.append(("state", lines))
+
+    # 2-3. Prompt Invocation and Chain Syntax
+    invoked_prompt = parsed.invoked if parsed else None
+    chain_prompts = parsed.steps if parsed else []
+    next_step = (session_state or {}).get("next_step") or {}
+    if resumes_chain(parsed, next_step):
+        # The chain's next step, already resolved by after-tool.py
+        lines = format_invocation(invoked_prompt, next_step_info(next_step), [])
+        blocks.append(("required", lines, lines[:2]))
+    elif invoked_prompt or len(chain_prompts) > 1:
+        lines = cached_invocation(invoked_prompt, chain_prompts, user_message)
+        # Past the budget: the [MCP] line and its tool call
+        blocks.append(("required", lines, lines[:2]))
 
     # 4. Inline Gates
-    inline_gates = detect_inline_gates(user_message)
+    inline_gates = parsed.gates if parsed else []
     if inline_gates:
         gates_str = " | ".join(g[:40] for g in inline_gates[:3])
-        output_lines.append(f"[Gates] {gates_str}")
-        output_lines.append("  Respond: GATE_REVIEW: PASS|FAIL - <reason>")
+        blocks.append(("required", [f"[Gates] {gates_str}", "  Respond: GATE_REVIEW: PASS|FAIL - <reason>"]))
+
+    # 5. Frameworks
+    frameworks = parsed.frameworks if parsed else []
+    if frameworks:
+        from gemini_lib.validate import check_frameworks
+
+        lines = []
+        for name, suggestion in check_frameworks(frameworks).items():
+            hint = f" (did you mean @{suggestion}?)" if suggestion else ""
+            lines.append(f"[MCP Framework Not Found] @{name}{hint}")
+        blocks.append(("optional", lines))
+
+    # Skip state already injected; keep within the session's budget
+    from gemini_lib.context_ledger import admit
+
+    with trace.span("context_admit"):
+        output_lines = admit(session_id, "before-agent", blocks, session_state)
 
     # OUTPUT
     if output_lines:
@@ -166,10 +281,9 @@ def main():
             }
         }
         _log_debug(f"emitting additionalContext length={len(final_output)}")
-        print(json.dumps(out))
-        sys.exit(0)
-    
-    sys.exit(0)
+        return out
+
+    return None
 
 if __name__ == "__main__":
-    main()
+    run_hook("before-agent", handle, precheck=has_work)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cold start of each hook: source script vs prebuilt bundle (hook-bundle.py).
+
+    python3 hooks/bench/bench_bundle_start.py [--runs 15]
+
+The hooks and the resolved shared lib are copied to a scratch directory
+(lib/ stays a symlink, as installed) and every hook runs there as a fresh
+process with a payload that does real work. Reported per hook, the median
+wall time of:
+
+- source, no pycache: ``python3 <hook>.py`` with PYTHONDONTWRITEBYTECODE=1
+  and no __pycache__, as on a read-only install or after every npm update.
+  Every hook and lib module is compiled on each run.
+- source, warm pycache: the same after one run has written __pycache__,
+  the best case for source.
+- bundle: ``python3 run-hook.py <hook>`` with the bundle built in the copy
+  (PYTHONDONTWRITEBYTECODE=1 as well; nothing is left to compile).
+
+A bare ``python3 -c pass`` row gives the interpreter's own start. No daemon
+is used. Needs the shared lib (lib/ or PYTHONPATH).
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+
+# (hook, payload); the bundle of stop needs ralph-stop.py and is not timed
+PAYLOADS = [
+    ("before-agent", '{"prompt": ">>analyze some code", "session_id": "b1"}'),
+    ("after-tool", '{"tool_name": "prompt_engine", "session_id": "b1", "tool_input": {"chain_id": "c#1"},'
+                   ' "tool_response": {"content": [{"type": "text", "text": "Step 1 of 3 ... Gate: review"}]}}'),
+    ("gate-enforce", '{"tool_name": "prompt_engine", "session_id": "b1", "tool_input": {"chain_id": "c#1",'
+                     ' "gate_verdict": "GATE_REVIEW: PASS - ok"}}'),
+    ("pre-compact", '{"session_id": "b1"}'),
+]
+
+
+def shared_lib() -> Path | None:
+    candidates = [HOOKS_DIR / "lib"] + [Path(p) for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+    for path in candidates:
+        if (path / "session_state.py").exists():
+            return path.resolve()
+    return None
+
+
+def copy_tree(workdir: Path, lib: Path) -> Path:
+    hooks = workdir / "hooks"
+    ignore = shutil.ignore_patterns("__pycache__", "dist", "bench", "lib")
+    shutil.copytree(HOOKS_DIR, hooks, ignore=ignore)
+    shutil.copytree(lib, workdir / "shared-lib", ignore=shutil.ignore_patterns("__pycache__"))
+    (hooks / "lib").symlink_to(workdir / "shared-lib")
+    return hooks
+
+
+def clear_pycache(root: Path) -> None:
+    for path in root.rglob("__pycache__"):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def timed(argv: list[str], payload: str, env: dict, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, input=payload, env=env, capture_output=True, text=True, check=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    lib = shared_lib()
+    if lib is None:
+        print("shared lib not found (lib/ or PYTHONPATH): nothing to bundle", file=sys.stderr)
+        return 1
+    workdir = Path(tempfile.mkdtemp(prefix="bundle-bench-"))
+    try:
+        hooks = copy_tree(workdir, lib)
+        env = {k: v for k, v in os.environ.items() if not k.startswith(("GEMINI_", "PYTHON"))}
+        env.update(MCP_WORKSPACE=str(workdir / "ws"), GEMINI_HOOK_DAEMON_SOCKET=str(workdir / "none.sock"))
+        cold_env = dict(env, PYTHONDONTWRITEBYTECODE="1")
+
+        subprocess.run([sys.executable, str(hooks / "hook-bundle.py"), "build"], env=env, check=True,
+                       capture_output=True)
+        clear_pycache(workdir)
+
+        bare = timed([sys.executable, "-c", "pass"], "", env, args.runs)
+        print(f"python3 -c pass: {bare:.1f} ms\n")
+        print(f"{'hook':24} {'no pycache ms':>14} {'warm pycache ms':>16} {'bundle ms':>10} {'saved':>7}")
+        for hook, payload in PAYLOADS:
+            script = [sys.executable, str(hooks / f"{hook}.py")]
+            cold = timed(script, payload, cold_env, args.runs)
+            subprocess.run(script, input=payload, env=env, capture_output=True, text=True, check=False)
+            warm = timed(script, payload, env, args.runs)
+            clear_pycache(workdir)
+            bundle = timed([sys.executable, str(hooks / "run-hook.py"), hook], payload, cold_env, args.runs)
+            print(f"{hook:24} {cold:>14.1f} {warm:>16.1f} {bundle:>10.1f} {cold - bundle:>6.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
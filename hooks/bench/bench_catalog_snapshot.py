@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Catalog snapshot vs full prompts-cache load for a BeforeAgent lookup.
+
+    python3 hooks/bench/bench_catalog_snapshot.py [--sizes 100,10000,100000] [--runs 7]
+
+For each catalog size a synthetic prompts cache (with descriptions, templates
+and arguments, like the server writes) is saved to disk and a snapshot is
+built from it. Each lookup path then runs in a fresh interpreter, as a hook
+process would:
+
+- full cache: json.load of the cache file, then a dict lookup (what
+  load_prompts_cache + get_prompt_by_id do)
+- snapshot: Snapshot.open (mmap) and a hashed get()
+
+It also times resolving a six-step chain on an open snapshot: one get() per
+step against one missing() (what before-agent's chain check does).
+
+Reported: median lookup time inside the child over --runs fresh processes
+(imports excluded; a hook pays those either way), and the child's peak RSS
+above a bare interpreter.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR))
+
+from gemini_lib.catalog_snapshot import build
+
+VERBS = ["analyze", "review", "refactor", "summarize", "diagnose", "plan", "test", "document"]
+NOUNS = ["code", "security", "api", "schema", "release", "incident", "design", "query", "docs"]
+
+# Peak RSS of the child alone: ru_maxrss keeps the parent's high-water mark
+# across fork/exec on Linux, VmHWM does not
+PEAK_RSS = """
+def peak_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+FULL_CACHE = PEAK_RSS + """
+import json, sys, time
+start = time.perf_counter()
+with open(sys.argv[1]) as f:
+    cache = json.load(f)
+info = cache["prompts"].get(sys.argv[2])
+ms = (time.perf_counter() - start) * 1000
+print(ms, bool(info), peak_rss_kb())
+"""
+
+SNAPSHOT = PEAK_RSS + """
+import sys, time
+sys.path.insert(0, sys.argv[3])
+from gemini_lib.catalog_snapshot import Snapshot
+start = time.perf_counter()
+info = Snapshot.open(sys.argv[1]).get(sys.argv[2])
+ms = (time.perf_counter() - start) * 1000
+print(ms, bool(info), peak_rss_kb())
+"""
+
+CHAIN = """
+import sys, time
+sys.path.insert(0, sys.argv[2])
+from gemini_lib.catalog_snapshot import Snapshot
+snap = Snapshot.open(sys.argv[1])
+steps = sys.argv[3:]
+snap.missing(steps)
+n = 2000
+start = time.perf_counter()
+for _ in range(n):
+    for step in steps:
+        snap.get(step)
+each = (time.perf_counter() - start) * 1e6 / n
+start = time.perf_counter()
+for _ in range(n):
+    snap.missing(steps)
+missing = (time.perf_counter() - start) * 1e6 / n
+start = time.perf_counter()
+for _ in range(n):
+    snap.get(steps[0])
+one = (time.perf_counter() - start) * 1e6 / n
+print(one, each, missing)
+"""
+
+BARE = PEAK_RSS + "print(0, True, peak_rss_kb())"
+
+
+def synthetic_catalog(size: int, rng: random.Random) -> dict:
+    prompts = {}
+    for n in range(size):
+        verb, noun = rng.choice(VERBS), rng.choice(NOUNS)
+        prompt_id = f"{verb}_{noun}_{n}"
+        prompts[prompt_id] = {
+            "id": prompt_id,
+            "name": f"{verb.title()} {noun}",
+            "category": rng.choice(["analysis", "development", "research"]),
+            "description": f"{verb} the {noun} and report findings " * 4,
+            "userMessageTemplate": f"Please {verb} {{{{input}}}} focusing on {noun}. " * 8,
+            "is_chain": n % 10 == 0,
+            "chain_steps": 3 if n % 10 == 0 else 0,
+            "arguments": [
+                {"name": "input", "type": "string", "required": True, "description": "What to work on"},
+                {"name": "depth", "type": "string", "default": "normal", "description": "How deep to go"},
+            ],
+        }
+    return {"version": 1, "prompts": prompts}
+
+
+def run_child(code: str, argv: list[str]) -> tuple[float, float]:
+    """(in-process ms, peak RSS KiB) reported by one fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-c", code, *argv], capture_output=True, text=True, check=True)
+    ms, found, rss = proc.stdout.split()
+    if found != "True":
+        raise SystemExit(f"lookup failed for {argv}")
+    return float(ms), float(rss)
+
+
+def measure(code: str, argv: list[str], runs: int) -> tuple[float, float]:
+    times, rss = [], []
+    for _ in range(runs):
+        ms, peak = run_child(code, argv)
+        times.append(ms)
+        rss.append(peak)
+    return statistics.median(times), max(rss)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="catalog-snapshot-bench-"))
+
+    _, bare_rss = measure(BARE, [], 3)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    rows = {}
+    for size in sizes:
+        catalog = synthetic_catalog(size, rng)
+        cache_file = workdir / f"prompts-{size}.json"
+        cache_file.write_text(json.dumps(catalog))
+        start = time.perf_counter()
+        blob = build(catalog, (0, size))
+        build_ms = (time.perf_counter() - start) * 1000
+        snapshot_file = workdir / f"snapshot-{size}.bin"
+        snapshot_file.write_bytes(blob)
+        target = next(pid for pid in catalog["prompts"] if pid.endswith(f"_{size // 2}"))
+        rows[size] = {
+            "cache_kb": cache_file.stat().st_size / 1024,
+            "snapshot_kb": len(blob) / 1024,
+            "build_ms": build_ms,
+        }
+        rows[size]["snapshot"] = measure(SNAPSHOT, [str(snapshot_file), target, str(HOOKS_DIR)], args.runs)
+        rows[size]["full"] = measure(FULL_CACHE, [str(cache_file), target], args.runs)
+        steps = rng.sample(sorted(catalog["prompts"]), 6)
+        proc = subprocess.run([sys.executable, "-c", CHAIN, str(snapshot_file), str(HOOKS_DIR), *steps],
+                              capture_output=True, text=True, check=True)
+        rows[size]["chain"] = [float(v) for v in proc.stdout.split()]
+
+    print(f"{'prompts':>8} {'cache KB':>9} {'snap KB':>8} {'build ms':>9}"
+          f" {'full ms':>8} {'snap ms':>8} {'full +RSS MB':>13} {'snap +RSS MB':>13}"
+          f" {'1x get us':>10} {'6x get us':>10} {'missing us':>11}")
+    for size in sizes:
+        row = rows[size]
+        (full_ms, full_rss), (snap_ms, snap_rss) = row["full"], row["snapshot"]
+        print(f"{size:>8} {row['cache_kb']:>9.0f} {row['snapshot_kb']:>8.0f} {row['build_ms']:>9.1f}"
+              f" {full_ms:>8.2f} {snap_ms:>8.2f} {(full_rss - bare_rss) / 1024:>13.1f}"
+              f" {(snap_rss - bare_rss) / 1024:>13.1f}"
+              f" {row['chain'][0]:>10.1f} {row['chain'][1]:>10.1f}"
+              f" {row['chain'][2]:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
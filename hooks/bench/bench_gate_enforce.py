@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+BeforeTool latency of gate-enforce.py under concurrent chain execution.
+
+    python3 hooks/bench/bench_gate_enforce.py [--sessions 200] [--writers 4] [--readers 8]
+
+Writer processes keep updating chain state (alternating pending/cleared gates)
+through state_store, as after-tool.py does, while reader processes call the
+gate-enforce handler for resuming chain calls. Readers are timed twice: with
+the pending-gate sidecar index (the real hook) and with a full session-store
+load (the pre-index behaviour). Runs against a throwaway MCP_WORKSPACE.
+
+A hook process handles one call, so each call is timed in a fresh child
+forked from a reader that has loaded gate-enforce.py but nothing it imports
+lazily (state_store, sqlite3, the database connection). Only handle() is
+timed, inside the child: interpreter start-up and the fork are left out, as
+they cost the same in both modes. Calls that find no gate pending (allowed)
+and calls that are denied, which load the session for the continuation call
+in both modes, are reported separately.
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR))
+
+
+def load_gate_enforce():
+    spec = importlib.util.spec_from_file_location("gate_enforce", HOOKS_DIR / "gate-enforce.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def writer(sessions: int, stop_at: float, seed: int) -> None:
+    from gemini_lib import state_store
+
+    rng = random.Random(seed)
+    while time.monotonic() < stop_at:
+        sid = f"s{rng.randrange(sessions)}"
+        gate = "review" if rng.random() < 0.3 else None
+        state_store.save(sid, {"chain_id": f"{sid}#1", "current_step": 1, "total_steps": 3,
+                               "pending_gate": gate, "gate_criteria": []})
+
+
+def store_lookup(session_id: str) -> str | None:
+    """The pre-index lookup_pending_gate: a full session-store load."""
+    from gemini_lib import state_store
+
+    state = state_store.load(session_id)
+    return state.get("pending_gate") if state else None
+
+
+def timed_call(mode: str, module, raw: str, out: int) -> None:
+    """Child side: one cold handle() call; writes "<ms> <allowed>" to ``out``."""
+    if mode == "store":
+        module.lookup_pending_gate = store_lookup
+    start = time.perf_counter()
+    result = module.handle(raw)
+    elapsed = (time.perf_counter() - start) * 1000
+    os.write(out, f"{elapsed} {int(result.get('decision') == 'allow')}".encode())
+
+
+def reader(mode: str, sessions: int, calls: int, seed: int, results) -> None:
+    module = load_gate_enforce()
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(calls):
+        sid = f"s{rng.randrange(sessions)}"
+        raw = json.dumps({"tool_name": "prompt_engine", "session_id": sid,
+                          "tool_input": {"chain_id": f"{sid}#1"}})
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            try:
+                timed_call(mode, module, raw, wfd)
+            finally:
+                os._exit(0)
+        os.close(wfd)
+        with os.fdopen(rfd, "rb") as f:
+            data = f.read().split()
+        os.waitpid(pid, 0)
+        if data:
+            samples.append((float(data[0]), data[1] == b"1"))
+    results.extend(samples)
+
+
+def run(mode: str, args) -> list[tuple[float, bool]]:
+    # Spawned, not forked: readers must not inherit this process's store connection
+    mp = multiprocessing.get_context("spawn")
+    manager = mp.Manager()
+    results = manager.list()
+    stop_at = time.monotonic() + 3600
+    writers = [mp.Process(target=writer, args=(args.sessions, stop_at, i)) for i in range(args.writers)]
+    for proc in writers:
+        proc.start()
+    readers = [mp.Process(target=reader, args=(mode, args.sessions, args.calls, 100 + i, results))
+               for i in range(args.readers)]
+    for proc in readers:
+        proc.start()
+    for proc in readers:
+        proc.join()
+    for proc in writers:
+        proc.terminate()
+        proc.join()
+    return sorted(results)
+
+
+def pct(samples: list[float], p: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=500, help="calls per reader")
+    args = parser.parse_args()
+
+    os.environ["MCP_WORKSPACE"] = tempfile.mkdtemp(prefix="gate-bench-")
+    os.environ["GEMINI_HOOK_STATE_MIRROR"] = "0"
+    from gemini_lib import state_store
+
+    for n in range(args.sessions):
+        state_store.save(f"s{n}", {"current_step": 1, "total_steps": 3, "pending_gate": None})
+
+    print(f"{args.readers} readers x {args.calls} calls, {args.writers} writers, {args.sessions} sessions")
+    print(f"{'mode':<8}{'calls':<8}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode in ("sidecar", "store"):
+        results = run(mode, args)
+        for kind, allowed in (("allowed", True), ("denied", False)):
+            samples = [ms for ms, ok in results if ok == allowed]
+            if not samples:
+                continue
+            print(f"{mode:<8}{kind:<8}{len(samples):>6}{pct(samples, 50):>9.3f}{pct(samples, 95):>9.3f}"
+                  f"{pct(samples, 99):>9.3f}{samples[-1]:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for every hook entry point.
+
+    python3 hooks/bench/bench_import_time.py [--runs 9] [--scale 1.0] [--profile]
+
+Runs each hook under ``python3 -X importtime`` with a representative payload
+and sums the cumulative import time of every top-level import that a bare
+interpreter (``python3 -c pass``) does not already do. The median over
+``--runs`` is checked against a per-scenario budget. Early-exit scenarios
+must also import nothing but the runner, its tracer, json and the pending-gate
+index. Exits 1 on any breach, so it can gate CI.
+
+Budgets were calibrated on a slow dev VM (bare interpreter start ~20 ms);
+``--scale`` multiplies them for other machines. Work scenarios need the
+shared lib (lib/ or PYTHONPATH) and are skipped when a hook cannot run.
+``--profile`` prints the slowest imports of each scenario.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+
+# Top-level imports an early exit may make
+EARLY_EXIT_ALLOWED = {"gemini_lib", "gemini_lib.runner", "gemini_lib.trace", "json",
+                      "gemini_lib.gate_index"}
+
+# Session whose pending-gate sidecar records no chain state
+IDLE_SESSION = "idle-session"
+
+# (hook script, scenario, payload, budget ms, early exit?)
+SCENARIOS = [
+    ("before-agent.py", "plain turn, no session", '{"prompt": "hello there"}', 2.0, True),
+    ("before-agent.py", "plain turn, idle session",
+     f'{{"prompt": "hello there", "session_id": "{IDLE_SESSION}"}}', 2.0, True),
+    ("after-tool.py", "other tool", '{"tool_name": "read_file", "session_id": "s1"}', 2.0, True),
+    ("gate-enforce.py", "other tool", '{"tool_name": "read_file", "session_id": "s1"}', 2.0, True),
+    ("ralph-context-tracker.py", "no Ralph loop", '{"tool_name": "replace", "tool_input": {}}', 1.0, True),
+    ("before-agent.py", ">>prompt with session",
+     '{"prompt": ">>analyze some code", "session_id": "s1"}', 60.0, False),
+    ("after-tool.py", "prompt_engine step",
+     '{"tool_name": "prompt_engine", "session_id": "s1", "tool_response": '
+     '{"content": [{"type": "text", "text": "Step 1 of 3"}]}}', 45.0, False),
+    ("gate-enforce.py", "prompt_engine resume",
+     '{"tool_name": "prompt_engine", "session_id": "s1", "tool_input": {"chain_id": "c#1"}}', 30.0, False),
+    ("pre-compact.py", "compaction", '{"session_id": "s1"}', 45.0, False),
+]
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Top-level module -> cumulative microseconds from -X importtime output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # nested import (counted in its parent) or the header
+        imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def importtime(argv: list[str], payload: str, env: dict) -> tuple[dict[str, int], int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        input=payload.encode(), env=env, capture_output=True,
+    )
+    return parse_importtime(proc.stderr.decode(errors="replace")), proc.returncode
+
+
+def bench_env() -> dict:
+    """Environment for timed runs: a throwaway workspace with an idle session indexed."""
+    workspace = tempfile.mkdtemp(prefix="import-bench-")
+    env = dict(os.environ, MCP_WORKSPACE=workspace, GEMINI_HOOK_DAEMON="0")
+    sidecars = os.path.join(workspace, "runtime-state", "gemini-hooks", "pending-gates")
+    os.makedirs(sidecars)
+    with open(os.path.join(sidecars, IDLE_SESSION), "w") as f:
+        f.write("1")
+    # Installed hooks run with cached bytecode; don't time compiling gemini_lib
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure(script: str, payload: str, env: dict, runs: int,
+            baseline: set[str]) -> tuple[list[float], dict[str, list[int]], int]:
+    """(import ms per run, module -> microseconds per run, last exit code) for one scenario."""
+    argv = [str(HOOKS_DIR / script)]
+    importtime(argv, payload, env)  # warm bytecode caches
+    totals, seen, rc = [], {}, 0
+    for _ in range(runs):
+        imports, rc = importtime(argv, payload, env)
+        if rc != 0:
+            break
+        extra = {name: us for name, us in imports.items() if name not in baseline}
+        totals.append(sum(extra.values()) / 1000)
+        for name, us in extra.items():
+            seen.setdefault(name, []).append(us)
+    return totals, seen, rc
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    parser.add_argument("--profile", action="store_true", help="show the slowest imports")
+    args = parser.parse_args()
+
+    env = bench_env()
+    baseline = set(importtime(["-c", "pass"], "", env)[0])
+
+    failures = []
+    print(f"{'hook':26} {'scenario':24} {'imports ms':>10} {'budget':>8}")
+    for script, scenario, payload, budget, early_exit in SCENARIOS:
+        totals, seen, rc = measure(script, payload, env, args.runs, baseline)
+        if not totals:
+            print(f"{script:26} {scenario:24} {'skipped':>10}  (hook exited {rc}; shared lib missing?)")
+            continue
+
+        median = statistics.median(totals)
+        limit = budget * args.scale
+        verdict = "" if median <= limit else "  OVER BUDGET"
+        print(f"{script:26} {scenario:24} {median:10.2f} {limit:8.1f}{verdict}")
+        if verdict:
+            failures.append(f"{script} ({scenario}): {median:.2f} ms > {limit:.1f} ms")
+        if early_exit:
+            unexpected = sorted(set(seen) - EARLY_EXIT_ALLOWED)
+            if unexpected:
+                print(f"    early exit imports {', '.join(unexpected)}")
+                failures.append(f"{script} ({scenario}): early exit imports {', '.join(unexpected)}")
+        if args.profile:
+            slowest = sorted(seen.items(), key=lambda kv: -statistics.median(kv[1]))[:8]
+            for name, samples in slowest:
+                print(f"    {statistics.median(samples) / 1000:8.2f}  {name}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark gemini_lib.prompt_index on synthetic catalogs.
+
+    python3 hooks/bench/bench_prompt_index.py [--sizes 1000,10000,50000]
+
+Reports build, persist/load and per-lookup latency for did-you-mean and
+intent matching. Lookups must stay far below the 5000 ms hook timeout.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gemini_lib.prompt_index import PromptIndex
+
+VERBS = ["analyze", "review", "refactor", "summarize", "diagnose", "plan", "test", "document"]
+NOUNS = ["code", "security", "api", "schema", "release", "incident", "design", "query", "docs"]
+CATEGORIES = ["analysis", "development", "research", "ops", "writing"]
+
+
+def synthetic_catalog(size: int, rng: random.Random) -> dict:
+    prompts = {}
+    for n in range(size):
+        verb, noun = rng.choice(VERBS), rng.choice(NOUNS)
+        prompt_id = f"{verb}_{noun}_{n}"
+        prompts[prompt_id] = {
+            "id": prompt_id,
+            "name": f"{verb.title()} {noun}",
+            "category": rng.choice(CATEGORIES),
+            "description": f"{verb} the {noun} and report findings for {rng.choice(NOUNS)}",
+        }
+    return {"prompts": prompts}
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'prompts':>8}{'build ms':>10}{'load ms':>9}{'KB':>8}"
+          f"{'suggest p50':>13}{'p99':>8}{'intent p50':>12}{'p99':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        catalog = synthetic_catalog(size, rng)
+        start = time.perf_counter()
+        index = PromptIndex.build(catalog, (0, size))
+        build_ms = (time.perf_counter() - start) * 1000
+        blob = index.dump()
+        start = time.perf_counter()
+        PromptIndex.loads(blob)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        ids = list(catalog["prompts"])
+        suggest, intent = [], []
+        for _ in range(args.lookups):
+            query = typo(rng.choice(ids), rng)
+            start = time.perf_counter()
+            index.suggest_ids(query)
+            suggest.append((time.perf_counter() - start) * 1000)
+            text = f"please {rng.choice(VERBS)} my {rng.choice(NOUNS)} for {rng.choice(NOUNS)}"
+            start = time.perf_counter()
+            index.match_intent(text)
+            intent.append((time.perf_counter() - start) * 1000)
+
+        print(f"{size:>8}{build_ms:>10.1f}{load_ms:>9.1f}{len(blob) // 1024:>8}"
+              f"{statistics.median(suggest):>13.2f}{percentile(suggest, 99):>8.2f}"
+              f"{statistics.median(intent):>12.2f}{percentile(intent, 99):>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Bounded summary of a large bash/sub-agent response vs join-then-summarize.
+
+    python3 hooks/bench/bench_ralph_summary.py [--sizes-mb 1,10,100] [--runs 3]
+
+Builds a synthetic hook payload of each size (a test-runner log split into
+1 MiB content blocks, with an error every few thousand lines) and times what
+ralph-context-tracker does with it, from the raw payload on:
+
+- joined: decode the tool_response, " ".join its content blocks, then
+  summarize_error() on the whole text (the old path)
+- decoded: decode the tool_response, then ralph_tracker.summarize_blocks()
+  and summarize_error() on its few-KB result
+- streamed: ralph_tracker.summarize_chunks() over
+  HookEvent.response_chunks(), which decodes the response from the raw
+  payload a chunk at a time, then summarize_error() (the hook's path)
+
+Reported: median time over --runs, and peak memory allocated during the step
+(tracemalloc; the raw payload is built beforehand and not counted). The
+shared lib's summarize_error is used when it is importable. Otherwise that
+step is skipped and only the decoding and the summary are timed.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR))
+sys.path.insert(0, str(HOOKS_DIR / "lib"))
+
+from gemini_lib.event import decode, text_blocks
+from gemini_lib.ralph_tracker import summarize_blocks, summarize_chunks
+
+try:
+    from lesson_extractor import summarize_error
+except ImportError:
+    summarize_error = None
+
+BLOCK_BYTES = 1 << 20
+
+
+def synthetic_payload(size_mb: int) -> str:
+    lines = []
+    for n in range(BLOCK_BYTES // 48):
+        if n % 4000 == 3999:
+            lines.append(f"E   AssertionError: expected 200, got 500 (case {n})")
+        else:
+            lines.append(f"tests/test_api.py::test_case_{n:06d} PASSED  [ 42%]")
+    block = "\n".join(lines)[:BLOCK_BYTES]
+    blocks = [{"type": "text", "text": block} for _ in range(size_mb)]
+    return json.dumps({"tool_name": "run_shell_command", "session_id": "bench",
+                       "tool_input": {"command": "pytest"}, "tool_response": {"content": blocks}})
+
+
+def summarized(text: str) -> str:
+    return summarize_error(text) if summarize_error else text[:300]
+
+
+def joined(raw: str) -> str:
+    return summarized(" ".join(text_blocks(decode(raw).tool_response)))
+
+
+def decoded(raw: str) -> str:
+    return summarized(summarize_blocks(text_blocks(decode(raw).tool_response)))
+
+
+def streamed(raw: str) -> str:
+    return summarized(summarize_chunks(decode(raw).response_chunks()))
+
+
+PATHS = {"joined": joined, "decoded": decoded, "streamed": streamed}
+
+
+def measure(fn, raw: str, runs: int) -> tuple[float, float]:
+    times, peaks = [], []
+    for _ in range(runs):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(raw)
+        times.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times), max(peaks)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", default="1,10,100")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if summarize_error is None:
+        print("lesson_extractor not importable: timing decoding/summary only\n")
+    print(f"{'size':>7}" + "".join(f" {name + ' ms':>12} {name + ' peak MB':>16}" for name in PATHS))
+    for size in [int(s) for s in args.sizes_mb.split(",")]:
+        raw = synthetic_payload(size)
+        row = f"{size:>5}MB"
+        for fn in PATHS.values():
+            ms, peak = measure(fn, raw, args.runs)
+            row += f" {ms:>12.1f} {peak / 1048576:>16.2f}"
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+after-tool.py response parsing on multi-MB prompt_engine responses.
+
+    python3 hooks/bench/bench_response_parse.py [--sizes 1,4,16] [--runs 5]
+
+For each response size (MB) three shapes are timed from the decoded
+tool_response dict to the chain state:
+
+- one block: a rendered template in a single text block
+- 64 KiB blocks: the same text split into many content blocks
+- structured: the same blocks plus a structuredContent chain_state
+
+Each is run through the old join-then-parse path and through
+gemini_lib.response_state.parse_response. The text is parsed by the shared
+lib's parse_prompt_engine_response, so the lib must be importable.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR / "lib"))
+sys.path.insert(0, str(HOOKS_DIR))
+
+HEADER = "## Chain Step\nStep 2 of 3\nGate: quality\n- output cites sources\n\n"
+FILLER = "Context line for the rendered template, with embedded {placeholder} text.\n"
+BLOCK_SIZE = 64 * 1024
+
+
+def make_response(size_mb: float, shape: str) -> dict:
+    body = FILLER * int(size_mb * 1024 * 1024 / len(FILLER))
+    text = HEADER + body
+    if shape == "one block":
+        return {"content": [{"type": "text", "text": text}]}
+    blocks = [{"type": "text", "text": text[i:i + BLOCK_SIZE]} for i in range(0, len(text), BLOCK_SIZE)]
+    response = {"content": blocks}
+    if shape == "structured":
+        response["structuredContent"] = {"chain_state": {
+            "chain_id": "bench#1", "current_step": 2, "total_steps": 3,
+            "pending_gate": "quality", "gate_criteria": ["output cites sources"],
+        }}
+    return response
+
+
+def join_then_parse(tool_response: dict, parse) -> dict | None:
+    """The pre-streaming after-tool.py path."""
+    content = tool_response.get("content", "")
+    if isinstance(content, list):
+        content = " ".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return parse(content)
+
+
+def time_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,4,16", help="response sizes in MB")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        from session_state import parse_prompt_engine_response
+    except ImportError:
+        print("shared lib (session_state) not importable; link hooks/lib or set PYTHONPATH")
+        return 1
+    from gemini_lib.response_state import parse_response
+
+    print(f"{'size':>6} {'shape':14} {'join+parse ms':>14} {'streamed ms':>12} {'speedup':>8}")
+    for size in (float(s) for s in args.sizes.split(",")):
+        for shape in ("one block", "64 KiB blocks", "structured"):
+            response = make_response(size, shape)
+            old = time_ms(lambda: join_then_parse(response, parse_prompt_engine_response), args.runs)
+            new = time_ms(lambda: parse_response(response), args.runs)
+            if parse_response(response) is None:
+                print(f"{size:5g}M {shape:14} state not found; check the shared lib's markers")
+                return 1
+            print(f"{size:5g}M {shape:14} {old:14.2f} {new:12.3f} {old / new:7.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
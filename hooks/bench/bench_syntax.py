@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Fuzz and benchmark gemini_lib.syntax.scan against the legacy regex detectors.
+
+    python3 hooks/bench/bench_syntax.py [--sizes 1,4,16] [--fuzz 5000] [--seed 0]
+
+Checks a table of edge cases, fuzzes invariants (no exceptions, invocation
+agrees with the legacy detector except where an id ran into an unspaced
+``-->``, every chain step is a >>id in the message), then times both
+implementations on multi-megabyte messages. Exits 1 on any
+failure, including an input on which scan() is slower than the legacy regexes
+(best of --repeat runs each).
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gemini_lib.syntax import scan
+
+
+# Legacy detectors, as they were in before-agent.py
+def legacy_invocation(message: str) -> str | None:
+    match = re.match(r'^>>\s*([a-zA-Z0-9_-]+)', message.strip())
+    return match.group(1) if match else None
+
+
+def legacy_chain(message: str) -> list[str]:
+    matches = re.findall(r'>>\s*([a-zA-Z0-9_-]+)\s*(?:-->|→)', message)
+    final_match = re.search(r'(?:-->|→)\s*>>\s*([a-zA-Z0-9_-]+)\s*$', message)
+    if final_match:
+        matches.append(final_match.group(1))
+    return matches
+
+
+def legacy_gates(message: str) -> list[str]:
+    quoted = re.findall(r'::\s*[\'"]([^\'"]+)[\'"]', message)
+    ids = re.findall(r'::\s*([a-zA-Z][a-zA-Z0-9_-]*)\b', message)
+    return quoted + ids
+
+
+def expected_invocation(message: str) -> str | None:
+    """legacy_invocation, except that an id stops before an unspaced ``-->``."""
+    match = re.match(r'^>>\s*((?:[a-zA-Z0-9_]|-(?!->))+)', message.strip())
+    return match.group(1) if match else None
+
+
+def legacy_scan(message: str):
+    return legacy_invocation(message), legacy_chain(message), legacy_gates(message)
+
+
+# (message, invoked, steps, gates, frameworks, arguments)
+CASES = [
+    ("hello there", None, [], [], [], {}),
+    (">>analyze", "analyze", [], [], [], {}),
+    (">>a --> >>b → >>c", "a", ["a", "b", "c"], [], [], {}),
+    (">>a topic:x --> >>b", "a", ["a", "b"], [], [], {"a": {"topic": "x"}}),
+    (">>a :: 'x :: y' :: gate-id", "a", [], ["x :: y", "gate-id"], [], {}),
+    (">>a :: 'x --> >>b'", "a", [], ["x --> >>b"], [], {}),
+    (">>a @CAGEERF depth:\"very deep\"", "a", [], [], ["CAGEERF"], {"a": {"depth": "very deep"}}),
+    ("see std::vector and a@b.com", None, [], [], [], {}),
+    ("url:https://x.io >>a", None, [], [], [], {}),
+    (">>a args\n>>b --> >>c", "a", ["b", "c"], [], [], {}),
+    (">>a-->>>b", "a", ["a", "b"], [], [], {}),
+]
+
+
+def check_cases() -> int:
+    failures = 0
+    for message, *expected in CASES:
+        parsed = scan(message)
+        actual = (
+            [parsed.invoked, parsed.steps, parsed.gates, parsed.frameworks, parsed.arguments]
+            if parsed else [None, [], [], [], {}]
+        )
+        if actual != expected:
+            print(f"case mismatch on {message!r}:\n  expected {expected}\n  actual   {actual}")
+            failures += 1
+    return failures
+
+
+FRAGMENTS = [
+    ">>", ">> ", "-->", " --> ", "→", "::", " :: ", "'", '"', "@", "@CAGEERF",
+    "analyze", "step_2", "gate-id", "key:value", 'topic:"a b"', "http://x.io",
+    "std::vector", " ", "\n", "a@b.com", "-", ":", ">", "x",
+]
+
+
+def random_message(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(length))
+
+
+def fuzz(iterations: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for i in range(iterations):
+        message = random_message(rng, rng.randint(0, 40))
+        try:
+            parsed = scan(message)
+        except Exception as exc:  # noqa: BLE001 - report every crash
+            print(f"crash #{i}: {exc!r} on {message!r}")
+            failures += 1
+            continue
+        invoked = parsed.invoked if parsed else None
+        if invoked != expected_invocation(message):
+            print(f"invocation mismatch #{i}: {invoked!r} on {message!r}")
+            failures += 1
+        if parsed:
+            if len(parsed.steps) == 1:
+                print(f"single-step chain #{i} on {message!r}")
+                failures += 1
+            for step in parsed.steps:
+                if step not in message:
+                    print(f"phantom step #{i}: {step!r} on {message!r}")
+                    failures += 1
+    return failures
+
+
+def build_payload(size_mb: int, rng: random.Random) -> dict[str, str]:
+    target = size_mb * 1024 * 1024
+    log_line = "2026-01-01T00:00:00Z INFO worker[12]: processed item=42 status:ok std::vector<int> ok\n"
+    diff_line = "+    return self.value  # key:value >> redirect @decorator\n"
+    plain = ("lorem ipsum dolor sit amet " * 4 + "\n") * (target // 109 + 1)
+    logs = log_line * (target // len(log_line) + 1)
+    diff = diff_line * (target // len(diff_line) + 1)
+    head = ">>analyze topic:\"perf\" @CAGEERF :: 'no regressions' --> >>summarize\n"
+    return {
+        "plain": plain[:target],
+        "log": head + logs[:target],
+        "diff": head + diff[:target],
+        "fuzz": random_message(rng, target // 4),
+    }
+
+
+def bench(sizes: list[int], seed: int, repeat: int) -> int:
+    """Time scan() against the legacy regexes; returns the inputs where scan() was slower."""
+    rng = random.Random(seed)
+    regressions = 0
+    print(f"{'input':<10}{'MB':>4}{'scan ms':>12}{'legacy ms':>12}{'speedup':>10}")
+    for size in sizes:
+        for name, message in build_payload(size, rng).items():
+            timings = []
+            for fn in (scan, legacy_scan):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn(message)
+                    best = min(best, time.perf_counter() - start)
+                timings.append(best * 1000)
+            new, old = timings
+            slower = new > old
+            regressions += slower
+            print(f"{name:<10}{size:>4}{new:>12.2f}{old:>12.2f}{old / max(new, 1e-9):>9.1f}x"
+                  + ("  REGRESSION" if slower else ""))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1,4,16", help="comma-separated MB sizes")
+    parser.add_argument("--fuzz", type=int, default=5000, help="fuzz iterations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = check_cases()
+    print(f"cases: {len(CASES)} checked, {failures} failures")
+    fuzz_failures = fuzz(args.fuzz, args.seed)
+    print(f"fuzz: {args.fuzz} messages, {fuzz_failures} failures")
+    failures += fuzz_failures
+    regressions = bench([int(s) for s in args.sizes.split(",") if s], args.seed, args.repeat)
+    if regressions:
+        print(f"scan() slower than legacy on {regressions} inputs")
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Verification cache: cold run vs unchanged tree vs one changed file.
+
+    python3 hooks/bench/bench_verify_cache.py [--files 10,100,1000] [--command-ms 500]
+
+For each tree size, a throwaway git project of that many files (4 KiB each)
+is committed, and a verification command that takes --command-ms runs
+through verify_cache.cached_run() as ralph-stop would call it. Reported per
+size: the first (cold) run, a repeat with the tree unchanged (a cache hit:
+``git status`` plus the cache file), and a run after one file changed (a
+miss that hashes only the files git lists). A last row runs four independent
+commands joined with ``&&`` on one worker and then on four.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR))
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", default="10,100,1000")
+    parser.add_argument("--command-ms", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="verify-cache-bench-"))
+    os.environ["MCP_WORKSPACE"] = str(workdir / "ws")
+    from gemini_lib import verify_cache
+
+    command = f"sleep {args.command_ms / 1000} && echo tests passed"
+    old = time.time() - 60
+    print(f"{'files':>6} {'cold ms':>9} {'hit ms':>8} {'1 changed ms':>13}")
+    for count in [int(n) for n in args.files.split(",")]:
+        project = workdir / f"project-{count}"
+        project.mkdir()
+        names = [f"src/mod_{n}.py" for n in range(count)]
+        (project / "src").mkdir()
+        for name in names:
+            (project / name).write_bytes(os.urandom(4096))
+            os.utime(project / name, (old, old))
+        git = ["git", "-C", str(project), "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+        subprocess.run([*git, "init", "-q"], check=True)
+        subprocess.run([*git, "add", "-A"], check=True)
+        subprocess.run([*git, "commit", "-qm", "bench"], check=True)
+        session = f"bench-{count}"
+
+        def run():
+            verify_cache.cached_run(session, command, shell=True, capture_output=True,
+                                    text=True, cwd=str(project))
+
+        cold = timed(run)
+        hit = timed(run)
+        (project / names[0]).write_bytes(os.urandom(4096))
+        os.utime(project / names[0], (old + 1, old + 1))
+        changed = timed(run)
+        print(f"{count:>6} {cold:>9.1f} {hit:>8.2f} {changed:>13.1f}")
+
+    parts = " && ".join(f"sleep {args.command_ms / 1000}" for _ in range(4)) + " && echo make ok"
+    os.environ["GEMINI_HOOK_VERIFY_CACHE"] = "0"
+    for workers in (1, 4):
+        os.environ["GEMINI_HOOK_VERIFY_WORKERS"] = str(workers)
+        ms = timed(lambda: verify_cache.cached_run(None, parts, shell=True, capture_output=True))
+        print(f"4 independent commands, {workers} worker(s): {ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
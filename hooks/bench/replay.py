@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Replay recorded hook event streams against the hook scripts and report cost.
+
+    python3 hooks/bench/replay.py [corpus ...] [--concurrency 1,8] [--repeat 3]
+                                  [--daemon] [--files] [--json out.json]
+                                  [--baseline base.json --tolerance 0.25]
+
+A corpus is a directory of ``*.jsonl`` streams (or single stream files), one
+event per line as written by ``GEMINI_HOOK_RECORD`` (see
+gemini_lib/recorder.py): ``{"hook": "after-tool", "stdin": "..."}``. Each
+stream is one session and is replayed in order. The default corpus is
+``bench/fixtures/replay``.
+
+For every concurrency level N, N copies of each stream run side by side, each
+copy under its own session id suffix, so N agents hit the same install at
+once. Every event is a fresh hook process (run through replay_child.py) in a
+throwaway MCP_WORKSPACE that is seeded with ``catalog.json`` from the first
+corpus directory that has one, written where the shared lib's cache_manager
+looks for it. The shared lib itself must be importable (hooks/lib or
+PYTHONPATH); it is not stubbed.
+
+Reported per hook: runs, errors (nonzero exits), wall-time p50/p95/p99 (spawn
+to exit, including ~1 ms of replay_child overhead), median peak RSS, median
+read/write syscalls, and how many distinct files it touched (``--files``
+lists them). ``--json`` saves the summary; ``--baseline`` compares p95 with a
+saved summary and exits 1 on a regression beyond ``--tolerance``, or on any
+hook error.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+CHILD = Path(__file__).resolve().with_name("replay_child.py")
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "fixtures" / "replay"
+
+# Collapse per-process temp names and per-copy session suffixes in file lists
+PATH_NOISE = [(re.compile(r"\.\d+\.tmp$"), ".<pid>.tmp"), (re.compile(r"-c\d+\b"), "-c<n>")]
+
+HOOK_SCRIPTS = {
+    "before-agent": "before-agent.py",
+    "gate-enforce": "gate-enforce.py",
+    "after-tool": "after-tool.py",
+    "ralph-context-tracker": "ralph-context-tracker.py",
+    "pre-compact": "pre-compact.py",
+    "stop": "stop.py",
+}
+
+
+def load_corpus(paths: list[Path]) -> tuple[dict[str, list[dict]], Path | None]:
+    """Stream name -> events, plus the first catalog.json found."""
+    streams, catalog = {}, None
+    for path in paths:
+        files = sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+        if path.is_dir() and catalog is None and (path / "catalog.json").exists():
+            catalog = path / "catalog.json"
+        for file in files:
+            events = []
+            for line in file.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    event = json.loads(line)
+                    if event.get("hook") in HOOK_SCRIPTS:
+                        events.append(event)
+            if events:
+                streams[file.stem] = events
+    return streams, catalog
+
+
+def with_session_suffix(raw: str, suffix: str) -> str:
+    """Re-key a payload to a distinct session so concurrent copies don't share state."""
+    if not suffix:
+        return raw
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return raw
+    if not isinstance(payload, dict):
+        return raw
+    for key in ("session_id", "sessionId"):
+        if payload.get(key):
+            payload[key] = f"{payload[key]}{suffix}"
+    return json.dumps(payload)
+
+
+def seed_workspace(env: dict, catalog: Path | None) -> None:
+    """Put the fixture catalog where the shared lib's cache_manager reads it."""
+    probe = subprocess.run(
+        [sys.executable, "-c", "import cache_manager; print(cache_manager.get_cache_dir())"],
+        env=env, capture_output=True, text=True,
+    )
+    if probe.returncode != 0:
+        raise SystemExit("shared lib not importable: link hooks/lib or set PYTHONPATH")
+    if catalog is not None:
+        cache_dir = Path(probe.stdout.strip())
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(catalog, cache_dir / "prompts.cache.json")
+
+
+def run_event(hook: str, raw: str, env: dict) -> dict:
+    """Run one hook process; wall ms, exit code and replay_child's stats."""
+    read_fd, write_fd = os.pipe()
+    child_env = dict(env, REPLAY_STATS_FD=str(write_fd))
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, str(CHILD), str(HOOKS_DIR / HOOK_SCRIPTS[hook])],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env=child_env, pass_fds=(write_fd,),
+        )
+    finally:
+        os.close(write_fd)
+    proc.communicate(raw.encode())
+    wall_ms = (time.perf_counter() - start) * 1000
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    try:
+        stats = json.loads(data) if data else {}
+    except ValueError:
+        stats = {}
+    return {"hook": hook, "ms": wall_ms, "rc": proc.returncode, **stats}
+
+
+def replay_stream(events: list[dict], suffix: str, repeat: int, env: dict) -> list[dict]:
+    results = []
+    for _ in range(repeat):
+        for event in events:
+            results.append(run_event(event["hook"], with_session_suffix(event.get("stdin", ""), suffix), env))
+    return results
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    return sorted_values[max(1, math.ceil(pct / 100 * len(sorted_values))) - 1]
+
+
+def summarize(results: list[dict], workspace: str) -> dict[str, dict]:
+    by_hook: dict[str, list[dict]] = {}
+    for result in results:
+        by_hook.setdefault(result["hook"], []).append(result)
+    summary = {}
+    for hook, runs in sorted(by_hook.items()):
+        ms = sorted(r["ms"] for r in runs)
+        files = {}
+        for r in runs:
+            for path, write in r.get("files", {}).items():
+                path = path.replace(workspace, "$WS")
+                for pattern, repl in PATH_NOISE:
+                    path = pattern.sub(repl, path)
+                files[path] = files.get(path, False) or write
+        rss = [r["rss_kb"] for r in runs if "rss_kb" in r]
+        syscalls = [r["syscr"] + r["syscw"] for r in runs if "syscr" in r and "syscw" in r]
+        summary[hook] = {
+            "runs": len(runs),
+            "errors": sum(1 for r in runs if r["rc"] != 0),
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99),
+            "rss_mb": statistics.median(rss) / 1024 if rss else None,
+            "syscalls": statistics.median(syscalls) if syscalls else None,
+            "files": dict(sorted(files.items())),
+        }
+    return summary
+
+
+def print_summary(level: int, summary: dict[str, dict], wall_s: float, list_files: bool) -> None:
+    runs = sum(s["runs"] for s in summary.values())
+    print(f"\nconcurrency {level}: {runs} hook runs in {wall_s:.1f} s ({runs / wall_s:.0f}/s)")
+    print(f"{'hook':24} {'runs':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'RSS MB':>7} {'syscalls':>9} {'files':>6}")
+    for hook, s in summary.items():
+        rss = f"{s['rss_mb']:.1f}" if s["rss_mb"] is not None else "-"
+        syscalls = f"{s['syscalls']:.0f}" if s["syscalls"] is not None else "-"
+        print(f"{hook:24} {s['runs']:>5} {s['errors']:>4} {s['p50']:>8.1f} {s['p95']:>8.1f}"
+              f" {s['p99']:>8.1f} {rss:>7} {syscalls:>9} {len(s['files']):>6}")
+        if list_files:
+            for path, write in s["files"].items():
+                print(f"    {'w' if write else 'r'} {path}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for level, hooks in results.items():
+        for hook, s in hooks.items():
+            base = baseline.get(level, {}).get(hook)
+            if base and s["p95"] > base["p95"] * (1 + tolerance):
+                regressions.append(
+                    f"concurrency {level} {hook}: p95 {s['p95']:.1f} ms vs baseline {base['p95']:.1f} ms"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus", nargs="*", type=Path, default=[DEFAULT_CORPUS])
+    parser.add_argument("--concurrency", default="1,8", help="comma-separated levels")
+    parser.add_argument("--repeat", type=int, default=3, help="replays of each stream per copy")
+    parser.add_argument("--daemon", action="store_true", help="serve hooks from a hook daemon")
+    parser.add_argument("--files", action="store_true", help="list the files each hook touched")
+    parser.add_argument("--json", type=Path, help="write the summary here")
+    parser.add_argument("--baseline", type=Path, help="summary to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    streams, catalog = load_corpus(args.corpus)
+    if not streams:
+        print("no events in corpus")
+        return 1
+    workspace = tempfile.mkdtemp(prefix="hook-replay-")
+    env = dict(os.environ, MCP_WORKSPACE=workspace)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # installed hooks run with cached bytecode
+    for key in ("GEMINI_HOOK_TRACE", "GEMINI_HOOK_RECORD"):
+        env.pop(key, None)
+    seed_workspace(env, catalog)
+
+    daemon = None
+    if args.daemon:
+        env["GEMINI_HOOK_DAEMON_SOCKET"] = os.path.join(workspace, "hooks.sock")
+        daemon = [sys.executable, str(HOOKS_DIR / "hook-daemon.py")]
+        subprocess.run([*daemon, "start"], env=env, check=True, stdout=subprocess.DEVNULL)
+    else:
+        env["GEMINI_HOOK_DAEMON"] = "0"
+
+    events = sum(len(e) for e in streams.values())
+    print(f"{len(streams)} streams, {events} events, repeat {args.repeat}, "
+          f"{'daemon' if args.daemon else 'in-process'}, workspace {workspace}")
+    results = {}
+    errors = 0
+    try:
+        for level in (int(n) for n in args.concurrency.split(",")):
+            jobs = [
+                (stream, f"-c{copy}" if level > 1 else "")
+                for copy in range(level)
+                for stream in streams.values()
+            ]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                batches = pool.map(lambda job: replay_stream(job[0], job[1], args.repeat, env), jobs)
+                runs = [r for batch in batches for r in batch]
+            summary = summarize(runs, workspace)
+            print_summary(level, summary, time.perf_counter() - start, args.files)
+            results[str(level)] = summary
+            errors += sum(s["errors"] for s in summary.values())
+    finally:
+        if daemon:
+            subprocess.run([*daemon, "stop"], env=env, stdout=subprocess.DEVNULL)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    failures = []
+    if errors:
+        failures.append(f"{errors} hook runs exited nonzero")
+    if args.baseline:
+        failures += compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
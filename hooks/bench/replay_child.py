@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Run one hook script and report what it cost; used by replay.py.
+
+    REPLAY_STATS_FD=<fd> python3 replay_child.py <hook script>
+
+Runs the script as ``__main__`` with an audit hook that notes every file it
+opens, connects to (sqlite), renames or removes, skipping interpreter and
+source files. At exit, writes one JSON object to REPLAY_STATS_FD:
+
+    {"rss_kb": 9216, "syscr": 41, "syscw": 3, "files": {"/path": true}}
+
+``rss_kb`` is the process's peak RSS (VmHWM), ``syscr``/``syscw`` its read and
+write syscall counts from /proc/self/io, and ``files`` maps each path touched
+to whether it was opened for writing. Fields missing on the platform are
+omitted. The hook's exit status is preserved.
+"""
+
+import os
+import runpy
+import sys
+
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT
+SKIP_PREFIXES = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix})
+
+files: dict[str, bool] = {}
+recording = True  # audit hooks cannot be removed; this stops them at exit
+
+
+def audit(event: str, args: tuple) -> None:
+    if not recording:
+        return
+    if event == "open":
+        path, mode, flags = args
+        write = bool(mode and any(c in mode for c in "wax+")) or bool(flags and flags & WRITE_FLAGS)
+    elif event == "sqlite3.connect":
+        path, write = args[0], True
+    elif event == "os.rename":
+        path, write = args[1], True
+    elif event == "os.remove":
+        path, write = args[0], True
+    else:
+        return
+    if isinstance(path, int) or path is None:
+        return
+    path = os.fsdecode(path)
+    if path.endswith((".py", ".pyc")) or "__pycache__" in path or path.startswith(SKIP_PREFIXES):
+        return
+    files[path] = files.get(path, False) or write
+
+
+def proc_fields(name: str, keys: tuple[str, ...]) -> dict:
+    stats = {}
+    try:
+        with open(f"/proc/self/{name}") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in keys:
+                    stats[key] = int(value.split()[0])
+    except (OSError, ValueError):
+        pass
+    return stats
+
+
+def report(fd: int) -> None:
+    global recording
+    recording = False
+    import json
+
+    status = proc_fields("status", ("VmHWM",))
+    io_stats = proc_fields("io", ("syscr", "syscw"))
+    stats = {"files": dict(files)}
+    if "VmHWM" in status:
+        stats["rss_kb"] = status["VmHWM"]
+    stats.update(io_stats)
+    os.write(fd, json.dumps(stats).encode())
+    os.close(fd)
+
+
+def main() -> None:
+    script = os.path.abspath(sys.argv[1])
+    fd = int(os.environ.pop("REPLAY_STATS_FD"))
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(script)
+    sys.addaudithook(audit)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        report(fd)
+
+
+if __name__ == "__main__":
+    main()
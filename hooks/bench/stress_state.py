@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Chain-state consistency and tail latency under many concurrent agents.
+
+    python3 hooks/bench/stress_state.py [--sessions 300] [--workers 24] [--updates 200]
+                                        [--hooks 600] [--parallel 32] [--max-p99-ms 4500]
+
+Two phases against a throwaway MCP_WORKSPACE, with tracing on so CAS retries
+and lock waits are counted:
+
+store   ``--workers`` processes each apply ``--updates`` read-modify-write
+        increments through state_store.update() to random sessions, moving
+        the pending gate on every write. Afterwards the counters must add up
+        to workers x updates (no lost update) and every pending-gate sidecar
+        must carry the store's version and gate.
+
+hooks   ``--hooks`` after-tool.py and gate-enforce.py processes, up to
+        ``--parallel`` at once, for random sessions. after-tool gets
+        structured chain_state, so the shared lib's text parser is not
+        needed. Every run must exit 0 with empty or JSON output, the
+        sidecars must match the store afterwards, and each hook's p99 wall
+        time must stay under ``--max-p99-ms`` (Gemini kills hooks at 5 s).
+
+Exits 1 on any failed check.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HOOKS_DIR))
+
+GATES = (None, "review", None, "quality")
+
+
+def pct(samples: list[float], p: float) -> float:
+    return samples[max(1, math.ceil(p / 100 * len(samples))) - 1]
+
+
+def bump(state: dict | None) -> dict:
+    count = (state or {}).get("count", 0) + 1
+    return {"current_step": 1 + count % 3, "total_steps": 3, "count": count,
+            "pending_gate": GATES[count % len(GATES)], "gate_criteria": []}
+
+
+def store_worker(sessions: int, updates: int, seed: int, results) -> None:
+    from gemini_lib import state_store, trace
+
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(updates):
+        sid = f"s{rng.randrange(sessions)}"
+        trace.begin("stress-update", where="bench")
+        trace.note(session=sid)
+        start = time.perf_counter()
+        state_store.update(sid, bump)
+        samples.append((time.perf_counter() - start) * 1000)
+        trace.finish()
+    results.extend(samples)
+
+
+def check_index(sessions: list[str]) -> list[str]:
+    """Sessions whose pending-gate sidecar disagrees with the store."""
+    from gemini_lib import gate_index, state_store
+
+    mismatched = []
+    for sid in sessions:
+        state, version = state_store.load_versioned(sid)
+        with open(gate_index._sidecar(sid), "rb") as f:
+            indexed_version, _, gate = f.read().decode().partition("\t")
+        if int(indexed_version) != version or (gate or None) != (state or {}).get("pending_gate"):
+            mismatched.append(f"{sid}: store v{version} {state and state.get('pending_gate')!r}, "
+                              f"index v{indexed_version} {gate!r}")
+    return mismatched
+
+
+def run_store(args) -> list[str]:
+    from gemini_lib import state_store
+
+    manager = mp.Manager()
+    results = manager.list()
+    procs = [mp.Process(target=store_worker, args=(args.sessions, args.updates, i, results))
+             for i in range(args.workers)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - start
+    samples = sorted(results)
+
+    failures = [f"store worker exited {p.exitcode}" for p in procs if p.exitcode]
+    sessions = [f"s{n}" for n in range(args.sessions)]
+    total = sum((state_store.load(sid) or {}).get("count", 0) for sid in sessions)
+    expected = args.workers * args.updates
+    if total != expected:
+        failures.append(f"lost updates: counters sum to {total}, expected {expected}")
+    failures += [f"index mismatch {m}" for m in check_index(sessions)]
+
+    print(f"store: {args.workers} workers x {args.updates} updates over {args.sessions} sessions, "
+          f"{len(samples) / wall:.0f} updates/s")
+    print(f"  update ms   p50 {pct(samples, 50):.2f}  p99 {pct(samples, 99):.2f}  max {samples[-1]:.2f}")
+    print(f"  counters    {total}/{expected}")
+    return failures
+
+
+def run_hook(script: str, raw: str, env: dict) -> tuple[str, float, int, str]:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, str(HOOKS_DIR / script)], input=raw, env=env,
+                          capture_output=True, text=True)
+    return script, (time.perf_counter() - start) * 1000, proc.returncode, proc.stdout
+
+
+def hook_payload(rng: random.Random, sessions: int) -> tuple[str, str]:
+    sid = f"h{rng.randrange(sessions)}"
+    if rng.random() < 0.5:
+        step = rng.randrange(1, 4)
+        chain_state = {"chain_id": f"{sid}#1", "current_step": step, "total_steps": 3,
+                       "pending_gate": rng.choice(GATES), "gate_criteria": ["tests pass"]}
+        return "after-tool.py", json.dumps({
+            "session_id": sid, "tool_name": "prompt_engine",
+            "tool_input": {"chain_id": f"{sid}#1"},
+            "tool_response": {"content": [{"type": "text", "text": f"Step {step} of 3"}],
+                              "structuredContent": {"chain_state": chain_state}},
+        })
+    return "gate-enforce.py", json.dumps({
+        "session_id": sid, "tool_name": "prompt_engine",
+        "tool_input": {"chain_id": f"{sid}#1", "command": ">>next"},
+    })
+
+
+def run_hooks(args, env: dict) -> list[str]:
+    rng = random.Random(7)
+    jobs = [hook_payload(rng, args.sessions) for _ in range(args.hooks)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        runs = list(pool.map(lambda job: run_hook(job[0], job[1], env), jobs))
+    wall = time.perf_counter() - start
+
+    failures = []
+    by_script: dict[str, list[float]] = {}
+    for script, ms, rc, stdout in runs:
+        by_script.setdefault(script, []).append(ms)
+        if rc != 0:
+            failures.append(f"{script} exited {rc}")
+        elif stdout.strip():
+            try:
+                json.loads(stdout)
+            except ValueError:
+                failures.append(f"{script} printed non-JSON: {stdout[:80]!r}")
+    touched = sorted({json.loads(raw)["session_id"] for script, raw in jobs if script == "after-tool.py"})
+    failures += [f"index mismatch {m}" for m in check_index(touched)]
+
+    print(f"\nhooks: {len(runs)} hook processes, {args.parallel} at once, {len(runs) / wall:.0f}/s")
+    for script, samples in sorted(by_script.items()):
+        samples.sort()
+        p99 = pct(samples, 99)
+        print(f"  {script:16} n {len(samples):5}  p50 {pct(samples, 50):7.1f}  p99 {p99:7.1f}"
+              f"  max {samples[-1]:7.1f} ms")
+        if p99 > args.max_p99_ms:
+            failures.append(f"{script} p99 {p99:.0f} ms over {args.max_p99_ms:.0f} ms")
+    return failures
+
+
+def print_contention(trace_file: str) -> None:
+    from gemini_lib.trace_report import aggregate, aggregate_counters, format_counters, load_records
+
+    records = load_records(trace_file)
+    counters = aggregate_counters(records)
+    print("\ncontention")
+    if not counters:
+        print("  none recorded")
+        return
+    runs = {key: len(phases["total"]) for key, phases in aggregate(records).items()}
+    print(format_counters(counters, runs))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=24, help="store-phase processes")
+    parser.add_argument("--updates", type=int, default=200, help="updates per store worker")
+    parser.add_argument("--hooks", type=int, default=600, help="hook processes in the hooks phase (0 skips it)")
+    parser.add_argument("--parallel", type=int, default=32, help="hook processes running at once")
+    parser.add_argument("--max-p99-ms", type=float, default=4500.0)
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix="state-stress-")
+    trace_file = os.path.join(workspace, "trace.jsonl")
+    os.environ.update(MCP_WORKSPACE=workspace, GEMINI_HOOK_STATE_MIRROR="0",
+                      GEMINI_HOOK_TRACE="1", GEMINI_HOOK_TRACE_FILE=trace_file)
+    env = dict(os.environ, GEMINI_HOOK_DAEMON="0")
+    env.pop("GEMINI_HOOK_RECORD", None)
+
+    failures = run_store(args)
+    if args.hooks:
+        failures += run_hooks(args, env)
+    print_contention(trace_file)
+
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    if len(failures) > 20:
+        print(f"FAIL ... {len(failures) - 20} more")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,79 +10,106 @@ Gemini adaptation of Claude's gate-enforce.py — uses top-level
 decision/reason instead of hookSpecificOutput.permissionDecision.
 """
 
-import json
-import re
 import sys
 import os
-from pathlib import Path
 
 # Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
-sys.path.insert(0, str(Path(__file__).parent / "lib"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
 
 # Default workspace root to extension root, without overriding user config
-os.environ.setdefault("MCP_WORKSPACE", str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-from session_state import load_session_state
+from gemini_lib import trace
+from gemini_lib.runner import run_hook
 
+# Compiled on first use (re caches them); most calls carry no verdict
+FAIL_VERDICT = r'GATE_REVIEW:\s*FAIL'
+FAIL_REASON = r'FAIL\s*[-:]\s*(.+)'
+PASS_VERDICT = r'GATE_REVIEW:\s*PASS'
 
-def parse_hook_input() -> dict:
-    """Parse JSON input from Gemini hook system."""
-    try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
-        return {}
 
+def deny(session_id: str | None, chain_id: str, reason: str, guidance: str) -> dict:
+    """Build a Gemini-format deny decision, and record its reason in the chain timeline."""
+    from gemini_lib import timeline
 
-def deny(reason: str) -> None:
-    """Output a Gemini-format deny decision and exit."""
-    print(json.dumps({"decision": "deny", "reason": reason}))
-    sys.exit(0)
+    timeline.record(session_id, "deny", c=chain_id, r=reason)
+    return {"decision": "deny", "reason": f"{reason} {guidance}"}
 
 
-def main():
-    hook_input = parse_hook_input()
+def lookup_pending_gate(session_id: str) -> str | None:
+    """Pending gate from the sidecar index; the session store only if unindexed."""
+    from gemini_lib import gate_index
 
-    tool_name = (
-        hook_input.get("tool_name", "")
-        or hook_input.get("toolName", "")
-        or hook_input.get("name", "")
-    )
+    indexed, gate = gate_index.pending_gate(session_id)
+    if indexed:
+        return gate
+
+    from gemini_lib import state_store
+
+    state = state_store.load(session_id)
+    return state.get("pending_gate") if state else None
+
+
+def continue_call(session_id: str) -> str | None:
+    """Continuation call after-tool.py resolved for the session (deny path only)."""
+    from gemini_lib import state_store
+
+    state = state_store.load(session_id)
+    return ((state or {}).get("next_step") or {}).get("call")
+
+
+def has_work(raw: str) -> bool:
+    """Pre-parse test: only prompt_engine calls are checked."""
+    return "prompt_engine" in raw
+
+
+def handle(raw: str) -> dict | None:
+    from gemini_lib.event import decode
+
+    with trace.span("parse"):
+        event = decode(raw)
 
     # Only process prompt_engine calls
-    if "prompt_engine" not in tool_name:
-        sys.exit(0)
+    if "prompt_engine" not in event.tool_name:
+        return None
 
-    tool_input = (
-        hook_input.get("tool_input", {})
-        or hook_input.get("toolInput", {})
-        or {}
-    )
+    tool_input = event.tool_input
 
     # Extract parameters
     chain_id = tool_input.get("chain_id", "")
     gate_verdict = tool_input.get("gate_verdict", "")
+    session_id = event.session_id
 
     # Check 1: FAIL verdict should trigger retry guidance
     if gate_verdict:
-        fail_match = re.search(r'GATE_REVIEW:\s*FAIL', gate_verdict, re.IGNORECASE)
+        import re
+
+        from gemini_lib import timeline
+
+        fail_match = re.search(FAIL_VERDICT, gate_verdict, re.IGNORECASE)
         if fail_match:
-            reason_match = re.search(r'FAIL\s*[-:]\s*(.+)', gate_verdict, re.IGNORECASE)
+            reason_match = re.search(FAIL_REASON, gate_verdict, re.IGNORECASE)
             reason = reason_match.group(1).strip()[:50] if reason_match else "unspecified"
-            deny(f"Gate FAIL: {reason}. Improve and retry with PASS.")
+            timeline.record(session_id, "verdict", c=chain_id, v="FAIL", r=reason)
+            return deny(session_id, chain_id, f"Gate FAIL: {reason}.", "Improve and retry with PASS.")
+        if re.search(PASS_VERDICT, gate_verdict, re.IGNORECASE):
+            timeline.record(session_id, "verdict", c=chain_id, v="PASS")
 
     # Check 2: Resuming chain without required gate_verdict
     if chain_id and not gate_verdict:
-        session_id = hook_input.get("session_id", "") or hook_input.get("sessionId", "")
-        state = load_session_state(session_id) if session_id else None
+        trace.note(session=session_id)
+        with trace.span("gate_lookup"):
+            gate = lookup_pending_gate(session_id) if session_id else None
 
-        if state and state.get("pending_gate"):
-            gate = state['pending_gate']
-            deny(f"Gate pending: {gate}. Submit gate_verdict first.")
+        if gate:
+            guidance = "Submit gate_verdict first."
+            call = continue_call(session_id)
+            return deny(session_id, chain_id, f"Gate pending: {gate}.",
+                        f"{guidance} Call: {call}" if call else guidance)
 
     # All checks passed — allow tool execution
-    print(json.dumps({"decision": "allow"}))
-    sys.exit(0)
+    return {"decision": "allow"}
 
 
 if __name__ == "__main__":
-    main()
+    run_hook("gate-enforce", handle, precheck=has_work)
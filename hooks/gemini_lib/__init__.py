@@ -0,0 +1,6 @@
+"""
+Gemini-specific hook helpers.
+
+lib/ is the shared claude-prompts package and is replaced on every npm update,
+so anything that only the Gemini adapter needs lives here instead.
+"""
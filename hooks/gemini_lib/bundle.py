@@ -0,0 +1,257 @@
+"""
+Prebuilt, precompiled bundles of the hook scripts.
+
+A hook run from source compiles its script on every run, since ``__main__``
+is never cached. It also compiles each imported module whose ``__pycache__``
+entry is missing or cannot be written (first run, read-only install), and
+resolves the ``lib`` symlink into node_modules. ``build()`` packs each hook in
+HOOKS into ``hooks/dist/<hook>.pyz``. The zipapp holds:
+
+    __main__.py        bootstrap (below), and __main__.pyc, its compiled form
+    _hook.pyc          the hook script, compiled
+    gemini_lib/*.pyc   the gemini_lib modules the script imports
+    *.pyc              the shared lib modules it imports (and, for stop,
+                       ralph-stop.py as ralph_stop)
+
+Modules are found with modulefinder, lazy imports inside functions
+included. Only modules under hooks/ and the resolved lib/ directory are
+packed; the standard library comes from the interpreter. The .pyc files
+are unchecked hash-based pycs, stored uncompressed.
+
+The bootstrap checks that the interpreter's cache tag matches the build, and
+that every bundled source still has the size and mtime it had at build time.
+If so, it runs ``_hook`` with ``__file__`` and gemini_lib.paths pointing at
+the real hooks directory, so the script's own path handling is unchanged.
+The ``hooks/lib`` entry the script puts on sys.path is served from the
+bundle, and modules the build could not find are still imported from the
+resolved lib directory. Otherwise (a Python upgrade, an edited hook, an
+``npm update`` of the shared lib) it runs the source script instead, so a
+stale bundle is never wrong, only slower.
+
+hooks.json runs ``run-hook.py <hook>`` for these hooks, which starts the bundle when it
+exists and the source script when it does not. A missing bundle therefore
+never fails a hook. package.json's postinstall builds the bundles; rebuild
+them by hand with ``python3 hooks/hook-bundle.py build``.
+"""
+
+import os
+import sys
+
+from gemini_lib.paths import HOOKS_DIR
+
+DIST_DIR = os.path.join(HOOKS_DIR, "dist")
+
+# Hook name -> script; stop additionally bundles ralph-stop.py from the shared hooks.
+# ralph-context-tracker is not bundled: its idle exit is cheaper than the launcher.
+HOOKS = {
+    "before-agent": "before-agent.py",
+    "gate-enforce": "gate-enforce.py",
+    "after-tool": "after-tool.py",
+    "pre-compact": "pre-compact.py",
+    "stop": "stop.py",
+}
+
+BOOTSTRAP = '''\
+# Generated by hook-bundle.py: {script} and the modules it imports, compiled
+# for {cache_tag}. Runs the source script instead when the bundle is stale.
+import os
+import sys
+
+_HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+_CACHE_TAG = {cache_tag!r}
+_SOURCES = {sources!r}
+
+
+def _fresh():
+    if sys.implementation.cache_tag != _CACHE_TAG:
+        return False
+    for path, mtime_ns, size in _SOURCES:
+        try:
+            st = os.stat(os.path.join(_HOOKS_DIR, path))
+        except OSError:
+            return False
+        if st.st_mtime_ns != mtime_ns or st.st_size != size:
+            return False
+    return True
+
+
+__file__ = os.path.join(_HOOKS_DIR, {script!r})
+if _fresh():
+    import zipimport
+
+    # The script puts hooks/lib first on sys.path: serve that entry from the
+    # bundle, and anything not bundled from the resolved lib directory.
+    _bundle = zipimport.zipimporter(sys.path[0])
+    sys.path_importer_cache[os.path.join(_HOOKS_DIR, "lib")] = _bundle
+    sys.path.append(os.path.realpath(os.path.join(_HOOKS_DIR, "lib")))
+    from gemini_lib import paths as _paths
+
+    _paths.HOOKS_DIR = _HOOKS_DIR
+    exec(_bundle.get_code("_hook"), globals())
+else:
+    sys.path[0] = _HOOKS_DIR
+    with open(__file__, "rb") as _f:
+        exec(compile(_f.read(), __file__, "exec"), globals())
+'''
+
+
+def shared_lib_dir() -> str | None:
+    """The resolved lib/ directory, or None when the symlink is dangling."""
+    path = os.path.realpath(os.path.join(HOOKS_DIR, "lib"))
+    return path if os.path.isdir(path) else None
+
+
+def bundle_path(hook: str) -> str:
+    return os.path.join(DIST_DIR, f"{hook}.pyz")
+
+
+def find_modules(scripts: list[str], search: list[str]) -> dict[str, str]:
+    """Module name -> source file for everything ``scripts`` import from ``search``."""
+    from modulefinder import ModuleFinder
+
+    finder = ModuleFinder(path=search)
+    for script in scripts:
+        finder.run_script(script)
+    roots = tuple(os.path.join(os.path.realpath(d), "") for d in search)
+    modules = {}
+    for name, module in finder.modules.items():
+        source = module.__file__
+        if name == "__main__" or not source or not source.endswith(".py"):
+            continue
+        if os.path.realpath(source).startswith(roots):
+            modules[name] = os.path.realpath(source)
+    return modules
+
+
+def _pyc(source: bytes, filename: str) -> bytes:
+    """An unchecked hash-based pyc: never compared with its source."""
+    import importlib.util
+    import marshal
+
+    code = compile(source, filename, "exec", dont_inherit=True)
+    flags = (0b01).to_bytes(4, "little")
+    return importlib.util.MAGIC_NUMBER + flags + importlib.util.source_hash(source) + marshal.dumps(code)
+
+
+def _archive_name(name: str, source: str) -> str:
+    parts = name.split(".")
+    if os.path.basename(source) == "__init__.py":
+        parts.append("__init__")
+    return "/".join(parts) + ".pyc"
+
+
+def _stamp(path: str) -> tuple[str, int, int]:
+    st = os.stat(path)
+    return os.path.relpath(path, HOOKS_DIR), st.st_mtime_ns, st.st_size
+
+
+def build_one(hook: str, lib: str) -> dict:
+    """Write dist/<hook>.pyz; returns what went into it."""
+    import zipfile
+
+    script = os.path.realpath(os.path.join(HOOKS_DIR, HOOKS[hook]))
+    # archive name -> source file
+    entries = {"_hook.pyc": script}
+    ralph_stop = os.path.join(os.path.dirname(lib), "ralph-stop.py")
+    if hook == "stop" and os.path.exists(ralph_stop):
+        entries["ralph_stop.pyc"] = ralph_stop
+    modules = find_modules(list(entries.values()), [HOOKS_DIR, lib])
+    for name, source in modules.items():
+        entries[_archive_name(name, source)] = source
+
+    sources = sorted(_stamp(source) for source in entries.values())
+    main = BOOTSTRAP.format(script=HOOKS[hook], cache_tag=sys.implementation.cache_tag, sources=sources)
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    target = bundle_path(hook)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+            # zipimport prefers __main__.pyc: the bootstrap is not compiled per run either
+            zf.writestr("__main__.py", main)
+            zf.writestr("__main__.pyc", _pyc(main.encode(), os.path.join(target, "__main__.py")))
+            for name, source in sorted(entries.items()):
+                with open(source, "rb") as f:
+                    zf.writestr(name, _pyc(f.read(), source))
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return {"hook": hook, "modules": sorted(modules), "bytes": os.path.getsize(target)}
+
+
+def build(hooks: list[str] | None = None) -> list[dict]:
+    lib = shared_lib_dir()
+    if lib is None:
+        raise RuntimeError("hooks/lib does not resolve; run npm install first")
+    return [build_one(hook, lib) for hook in hooks or HOOKS]
+
+
+def status(hook: str) -> str:
+    """"missing", "stale" or "fresh", by the checks the bundle's bootstrap makes."""
+    import ast
+    import zipfile
+
+    try:
+        with zipfile.ZipFile(bundle_path(hook)) as zf:
+            tree = ast.parse(zf.read("__main__.py"))
+    except (OSError, KeyError, SyntaxError, zipfile.BadZipFile):
+        return "missing"
+    values = {
+        node.targets[0].id: node.value
+        for node in tree.body
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+    }
+    try:
+        cache_tag = ast.literal_eval(values["_CACHE_TAG"])
+        sources = ast.literal_eval(values["_SOURCES"])
+    except (KeyError, ValueError):
+        return "stale"
+    if cache_tag != sys.implementation.cache_tag:
+        return "stale"
+    for path, mtime_ns, size in sources:
+        try:
+            st = os.stat(os.path.join(HOOKS_DIR, path))
+        except OSError:
+            return "stale"
+        if st.st_mtime_ns != mtime_ns or st.st_size != size:
+            return "stale"
+    return "fresh"
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompiled hook bundles (hooks/dist/*.pyz)")
+    parser.add_argument("command", nargs="?", default="status", choices=["build", "status", "clean"])
+    parser.add_argument("hooks", nargs="*", metavar="hook", help=f"default: all ({', '.join(HOOKS)})")
+    parser.add_argument("--quiet", action="store_true", help="report only failures, and exit 0 on them (postinstall)")
+    args = parser.parse_args(argv)
+    unknown = [hook for hook in args.hooks if hook not in HOOKS]
+    if unknown:
+        parser.error(f"unknown hook: {', '.join(unknown)}")
+    hooks = args.hooks or list(HOOKS)
+
+    if args.command == "build":
+        try:
+            results = build(hooks)
+        except Exception as exc:
+            print(f"hook bundles not built ({exc}); hooks run from source", file=sys.stderr)
+            return 0 if args.quiet else 1
+        if not args.quiet:
+            for result in results:
+                print(f"{result['hook']:24} {result['bytes'] / 1024:7.1f} KB  "
+                      f"{len(result['modules'])} modules")
+        return 0
+
+    if args.command == "clean":
+        for hook in hooks:
+            try:
+                os.unlink(bundle_path(hook))
+            except FileNotFoundError:
+                pass
+        return 0
+
+    for hook in hooks:
+        print(f"{hook:24} {status(hook)}")
+    return 0
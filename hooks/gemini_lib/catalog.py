@@ -0,0 +1,79 @@
+"""
+Process-level prompt catalog.
+
+Wraps cache_manager.load_prompts_cache() with a stat check on the cache file:
+the parsed catalog is kept for the life of the process (the hook daemon keeps
+it across requests) and only re-read when the file's mtime or size changes.
+"""
+
+import os
+
+CACHE_FILENAME = "prompts.cache.json"
+
+_catalog: dict | None = None
+_version: tuple[int, int] | None = None
+
+
+def catalog_path() -> str | None:
+    """Location of the prompts cache written by the MCP server, if known."""
+    import cache_manager
+
+    get_cache_dir = getattr(cache_manager, "get_cache_dir", None)
+    if get_cache_dir is None:
+        return None
+    return os.path.join(get_cache_dir(), CACHE_FILENAME)
+
+
+def _stat_version(path: str | None) -> tuple[int, int] | None:
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def current_version() -> tuple[int, int] | None:
+    """(mtime_ns, size) of the cache file on disk, without reading it."""
+    return _stat_version(catalog_path())
+
+
+def get_catalog() -> dict | None:
+    """
+    Return the prompts cache, re-reading it only when the file changed.
+
+    Falls back to an uncached load_prompts_cache() call when the cache file
+    location cannot be determined.
+    """
+    global _catalog, _version
+    from cache_manager import load_prompts_cache
+
+    version = current_version()
+    if version is None:
+        _catalog, _version = None, None
+        return load_prompts_cache()
+    if _catalog is not None and version == _version:
+        return _catalog
+
+    _catalog = load_prompts_cache()
+    # Version was taken before reading: if the server rewrites the file
+    # mid-read, the next call sees a newer version and reloads.
+    _version = version if _catalog else None
+    return _catalog
+
+
+def catalog_version() -> tuple[int, int] | None:
+    """(mtime_ns, size) of the catalog currently held, for keying derived caches."""
+    return _version
+
+
+def iter_prompts(cache: dict):
+    """Yield (prompt_id, info) for every prompt in a prompts cache."""
+    prompts = cache.get("prompts", {})
+    if isinstance(prompts, dict):
+        yield from prompts.items()
+    else:
+        for info in prompts:
+            if isinstance(info, dict) and info.get("id"):
+                yield info["id"], info
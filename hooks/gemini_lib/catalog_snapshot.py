@@ -0,0 +1,255 @@
+"""
+Compact, memory-mapped projection of the prompt catalog for hook lookups.
+
+before-agent.py only needs a prompt's id, category, is_chain, chain_steps and
+arguments (name/default). Loading the full prompts cache for that grows with
+the catalog, so each catalog version is projected once into a snapshot file
+in the Gemini state directory:
+
+    header   magic, format, catalog (mtime_ns, size), entry count
+    entries  count x (key offset, key length, record offset, record length),
+             ordered by lower-cased prompt id so that ids differing only in
+             case are adjacent (the table is never binary-searched)
+    slots    open-addressed hash table (crc32 of the key, linear probing) of
+             1 + the first entry index for each key; 0 marks an empty slot
+    keys     lower-cased prompt ids, UTF-8
+    records  one marshal-encoded projection per prompt
+
+The file is mmap'ed and a lookup is a hash probe into the slot table that
+decodes only the matching record, so per-lookup cost and resident memory stay
+flat as the catalog grows. (Format 1 binary-searched the entry table; format
+2 replaced that with the slot table.) Ids match exactly first, then case-insensitively
+(first in catalog order), as cache_manager.get_prompt_by_id does.
+
+The snapshot is rebuilt, from one full catalog load, by the first lookup that
+sees a new catalog version.
+"""
+
+import marshal
+import mmap
+import os
+import struct
+import zlib
+
+from gemini_lib.catalog import catalog_version, current_version, get_catalog, iter_prompts
+from gemini_lib.paths import gemini_state_dir
+
+SNAPSHOT_FILENAME = "catalog-snapshot.bin"
+SNAPSHOT_MAGIC = b"GCSN"
+SNAPSHOT_FORMAT = 2
+
+HEADER = struct.Struct("<4sHqqI")
+ENTRY = struct.Struct("<IIII")
+SLOT = struct.Struct("<I")
+
+# Fields kept per prompt, and per argument
+PROMPT_FIELDS = ("id", "category", "is_chain", "chain_steps", "arguments")
+ARGUMENT_FIELDS = ("name", "default")
+
+
+def project(prompt_id: str, info: dict) -> dict:
+    """The subset of a catalog entry the hooks read."""
+    record = {field: info[field] for field in PROMPT_FIELDS if field in info}
+    record["id"] = prompt_id
+    arguments = record.get("arguments")
+    if isinstance(arguments, list):
+        record["arguments"] = [
+            {field: arg[field] for field in ARGUMENT_FIELDS if field in arg}
+            for arg in arguments
+            if isinstance(arg, dict)
+        ]
+    return record
+
+
+def slot_count(count: int) -> int:
+    """Hash slots for ``count`` entries: a power of two, at most half full."""
+    slots = 8
+    while slots < 2 * count:
+        slots *= 2
+    return slots
+
+
+def build(cache: dict, version: tuple[int, int]) -> bytes:
+    """Serialize a snapshot of ``cache`` stamped with the catalog ``version``."""
+    # Stable sort keeps catalog order among ids that differ only in case
+    prompts = sorted(
+        ((prompt_id.lower().encode(), project(prompt_id, info)) for prompt_id, info in iter_prompts(cache)),
+        key=lambda p: p[0],
+    )
+    keys = b"".join(key for key, _ in prompts)
+    records = [marshal.dumps(record) for _, record in prompts]
+
+    slots = slot_count(len(prompts))
+    table_slots = [0] * slots
+    for n, (key, _) in enumerate(prompts):
+        if n and prompts[n - 1][0] == key:
+            continue
+        slot = zlib.crc32(key) & (slots - 1)
+        while table_slots[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table_slots[slot] = n + 1
+
+    keys_at = HEADER.size + ENTRY.size * len(prompts) + SLOT.size * slots
+    record_at = keys_at + len(keys)
+    table = bytearray()
+    for (key, _), blob in zip(prompts, records):
+        table += ENTRY.pack(keys_at, len(key), record_at, len(blob))
+        keys_at += len(key)
+        record_at += len(blob)
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, version[0], version[1], len(prompts))
+    slot_table = struct.pack(f"<{slots}I", *table_slots)
+    return b"".join([header, bytes(table), slot_table, keys, *records])
+
+
+class Snapshot:
+    """Read-only view of a snapshot file."""
+
+    __slots__ = ("version", "count", "slots", "_slots_at", "_map")
+
+    def __init__(self, data, version: tuple[int, int], count: int):
+        self._map = data
+        self.version = version
+        self.count = count
+        self.slots = slot_count(count)
+        self._slots_at = HEADER.size + ENTRY.size * count
+
+    @classmethod
+    def open(cls, path: str) -> "Snapshot | None":
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, data) -> "Snapshot | None":
+        if len(data) < HEADER.size:
+            return None
+        magic, fmt, mtime_ns, size, count = HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+            return None
+        if len(data) < HEADER.size + ENTRY.size * count + SLOT.size * slot_count(count):
+            return None
+        return cls(data, (mtime_ns, size), count)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __bool__(self) -> bool:
+        return True  # an empty catalog still answers "not found"
+
+    def _key(self, n: int) -> bytes:
+        offset, length, _, _ = ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * n)
+        return self._map[offset:offset + length]
+
+    def _record(self, n: int) -> dict:
+        _, _, offset, length = ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * n)
+        return marshal.loads(self._map[offset:offset + length])
+
+    def _first(self, key: bytes) -> int:
+        """Table position of the first entry for ``key``, or -1."""
+        mask = self.slots - 1
+        n = zlib.crc32(key) & mask
+        while True:
+            (entry,) = SLOT.unpack_from(self._map, self._slots_at + SLOT.size * n)
+            if not entry:
+                return -1
+            if self._key(entry - 1) == key:
+                return entry - 1
+            n = (n + 1) & mask
+
+    def get(self, prompt_id: str) -> dict | None:
+        """Projected catalog entry for ``prompt_id``, or None."""
+        key = prompt_id.lower().encode()
+        n = self._first(key)
+        if n < 0:
+            return None
+        first = None
+        while n < self.count and self._key(n) == key:
+            record = self._record(n)
+            if record.get("id") == prompt_id:
+                return record
+            if first is None:
+                first = record
+            n += 1
+        return first
+
+    def missing(self, prompt_ids) -> list[str]:
+        """
+        The ids in ``prompt_ids`` with no entry, in their given order.
+
+        Probes the hash slots and compares keys only, never decoding a
+        record, so checking a whole chain costs about one get().
+        """
+        return [p for p in dict.fromkeys(prompt_ids) if self._first(p.lower().encode()) < 0]
+
+
+class CacheCatalog:
+    """Lookups against a full prompts cache, when no snapshot can be kept."""
+
+    __slots__ = ("cache",)
+
+    def __init__(self, cache: dict):
+        self.cache = cache
+
+    def get(self, prompt_id: str) -> dict | None:
+        from cache_manager import get_prompt_by_id
+
+        return get_prompt_by_id(prompt_id, self.cache)
+
+    def missing(self, prompt_ids) -> list[str]:
+        return [p for p in dict.fromkeys(prompt_ids) if self.get(p) is None]
+
+
+_snapshot: Snapshot | None = None
+
+
+def snapshot_path() -> str:
+    return os.path.join(gemini_state_dir(), SNAPSHOT_FILENAME)
+
+
+def _write_atomic(path: str, data: bytes) -> bool:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def get_snapshot() -> "Snapshot | CacheCatalog | None":
+    """
+    Prompt lookups for the current catalog version, or None without a catalog.
+
+    Checked in order: this process, the snapshot file, a rebuild from the
+    full catalog (persisted for the next process). When the catalog file
+    location is unknown, lookups go to the full cache as before.
+    """
+    global _snapshot
+    version = current_version()
+    if version is None:
+        cache = get_catalog()
+        return CacheCatalog(cache) if cache else None
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+
+    path = snapshot_path()
+    snapshot = Snapshot.open(path)
+    if snapshot is None or snapshot.version != version:
+        cache = get_catalog()
+        if not cache:
+            return None
+        # catalog_version() was taken before the cache was read
+        data = build(cache, catalog_version() or version)
+        snapshot = Snapshot.open(path) if _write_atomic(path, data) else None
+        if snapshot is None:
+            snapshot = Snapshot.from_buffer(data)
+    _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,246 @@
+"""
+Per-session ledger of the additionalContext the hooks inject.
+
+Over a long chain the same state text reached the model many times: the
+chain reminder on every user turn, the ``[Chain]``/``[Gate]`` block after
+every prompt_engine call, and the full reminder again before compaction.
+Hooks now pass their output through admit() as blocks of three kinds:
+
+- ``state``: text rendered from the session's chain state. It is dropped
+  when the same hook last injected it for the same state, going by a digest
+  of the fields the text is built from (state_digest()). Digests are kept
+  per hook: before-agent's chain reminder and after-tool's ``[Chain]``/
+  ``[Gate]`` block are different text, so one never suppresses the other.
+  Earlier output of the same hook stays in the conversation, so the model
+  still has it.
+- ``required``: always injected (prompt invocations, inline gate
+  instructions, the pre-compaction reminder).
+- ``optional``: injected only within the budget (framework warnings).
+
+pre-compact.py always injects the reminder and then calls compacted(). That
+clears the digests, so the first hook after compaction injects the state
+again.
+
+GEMINI_HOOK_CONTEXT_BUDGET sets a per-session budget in characters (default
+0, no limit). Every block injected counts against it. A block that no longer
+fits is cut: optional blocks are dropped, and state and required blocks are
+shortened to their short form, so chain state survives a long session in a
+line or two. A block's short form is given as a third tuple item; by
+default a state block becomes compact_state() (step counter, pending gate
+and continuation call) and a required block its first line. Set
+GEMINI_HOOK_CONTEXT_DEDUP=0 to inject state blocks every time.
+
+The ledger is ``runtime-state/gemini-hooks/context/<session>``, a small JSON
+file updated under the session's lock:
+
+    {"digests": {"before-agent": "5f1c09aa", "after-tool": "5f1c09aa"},
+     "chars": 1840, "saved": 5120, "dropped": 0, "runs": 14}
+
+``chars`` counts the characters injected, ``saved`` those skipped as
+duplicates and ``dropped`` those cut by the budget, whether the block was
+dropped or shortened. ``hook-context.py`` prints them per session, in
+characters and as estimated tokens (CHARS_PER_TOKEN). With tracing on, each
+run also reports ``context_saved_chars``, ``context_dropped_chars`` and
+``context_shortened_blocks``.
+"""
+
+import os
+
+from gemini_lib import trace
+from gemini_lib.paths import gemini_state_dir, session_filename
+
+LEDGER_DIR = "context"
+CHARS_PER_TOKEN = 4  # rough estimate for English text and code
+
+# The chain-state fields that state blocks are rendered from
+STATE_FIELDS = ("chain_id", "current_step", "total_steps", "pending_gate", "gate_criteria",
+                "pending_shell_verify")
+
+
+def _setting(name: str, default: int) -> int:
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def dedup_enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_CONTEXT_DEDUP", "1").lower() not in {"0", "false", "no"}
+
+
+def ledger_path(session_id: str) -> str:
+    return os.path.join(gemini_state_dir(), LEDGER_DIR, session_filename(session_id))
+
+
+def state_digest(state: dict | None) -> str:
+    """Digest of the chain state that state blocks are rendered from."""
+    import zlib
+
+    if not state:
+        return ""
+    fields = [state.get(field) for field in STATE_FIELDS]
+    fields.append((state.get("next_step") or {}).get("call"))
+    return format(zlib.crc32(repr(fields).encode()), "08x")
+
+
+def compact_state(state: dict | None) -> list[str]:
+    """The short form of a state block: ``[Chain] <id> step n/N``, the gate, the next call."""
+    if not state:
+        return []
+    parts = []
+    if state.get("current_step"):
+        chain = f"{state['chain_id']} " if state.get("chain_id") else ""
+        parts.append(f"[Chain] {chain}step {state['current_step']}/{state.get('total_steps', '?')}")
+    if state.get("pending_gate"):
+        parts.append(f"[Gate] {state['pending_gate']}")
+    lines = [" ".join(parts)] if parts else []
+    call = (state.get("next_step") or {}).get("call")
+    if call:
+        lines.append(f"  {call}")
+    return lines
+
+
+def load(session_id: str) -> dict:
+    import json
+
+    try:
+        with open(ledger_path(session_id)) as f:
+            ledger = json.load(f)
+        if isinstance(ledger, dict):
+            return ledger
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def _save(session_id: str, ledger: dict) -> None:
+    import json
+
+    path = ledger_path(session_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(ledger, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _size(lines: list[str]) -> int:
+    return sum(len(line) + 1 for line in lines)
+
+
+def admit(session_id: str | None, source: str, blocks: list[tuple],
+          state: dict | None = None) -> list[str]:
+    """
+    The lines of ``blocks`` that ``source`` should inject.
+
+    Each block is ``(kind, lines)`` or ``(kind, lines, short)``, ``short``
+    being the lines to inject in its place once the budget is used up.
+    ``state`` is the chain state the ``state`` blocks were rendered from;
+    ``source`` (the hook name) keys the digest they are compared with.
+    Records what was injected, skipped and cut in the session's ledger.
+    """
+    blocks = [block for block in blocks if block[1]]
+    if not session_id or not blocks:
+        return [line for block in blocks for line in block[1]]
+
+    from gemini_lib.locks import SessionLock
+
+    budget = _setting("GEMINI_HOOK_CONTEXT_BUDGET", 0)
+    digest = state_digest(state)
+    out: list[str] = []
+    saved = dropped = shortened = 0
+    with SessionLock(session_id):
+        ledger = load(session_id)
+        ledger.pop("digest", None)  # one digest shared by all hooks, from older ledgers
+        digests = ledger.setdefault("digests", {})
+        used = ledger.get("chars", 0)
+        for kind, lines, *short in blocks:
+            size = _size(lines)
+            if kind == "state":
+                if dedup_enabled() and digest and digests.get(source) == digest:
+                    saved += size
+                    continue
+                digests[source] = digest
+            if budget and used + size > budget:
+                if kind == "optional":
+                    dropped += size
+                    continue
+                if short:
+                    cut = short[0]
+                elif kind == "state":
+                    cut = compact_state(state) or lines[:1]
+                else:
+                    cut = lines[:1]
+                if _size(cut) < size:
+                    dropped += size - _size(cut)
+                    shortened += 1
+                    lines, size = cut, _size(cut)
+            used += size
+            out.extend(lines)
+        ledger["chars"] = used
+        ledger["saved"] = ledger.get("saved", 0) + saved
+        ledger["dropped"] = ledger.get("dropped", 0) + dropped
+        ledger["runs"] = ledger.get("runs", 0) + 1
+        _save(session_id, ledger)
+    if saved:
+        trace.count("context_saved_chars", saved)
+    if dropped:
+        trace.count("context_dropped_chars", dropped)
+    if shortened:
+        trace.count("context_shortened_blocks", shortened)
+    return out
+
+
+def compacted(session_id: str | None) -> None:
+    """Forget the injected state digests: compaction may have dropped that text."""
+    if not session_id:
+        return
+    from gemini_lib.locks import SessionLock
+
+    with SessionLock(session_id):
+        ledger = load(session_id)
+        cleared = ledger.pop("digests", None), ledger.pop("digest", None)
+        if cleared != (None, None):
+            _save(session_id, ledger)
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="additionalContext injected per session")
+    parser.add_argument("--session", help="only this session")
+    args = parser.parse_args(argv)
+
+    directory = os.path.join(gemini_state_dir(create=False), LEDGER_DIR)
+    try:
+        names = sorted(n for n in os.listdir(directory) if not n.endswith(".tmp"))
+    except OSError:
+        names = []
+    if args.session:
+        names = [n for n in names if n == session_filename(args.session)]
+    if not names:
+        print("no context recorded")
+        return 0
+
+    budget = _setting("GEMINI_HOOK_CONTEXT_BUDGET", 0)
+    print(f"{'session':40} {'runs':>6} {'injected':>9} {'saved':>9} {'dropped':>9} {'~tokens saved':>14}")
+    totals = [0, 0, 0, 0]
+    for name in names:
+        ledger = load(name)
+        row = [ledger.get(k, 0) for k in ("runs", "chars", "saved", "dropped")]
+        totals = [a + b for a, b in zip(totals, row)]
+        runs, chars, saved, dropped = row
+        tokens = (saved + dropped) // CHARS_PER_TOKEN
+        print(f"{name[:40]:40} {runs:>6} {chars:>9} {saved:>9} {dropped:>9} {tokens:>14}")
+    runs, chars, saved, dropped = totals
+    print(f"{'total':40} {runs:>6} {chars:>9} {saved:>9} {dropped:>9} "
+          f"{(saved + dropped) // CHARS_PER_TOKEN:>14}")
+    print(f"budget: {f'{budget} chars per session' if budget else 'none (GEMINI_HOOK_CONTEXT_BUDGET)'}, "
+          f"dedup {'on' if dedup_enabled() else 'off'}")
+    return 0
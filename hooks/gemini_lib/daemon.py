@@ -0,0 +1,261 @@
+"""
+Long-lived hook server.
+
+Keeps the hook scripts, and the shared lib modules they import, loaded in one
+process so a hook event costs a Unix socket round trip instead of interpreter
+startup plus imports. Clients are the hook scripts themselves (see runner.py).
+
+Requests are served one at a time: handlers read os.environ and the working
+directory, which are swapped to the caller's values for each request.
+"""
+
+import importlib.util
+import json
+import os
+import socket
+import sys
+from contextlib import contextmanager
+
+from gemini_lib import trace
+from gemini_lib.paths import HOOKS_DIR
+from gemini_lib.runner import is_forwarded, private_dir, socket_path
+
+# stop.py is not served: it fires once per session and ralph-stop writes
+# directly to stdout.
+HOOK_SCRIPTS = {
+    "before-agent": "before-agent.py",
+    "gate-enforce": "gate-enforce.py",
+    "after-tool": "after-tool.py",
+    "ralph-context-tracker": "ralph-context-tracker.py",
+    "pre-compact": "pre-compact.py",
+}
+
+# Shared lib modules the hooks import lazily; imported up front so the first
+# request after start is already warm.
+WARM_MODULES = (
+    "session_state",
+    "cache_manager",
+    "session_tracker",
+    "lesson_extractor",
+    "verify_active_store",
+)
+
+DEFAULT_IDLE_TIMEOUT = 1800  # seconds without a request before exiting
+CONNECTION_TIMEOUT = 2.0
+
+
+@contextmanager
+def _request_context(cwd: str | None, env: dict):
+    """Apply the caller's cwd and forwarded env vars for one request."""
+    saved_cwd = os.getcwd()
+    saved_env = {k: v for k, v in os.environ.items() if is_forwarded(k)}
+    for key in saved_env:
+        if key not in env:
+            del os.environ[key]
+    os.environ.update({k: v for k, v in env.items() if is_forwarded(k)})
+    try:
+        if cwd and os.path.isdir(cwd):
+            os.chdir(cwd)
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        for key in [k for k in os.environ if is_forwarded(k)]:
+            del os.environ[key]
+        os.environ.update(saved_env)
+
+
+class HookDaemon:
+    """Serves hook requests over a Unix socket until idle or shut down."""
+
+    def __init__(self, path: str | None = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.path = path or socket_path()
+        self.idle_timeout = idle_timeout
+        self._modules: dict = {}  # hook name -> (mtime_ns, module)
+        self._running = True
+
+    def load(self, name: str):
+        """Load (or reload, if the script changed on disk) a hook module."""
+        script = os.path.join(HOOKS_DIR, HOOK_SCRIPTS[name])
+        mtime = os.stat(script).st_mtime_ns
+        cached = self._modules.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        spec = importlib.util.spec_from_file_location(
+            f"gemini_hook_{name.replace('-', '_')}", script
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self._modules[name] = (mtime, module)
+        return module
+
+    def preload(self) -> None:
+        for name in HOOK_SCRIPTS:
+            try:
+                self.load(name)
+            except Exception:
+                pass
+        for module in WARM_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception:
+                pass
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op", "hook")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "hooks": sorted(self._modules)}
+        if op == "shutdown":
+            self._running = False
+            return {"ok": True}
+
+        name = request.get("hook")
+        if name not in HOOK_SCRIPTS:
+            # Nothing ran: the client may run the hook itself
+            return {"ok": False, "declined": True, "error": f"unknown hook: {name}"}
+
+        with _request_context(request.get("cwd"), request.get("env") or {}):
+            trace.begin(name, where="daemon")
+            try:
+                with trace.span("handler"):
+                    output = self.load(name).handle(request.get("stdin", ""))
+            except (Exception, SystemExit) as exc:
+                trace.note(outcome="error")
+                trace.finish()
+                return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            trace.finish()
+            debug_log = sys.modules.get("gemini_lib.debug_log")
+            if debug_log is not None:
+                debug_log.flush()
+        return {"ok": True, "output": output}
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        conn.settimeout(CONNECTION_TIMEOUT)
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        try:
+            request = json.loads(b"".join(chunks) or b"{}")
+        except ValueError:
+            response = {"ok": False, "declined": True, "error": "invalid request"}
+        else:
+            response = self.dispatch(request)
+        conn.sendall(json.dumps(response).encode())
+
+    def serve_forever(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # makedirs(exist_ok=True) also accepts a directory someone else created first
+        if not private_dir(directory):
+            raise RuntimeError(
+                f"refusing to listen in {directory or '.'}: not a directory owned by this user "
+                "and closed to group/other writes"
+            )
+        if os.path.exists(self.path):
+            if send({"op": "ping"}, self.path):
+                raise RuntimeError(f"hook daemon already listening on {self.path}")
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen(64)
+        server.settimeout(self.idle_timeout or None)
+        self.preload()
+        try:
+            while self._running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    try:
+                        self._serve_connection(conn)
+                    except OSError:
+                        pass
+        finally:
+            server.close()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def send(request: dict, path: str | None = None, timeout: float = 2.0) -> dict | None:
+    """Send a control request to a running daemon; None if unreachable."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        sock.sendall(json.dumps(request).encode())
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return json.loads(b"".join(chunks) or b"{}")
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    import subprocess
+    import time
+
+    parser = argparse.ArgumentParser(description="Gemini hook daemon")
+    parser.add_argument("command", choices=["start", "stop", "status", "run"])
+    parser.add_argument("--socket", default=None, help="socket path (default: per-user)")
+    parser.add_argument(
+        "--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+        help="exit after this many idle seconds (0 = never)",
+    )
+    args = parser.parse_args(argv)
+    path = args.socket or socket_path()
+
+    if args.command == "run":
+        HookDaemon(path, args.idle_timeout).serve_forever()
+        return 0
+
+    if args.command == "status":
+        info = send({"op": "ping"}, path)
+        if not info:
+            print(f"not running ({path})")
+            return 1
+        print(f"running pid={info.get('pid')} socket={path} hooks={','.join(info.get('hooks', []))}")
+        return 0
+
+    if args.command == "stop":
+        if not send({"op": "shutdown"}, path):
+            print(f"not running ({path})")
+            return 1
+        print("stopped")
+        return 0
+
+    # start
+    if send({"op": "ping"}, path):
+        print(f"already running ({path})")
+        return 0
+    subprocess.Popen(
+        [sys.executable, os.path.join(HOOKS_DIR, "hook-daemon.py"), "run",
+         "--socket", path, "--idle-timeout", str(args.idle_timeout)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if send({"op": "ping"}, path, timeout=0.5):
+            print(f"started ({path})")
+            return 0
+        time.sleep(0.05)
+    print(f"failed to start ({path})", file=sys.stderr)
+    return 1
@@ -0,0 +1,146 @@
+"""
+Buffered, rotating debug log for the hooks (``GEMINI_HOOK_DEBUG=1``).
+
+Messages go to ``.gemini/hook-debug.log`` in the extension root, in the same
+format as before:
+
+    [2026-10-17T09:30:00Z] AfterTool: emitting additionalContext length=120
+
+log() only appends to an in-memory buffer. Nothing is opened until flush(),
+which run_hook() (and the daemon, per request) calls once the hook's output
+is written. flush() hands the buffer to a daemon thread that makes one
+O_APPEND write, and waits at most FLUSH_TIMEOUT for it, so a slow or hung
+filesystem costs the hook a bounded wait. If the write is still pending
+then, the process exits without it. The buffer is capped at MAX_BUFFER
+bytes, and a final line notes how many messages were dropped. The log
+directory is checked once per process.
+
+Rotation: once the current file passes GEMINI_HOOK_DEBUG_MAX_MB (default 5)
+or its first line is older than MAX_AGE, it is renamed to
+``hook-debug.<timestamp>.log``. Only the newest MAX_SEGMENTS rotated segments
+are kept. The background sweeper (gemini_lib.sweeper) gzips rotated
+segments, so the hook never compresses anything.
+
+Sampling: high-volume messages (the raw input preview) are logged with
+``sampled=True`` and kept at rate GEMINI_HOOK_DEBUG_SAMPLE (0..1, default 1).
+"""
+
+import os
+import time
+
+from gemini_lib.paths import HOOKS_DIR
+
+LOG_DIR = os.path.join(os.path.dirname(HOOKS_DIR), ".gemini")
+LOG_NAME = "hook-debug"
+MAX_BYTES = 5 * 1024 * 1024
+MAX_AGE = 7 * 86400
+MAX_SEGMENTS = 5
+MAX_BUFFER = 64 * 1024
+FLUSH_TIMEOUT = 0.5  # seconds a hook waits for its log write
+
+_buffer: list[str] = []
+_buffered = 0
+_dropped = 0
+_dir_ready = False
+
+
+def enabled() -> bool:
+    return os.getenv("GEMINI_HOOK_DEBUG", "").lower() in {"1", "true", "yes"}
+
+
+def log_path() -> str:
+    return os.path.join(LOG_DIR, f"{LOG_NAME}.log")
+
+
+def _sample_rate() -> float:
+    try:
+        return float(os.environ.get("GEMINI_HOOK_DEBUG_SAMPLE", "1"))
+    except ValueError:
+        return 1.0
+
+
+def log(source: str, message: str, sampled: bool = False) -> None:
+    """Buffer one line; written by flush()."""
+    global _buffered, _dropped
+    if not enabled():
+        return
+    if sampled:
+        rate = _sample_rate()
+        if rate < 1 and int.from_bytes(os.urandom(2), "big") >= rate * 65536:
+            return
+    line = f"[{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}] {source}: {message}\n"
+    if _buffered + len(line) > MAX_BUFFER:
+        _dropped += 1
+        return
+    _buffer.append(line)
+    _buffered += len(line)
+
+
+def _expired(fd: int) -> bool:
+    """Whether the open log's first line is older than MAX_AGE (ISO stamps sort as text)."""
+    try:
+        # seek+read rather than os.pread, which Windows lacks; O_APPEND writes
+        # ignore the offset, and the fd is closed right after
+        os.lseek(fd, 0, os.SEEK_SET)
+        head = os.read(fd, 21)
+    except OSError:
+        return False
+    cutoff = time.strftime("[%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - MAX_AGE))
+    return head.startswith(b"[") and head.decode("ascii", "replace") < cutoff
+
+
+def _rotate(path: str) -> None:
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    try:
+        os.rename(path, os.path.join(LOG_DIR, f"{LOG_NAME}.{stamp}.{os.getpid()}.log"))
+    except OSError:
+        return  # another process rotated it first
+    segments = sorted(
+        name for name in os.listdir(LOG_DIR)
+        if name.startswith(f"{LOG_NAME}.") and name != f"{LOG_NAME}.log"
+    )
+    for name in segments[:-MAX_SEGMENTS]:
+        try:
+            os.unlink(os.path.join(LOG_DIR, name))
+        except OSError:
+            pass
+
+
+def _write(data: bytes) -> None:
+    global _dir_ready
+    try:
+        if not _dir_ready:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            _dir_ready = True
+        path = log_path()
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_NONBLOCK", 0)  # not on Windows
+        fd = os.open(path, flags, 0o600)
+        try:
+            os.write(fd, data)
+            size = os.fstat(fd).st_size
+            expired = _expired(fd)
+        finally:
+            os.close(fd)
+        max_bytes = float(os.environ.get("GEMINI_HOOK_DEBUG_MAX_MB", MAX_BYTES / 1048576)) * 1048576
+        if size > max_bytes or expired:
+            _rotate(path)
+    except (OSError, ValueError):
+        pass
+
+
+def flush() -> None:
+    """Write buffered lines, waiting at most FLUSH_TIMEOUT."""
+    global _buffered, _dropped
+    if not _buffer and not _dropped:
+        return
+    lines = list(_buffer)
+    if _dropped:
+        lines.append(f"[{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}] debug_log: "
+                     f"dropped {_dropped} messages over the {MAX_BUFFER}-byte buffer\n")
+    _buffer.clear()
+    _buffered = _dropped = 0
+    import threading
+
+    writer = threading.Thread(target=_write, args=("".join(lines).encode(),), daemon=True)
+    writer.start()
+    writer.join(FLUSH_TIMEOUT)
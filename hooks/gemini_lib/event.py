@@ -0,0 +1,399 @@
+"""
+Normalized hook input shared by every hook.
+
+``decode(raw)`` turns a hook's stdin payload into a HookEvent, which resolves
+the key spellings Gemini and older adapters use (``tool_name``/``toolName``/
+``name``, ``session_id``/``sessionId``, ``tool_response``/``toolResponse``/
+``result``) and flattens response content blocks in one place.
+
+Payloads under LAZY_THRESHOLD go through json.loads. Larger ones (typically a
+big ``tool_response``) are only indexed: the top-level object is scanned for
+the span of each value, skipping over values with C-level regexes, and a
+value is decoded the first time a hook reads it. A hook that never touches
+``tool_response`` never pays for parsing it. A value that is read is decoded
+with orjson when it is installed, else with raw_decode. Importing orjson
+costs more than parsing a small payload takes, so it is only loaded for
+large ones. Long strings are skipped at C speed, but container tokens one
+at a time in Python: a payload with more than MAX_SKIPPED_TOKENS of them
+(thousands of small blocks) is decoded whole instead.
+"""
+
+import json
+
+LAZY_THRESHOLD = 64 * 1024  # bytes of raw payload before values are decoded lazily
+MAX_SKIPPED_TOKENS = 4096  # containers skipped in Python before decoding in C is cheaper
+CHUNK_CHARS = 1 << 20  # raw characters of a response string decoded at a time
+
+RESPONSE_KEYS = ("tool_response", "toolResponse", "result")
+
+WS = r"[ \t\n\r]*"
+# A string up to its next quote, which may be an escaped one (see _skip_container)
+TOKEN = r'"[^"]*"|[{}\[\]]'
+SCALAR = r"[^,}\]\s]+"
+# No escape (\uXXXX\uXXXX at most, 12 characters) spans the end of such a run
+NO_ESCAPE = r"[^\\]{12}"
+
+_DECODER = json.JSONDecoder()
+_patterns = None  # (ws, token, scalar, no_escape), compiled on the first large payload
+
+_orjson_loads = None  # resolved on first decode; False when orjson is missing
+
+
+class _Dense(Exception):
+    """The payload has too many tokens to index; decode it whole instead."""
+
+
+class HookEvent:
+    """One hook invocation's input; top-level fields are decoded on first read."""
+
+    __slots__ = ("raw", "valid", "_fields", "_offsets")
+
+    def __init__(self, raw: str, fields: dict, offsets: dict | None = None, valid: bool = True):
+        # offsets: key -> (start, end) of its value in raw, for values not decoded yet
+        self.raw = raw
+        self.valid = valid
+        self._fields = fields
+        self._offsets = offsets
+
+    def get(self, key: str, default=None):
+        if key in self._fields:
+            return self._fields[key]
+        span = self._offsets.get(key) if self._offsets else None
+        if span is None:
+            return default
+        try:
+            value = _decode_span(self.raw, *span)
+        except ValueError:
+            value = None
+        self._fields[key] = value
+        return value
+
+    def first(self, *keys: str, default=""):
+        """First truthy value among alternative spellings of a field."""
+        for key in keys:
+            value = self.get(key)
+            if value:
+                return value
+        return default
+
+    @property
+    def tool_name(self) -> str:
+        return self.first("tool_name", "toolName", "name")
+
+    @property
+    def session_id(self) -> str:
+        return self.first("session_id", "sessionId")
+
+    @property
+    def prompt(self) -> str:
+        return self.first("prompt", "message", "userMessage", "input")
+
+    @property
+    def tool_input(self) -> dict:
+        value = self.first("tool_input", "toolInput", default={})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def tool_response(self):
+        return self.first(*RESPONSE_KEYS, default={})
+
+    def response_text(self) -> str:
+        """The tool response as one string, content blocks joined by spaces."""
+        return " ".join(text_blocks(self.tool_response))
+
+    def response_chunks(self, chunk_chars: int = CHUNK_CHARS):
+        """
+        Yield response_text() in pieces, without holding it all decoded.
+
+        A tool response still raw in an indexed payload is walked in place and
+        each block's text decoded about ``chunk_chars`` at a time, so memory
+        beyond the raw payload stays flat whatever the response size. A
+        decoded response yields its blocks as they are.
+        """
+        start = self._raw_response()
+        if start is None:
+            blocks = ((text,) for text in text_blocks(self.tool_response))
+        else:
+            blocks = _raw_text_blocks(self.raw, start, chunk_chars)
+        for n, pieces in enumerate(blocks):
+            if n:
+                yield " "
+            yield from pieces
+
+    def _raw_response(self) -> int | None:
+        """Offset of the tool response object when it is still raw, else None."""
+        for key in RESPONSE_KEYS:
+            if key in self._fields:
+                if self._fields[key]:
+                    return None
+                continue
+            span = self._offsets.get(key) if self._offsets else None
+            if span is None:
+                continue
+            start, end = span
+            if self.raw[start] != "{":
+                return None
+            if _compiled()[0].match(self.raw, start + 1).end() < end - 1:
+                return start
+        return None
+
+
+def text_blocks(tool_response):
+    """Yield a tool response's text one content block at a time."""
+    if not isinstance(tool_response, dict):
+        yield str(tool_response)
+        return
+    content = tool_response.get("content", "")
+    if not isinstance(content, list):
+        yield content if isinstance(content, str) else str(content)
+        return
+    for block in content:
+        if isinstance(block, dict):
+            text = block.get("text", "")
+        else:
+            text = str(block)
+        if text:
+            yield text
+
+
+def _compiled():
+    global _patterns
+    if _patterns is None:
+        import re
+
+        _patterns = (re.compile(WS), re.compile(TOKEN), re.compile(SCALAR), re.compile(NO_ESCAPE))
+    return _patterns
+
+
+def _escaped_quote(token: str) -> bool:
+    """Whether a ``"[^"]*"`` token ends at an escaped quote, i.e. inside the string."""
+    body = token[1:-1]
+    return (len(body) - len(body.rstrip("\\"))) % 2 == 1
+
+
+def _skip_container(raw: str, pos: int, budget: list[int]) -> int:
+    """Index just past the object or array starting at ``pos``, within ``budget`` tokens."""
+    token_re = _compiled()[1]
+    depth = 0
+    while True:
+        # A single-character class keeps the regex fast on long
+        # strings; a string cut short at an escaped quote is finished by the
+        # C string scanner and the token search restarts after it.
+        for match in token_re.finditer(raw, pos):
+            budget[0] -= 1
+            if budget[0] < 0:
+                raise _Dense()
+            token = match.group()
+            if token[0] == '"':
+                if token[-2:-1] == "\\" and _escaped_quote(token):
+                    pos = json.decoder.scanstring(raw, match.start() + 1)[1]
+                    break
+            elif token in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        else:
+            raise ValueError("unterminated container")
+
+
+def _string_end(raw: str, pos: int) -> int:
+    """Index just past the JSON string starting at ``pos``, without decoding it."""
+    if raw[pos:pos + 1] != '"':
+        raise ValueError(f"expected a string at {pos}")
+    quote = raw.find('"', pos + 1)
+    while quote > 0:
+        backslash = quote - 1
+        while raw[backslash] == "\\":
+            backslash -= 1
+        if (quote - 1 - backslash) % 2 == 0:
+            return quote + 1
+        quote = raw.find('"', quote + 1)
+    raise ValueError("unterminated string")
+
+
+def _walk(raw: str, pos: int, visit) -> int:
+    """
+    Walk the object or array at ``pos``; returns the index just past it.
+
+    ``visit(key, start)`` is called for each value (key None in an array) and
+    returns the value's end, or None to have it skipped. No string value is
+    decoded.
+    """
+    ws = _compiled()[0]
+    close = "}" if raw[pos] == "{" else "]"
+    pos = ws.match(raw, pos + 1).end()
+    if raw[pos:pos + 1] == close:
+        return pos + 1
+    while True:
+        key = None
+        if close == "}":
+            end = _string_end(raw, pos)
+            key = json.loads(raw[pos:end])
+            pos = ws.match(raw, end).end()
+            if raw[pos:pos + 1] != ":":
+                raise ValueError(f"expected ':' at {pos}")
+            pos = ws.match(raw, pos + 1).end()
+        end = visit(key, pos)
+        if end is None:
+            end = _skip_raw(raw, pos)
+        pos = ws.match(raw, end).end()
+        sep = raw[pos:pos + 1]
+        if sep == close:
+            return pos + 1
+        if sep != ",":
+            raise ValueError(f"expected ',' or {close!r} at {pos}")
+        pos = ws.match(raw, pos + 1).end()
+
+
+def _string_chunks(raw: str, start: int, end: int, chunk_chars: int):
+    """Decode the JSON string at raw[start:end] in pieces, cutting only between escapes."""
+    no_escape = _compiled()[3]
+    pos, stop = start + 1, end - 1
+    while pos < stop:
+        cut = min(pos + chunk_chars, stop)
+        if cut < stop:
+            match = no_escape.search(raw, max(pos, cut - 12), stop)
+            cut = match.end() if match else stop
+        yield json.decoder.scanstring(f'"{raw[pos:cut]}"', 1)[0]
+        pos = cut
+
+
+def _raw_text_blocks(raw: str, start: int, chunk_chars: int):
+    """text_blocks() of the raw tool response object at ``start``, each block as an iterable of pieces."""
+    # (start, end, is a block) of each text value, found in one walk; the last
+    # duplicate key wins, as in json.loads
+    found: dict[str, list] = {"content": []}
+
+    def in_block(texts: list):
+        def visit(key, pos):
+            if key != "text":
+                return None
+            texts[:] = [(pos, _skip_raw(raw, pos))]
+            return texts[0][1]
+        return visit
+
+    def in_content(key, pos):
+        texts: list = []
+        if raw[pos] != "{":
+            end = _skip_raw(raw, pos)
+            found["content"].append((pos, end, False))
+            return end
+        end = _walk(raw, pos, in_block(texts))
+        found["content"].extend((s, e, True) for s, e in texts)
+        return end
+
+    def in_response(key, pos):
+        if key != "content":
+            return None
+        found["content"] = []
+        if raw[pos] == "[":
+            return _walk(raw, pos, in_content)
+        end = _skip_raw(raw, pos)
+        found["content"] = [(pos, end, None)]
+        return end
+
+    _walk(raw, start, in_response)
+    for s, e, block in found["content"]:
+        if raw[s] == '"' and block is not False:
+            if block is None or e - s > 2:
+                yield _string_chunks(raw, s, e, chunk_chars)
+            continue
+        value = json.loads(raw[s:e])
+        text = value if block else str(value)
+        if text:
+            yield (text,)
+
+
+def _skip_raw(raw: str, pos: int) -> int:
+    """Index just past the JSON value at ``pos``; a string is not decoded."""
+    if raw[pos:pos + 1] == '"':
+        return _string_end(raw, pos)
+    return _skip_value(raw, pos, [float("inf")])
+
+
+def _skip_value(raw: str, pos: int, budget: list[int]) -> int:
+    """Index just past the JSON value starting at ``pos``."""
+    ch = raw[pos]
+    if ch == '"':
+        return json.decoder.scanstring(raw, pos + 1)[1]
+    if ch in "{[":
+        return _skip_container(raw, pos, budget)
+    match = _compiled()[2].match(raw, pos)
+    if match is None:
+        raise ValueError(f"bad value at {pos}")
+    return match.end()
+
+
+def index_object(raw: str) -> dict[str, tuple[int, int]]:
+    """
+    Map each top-level key of a JSON object to its value's (start, end) offsets.
+
+    Raises _Dense past MAX_SKIPPED_TOKENS container tokens: skipping them one
+    at a time in Python then costs more than decoding the payload in C.
+    """
+    ws = _compiled()[0]
+    budget = [MAX_SKIPPED_TOKENS]
+    offsets = {}
+    pos = ws.match(raw, 0).end()
+    if raw[pos:pos + 1] != "{":
+        raise ValueError("not a JSON object")
+    pos = ws.match(raw, pos + 1).end()
+    if raw[pos:pos + 1] == "}":
+        return offsets
+    while True:
+        key, pos = _DECODER.raw_decode(raw, pos)
+        if not isinstance(key, str):
+            raise ValueError("non-string key")
+        pos = ws.match(raw, pos).end()
+        if raw[pos:pos + 1] != ":":
+            raise ValueError(f"expected ':' at {pos}")
+        pos = ws.match(raw, pos + 1).end()
+        end = _skip_value(raw, pos, budget)
+        offsets[key] = (pos, end)
+        pos = ws.match(raw, end).end()
+        sep = raw[pos:pos + 1]
+        if sep == "}":
+            return offsets
+        if sep != ",":
+            raise ValueError(f"expected ',' or '}}' at {pos}")
+        pos = ws.match(raw, pos + 1).end()
+
+
+def _fast_loads():
+    """orjson.loads if orjson is installed, else False (looked up once)."""
+    global _orjson_loads
+    if _orjson_loads is None:
+        try:
+            from orjson import loads as fast
+        except ImportError:
+            fast = False
+        _orjson_loads = fast
+    return _orjson_loads
+
+
+def _decode_span(raw: str, start: int, end: int):
+    """Decode the JSON value at raw[start:end], through orjson when it is installed."""
+    fast = _fast_loads()
+    if fast:
+        return fast(raw[start:end])
+    return _DECODER.raw_decode(raw, start)[0]
+
+
+def decode(raw: str) -> HookEvent:
+    """Decode a hook payload; invalid or non-object input gives an empty event."""
+    raw = raw or "{}"
+    try:
+        if len(raw) >= LAZY_THRESHOLD:
+            try:
+                return HookEvent(raw, {}, index_object(raw))
+            except _Dense:
+                data = (_fast_loads() or json.loads)(raw)
+        else:
+            data = json.loads(raw)
+    except ValueError:
+        return HookEvent(raw, {}, valid=False)
+    if not isinstance(data, dict):
+        return HookEvent(raw, {}, valid=False)
+    return HookEvent(raw, data)
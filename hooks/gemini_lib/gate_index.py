@@ -0,0 +1,105 @@
+"""
+Pending-gate index: one tiny sidecar file per session.
+
+state_store writes it after every committed update, so gate-enforce can answer
+"is a gate pending?", and before-agent "is there any chain state?", with one
+small read instead of loading the session document.
+
+    <version>\\t<gate name>     gate pending
+    <version>\\t               chain state, no gate pending
+    <version>                  no chain state (no gate pending)
+    (missing)                  session not indexed yet; fall back to the store
+
+Every entry carries the store version it was written for, and writers hold
+the session's lock (gemini_lib.locks) while they compare and replace, so an
+older update finishing late never overwrites a newer entry, with or without
+a gate.
+"""
+
+import os
+
+from gemini_lib.paths import gemini_state_dir, session_filename
+
+
+def _sidecar(session_id: str, create: bool = False) -> str:
+    name = session_filename(session_id)
+    directory = os.path.join(gemini_state_dir(create=create), "pending-gates")
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def _indexed_version(path: str) -> int:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+    except OSError:
+        return -1
+    try:
+        return int(head.split(b"\t", 1)[0])
+    except ValueError:
+        return -1
+
+
+def sync(session_id: str, state: dict | None, version: int) -> None:
+    """Record the pending gate (if any) for a committed state version."""
+    if not session_id:
+        return
+    path = _sidecar(session_id, create=True)
+    if state is None:
+        data = str(version).encode()
+    else:
+        data = f"{version}\t{state.get('pending_gate') or ''}".encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    from gemini_lib.locks import SessionLock
+
+    with SessionLock(session_id):
+        # An older update finishing late must not overwrite a newer entry
+        if _indexed_version(path) > version:
+            return
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def _read(session_id: str) -> bytes | None:
+    try:
+        with open(_sidecar(session_id), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def pending_gate(session_id: str) -> tuple[bool, str | None]:
+    """Return (indexed, gate). When not indexed, the caller must ask the store."""
+    data = _read(session_id)
+    if data is None:
+        return False, None
+    if not data:
+        return True, None  # entry from before versioned no-gate entries
+    _, _, gate = data.decode("utf-8", "replace").partition("\t")
+    return True, gate or None
+
+
+def has_state(session_id: str) -> bool | None:
+    """Whether the session has chain state; None when the index cannot tell."""
+    data = _read(session_id)
+    if not data:
+        return None
+    return b"\t" in data
+
+
+def forget(session_id: str) -> None:
+    from gemini_lib.locks import SessionLock
+
+    with SessionLock(session_id):
+        try:
+            os.unlink(_sidecar(session_id))
+        except OSError:
+            pass
@@ -0,0 +1,103 @@
+"""
+Per-session advisory locks for check-then-write updates of derived files.
+
+Chain state itself needs no lock: state_store commits with compare-and-swap.
+Files derived from it (the pending-gate sidecar) are written after the commit
+and must not interleave between two writers of the same session, or an older
+update finishing late could overwrite a newer one. ``SessionLock(sid)`` holds
+an exclusive flock on ``runtime-state/gemini-hooks/locks/<sid>`` for a
+``with`` block. Locks are per session, so writers of different sessions never
+wait on each other, and are held only for a few file operations.
+
+The sweeper removes lock files of sessions long gone (remove_unused). It
+unlinks a file only while holding its lock, and a writer that was waiting
+on a file unlinked under it opens the path again, so two writers never hold
+locks on different files for the same session.
+
+Time spent waiting is reported to gemini_lib.trace as ``lock_wait_ms``, and
+waits that were needed at all as ``lock_contended``. Where fcntl is missing
+(Windows) the lock is a no-op.
+"""
+
+import os
+import time
+
+from gemini_lib import trace
+from gemini_lib.paths import gemini_state_dir, session_filename
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+
+def lock_path(session_id: str) -> str:
+    directory = os.path.join(gemini_state_dir(), "locks")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, session_filename(session_id))
+
+
+def _same_file(fd: int, path: str) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    held = os.fstat(fd)
+    return (held.st_dev, held.st_ino) == (st.st_dev, st.st_ino)
+
+
+def remove_unused(path: str) -> bool:
+    """Unlink a lock file unless some writer holds it; True if removed."""
+    if fcntl is None:
+        return False
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if not _same_file(fd, path):
+            return False
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+class SessionLock:
+    """Exclusive per-session lock; ``with SessionLock(session_id): ...``."""
+
+    __slots__ = ("session_id", "_fd")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        path = lock_path(self.session_id)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                start = time.perf_counter()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                trace.count("lock_contended")
+                trace.count("lock_wait_ms", (time.perf_counter() - start) * 1000)
+            if _same_file(fd, path):
+                self._fd = fd
+                return self
+            os.close(fd)  # removed by the sweeper while we waited: lock the new file
+
+    def __exit__(self, *exc) -> bool:
+        if self._fd is not None:
+            os.close(self._fd)  # releases the flock
+            self._fd = None
+        return False
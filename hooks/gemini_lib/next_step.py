@@ -0,0 +1,129 @@
+"""
+Pre-resolution of a chain's next step.
+
+When a prompt_engine response leaves a chain part-way through, after-tool.py
+resolves the step after it once and keeps the result in the session state
+under ``next_step``:
+
+    {"step": 2, "total": 3, "prompt_id": "review", "category": "quality",
+     "arguments": [{"name": "focus", "default": "security"}],
+     "gate": "review", "gate_criteria": ["..."],
+     "call": 'prompt_engine(chain_id:"chain-analyze#1", gate_verdict:"...", user_response:"...")'}
+
+The step ids come from the ``command`` of the call that started the chain
+(``>>analyze --> >>review --> >>summary``). They are kept in the state as
+``chain_prompts``, so continuation calls, which only carry a chain_id, still
+resolve. A step's arguments are taken from the catalog snapshot, with the
+placeholders filled in from ``key:value`` pairs in that command. A chain
+defined as a single catalog prompt has no per-step ids, so for it only the
+step number, gate and call are known.
+
+``call`` is the exact continuation call. after-tool.py prints it, and
+before-agent.py and gate-enforce.py read it from the state instead of
+rebuilding it.
+"""
+
+CONTINUE_PLACEHOLDER = "<step {step} output>"
+VERDICT_PLACEHOLDER = "GATE_REVIEW: PASS|FAIL - <reason>"
+
+
+def format_tool_call(prompt_id: str, info: dict) -> str:
+    args = info.get("arguments", [])
+    if not args:
+        return f'prompt_engine(command:">>{prompt_id}")'
+
+    options_parts = []
+    for arg in args:
+        name = arg.get("name", "")
+        default = arg.get("default")
+        placeholder = f'"{default}"' if default else f'"<{name}>"'
+        options_parts.append(f'"{name}": {placeholder}')
+
+    options_str = ", ".join(options_parts)
+    return f'prompt_engine(command:">>{prompt_id}", options:{{{options_str}}})'
+
+
+def continue_call(chain_id: str, step: int, gate: str | None) -> str:
+    """The prompt_engine call that hands step ``step``'s output back to the chain."""
+    parts = [f'chain_id:"{chain_id}"']
+    if gate:
+        parts.append(f'gate_verdict:"{VERDICT_PLACEHOLDER}"')
+    parts.append(f'user_response:"{CONTINUE_PLACEHOLDER.format(step=step)}"')
+    return f"prompt_engine({', '.join(parts)})"
+
+
+def chain_prompts(state: dict, previous: dict | None, tool_input: dict) -> tuple[list[str], dict]:
+    """Step ids and per-step ``key:value`` arguments for the state's chain."""
+    command = tool_input.get("command")
+    if isinstance(command, str) and ">>" in command:
+        from gemini_lib.syntax import scan
+
+        parsed = scan(command)
+        if parsed is not None and parsed.steps:
+            return parsed.steps, parsed.arguments
+        return [], {}
+    if previous and previous.get("chain_id") == state.get("chain_id"):
+        return previous.get("chain_prompts") or [], previous.get("chain_arguments") or {}
+    return [], {}
+
+
+def _arguments(info: dict | None, given: dict) -> list[dict]:
+    arguments = []
+    for arg in (info or {}).get("arguments") or []:
+        name = arg.get("name", "")
+        value = given.get(name, arg.get("default"))
+        arguments.append({"name": name, "default": value} if value else {"name": name})
+    return arguments
+
+
+def resolve(state: dict, previous: dict | None, tool_input: dict) -> dict:
+    """
+    ``state`` with ``next_step`` (and the chain's step ids) filled in.
+
+    Used as the state_store.update() mutation in after-tool.py, so
+    ``previous`` is the state being replaced.
+    """
+    state = dict(state)
+    prompts, given = chain_prompts(state, previous, tool_input)
+    if prompts:
+        state["chain_prompts"] = prompts
+        state["chain_arguments"] = given
+    step = state.get("current_step", 0)
+    total = state.get("total_steps", 0)
+    if not (0 < step < total):
+        state.pop("next_step", None)
+        return state
+
+    gate = state.get("pending_gate")
+    next_step = {"step": step + 1, "total": total}
+    prompt_id = prompts[step] if step < len(prompts) else None
+    if prompt_id:
+        from gemini_lib.catalog_snapshot import get_snapshot
+
+        catalog = get_snapshot()
+        info = catalog.get(prompt_id) if catalog else None
+        next_step["prompt_id"] = prompt_id
+        next_step["category"] = (info or {}).get("category", "unknown")
+        next_step["arguments"] = _arguments(info, given.get(prompt_id) or {})
+    if gate:
+        next_step["gate"] = gate
+        next_step["gate_criteria"] = state.get("gate_criteria") or []
+    if state.get("chain_id"):
+        next_step["call"] = continue_call(state["chain_id"], step, gate)
+    state["next_step"] = next_step
+    return state
+
+
+def describe(next_step: dict) -> list[str]:
+    """Output lines for a resolved next step (after the ``[Chain]`` line)."""
+    lines = []
+    if next_step.get("prompt_id"):
+        args = ", ".join(
+            f'{a["name"]}="{a.get("default") or "<" + a["name"] + ">"}"'
+            for a in next_step.get("arguments") or []
+        )
+        line = f"  Next: >>{next_step['prompt_id']} ({next_step.get('category', 'unknown')})"
+        lines.append(f"{line} {args}" if args else line)
+    if next_step.get("call"):
+        lines.append(f"  {next_step['call']}")
+    return lines
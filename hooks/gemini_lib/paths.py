@@ -0,0 +1,43 @@
+"""
+Filesystem locations for Gemini hook state.
+
+Shared lib state lives in ``<MCP_WORKSPACE>/runtime-state`` (hooks-state.db,
+verify-state.db). Files only the Gemini hooks read or write go in a
+subdirectory of it so an npm update of lib/ never touches them.
+
+Paths are plain strings built with os.path: pathlib alone costs more to
+import than most hook invocations spend doing work.
+"""
+
+import os
+
+HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def workspace_root() -> str:
+    return os.environ.get("MCP_WORKSPACE") or os.path.dirname(HOOKS_DIR)
+
+
+def runtime_dir() -> str:
+    return os.path.join(workspace_root(), "runtime-state")
+
+
+def gemini_state_dir(create: bool = True) -> str:
+    path = os.path.join(runtime_dir(), "gemini-hooks")
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def session_filename(session_id: str) -> str:
+    """A file name for per-session state: the id itself when safe, else its SHA-1."""
+    if (
+        len(session_id) <= 128
+        and session_id.isascii()
+        and session_id.strip(".")
+        and all(c.isalnum() or c in "_.-" for c in session_id)
+    ):
+        return session_id
+    import hashlib
+
+    return hashlib.sha1(session_id.encode()).hexdigest()
@@ -0,0 +1,191 @@
+"""
+Prebuilt lookup index over the prompt catalog.
+
+Built once per catalog version and persisted with marshal in the Gemini state
+directory, so a fresh hook process loads it instead of walking the catalog.
+Serves two lookups:
+
+- suggest_ids(): typo-tolerant "did you mean" for unknown >>ids. A trigram
+  index narrows the catalog to a few candidates before any edit distance is
+  computed.
+- match_intent(): free-text matching through an inverted token index over
+  id, name, description and category, ranked by IDF.
+"""
+
+import heapq
+import marshal
+import math
+import os
+import re
+
+from gemini_lib.catalog import current_version, get_catalog, iter_prompts
+from gemini_lib.paths import gemini_state_dir
+
+INDEX_FORMAT = 1
+INDEX_FILENAME = "prompt-index.marshal"
+
+# Candidates kept from the trigram pass before edit distance is computed
+TRIGRAM_CANDIDATES = 25
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from i in is it me my of on or please the "
+    "this that to with you".split()
+)
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"$${text.lower()}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def words(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent swaps)."""
+    if a == b:
+        return 0
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class PromptIndex:
+    """Trigram index over prompt ids plus an inverted word index."""
+
+    __slots__ = ("version", "ids", "categories", "trigrams", "words")
+
+    def __init__(self, version, ids, categories, trigram_postings, word_postings):
+        self.version = version
+        self.ids: list[str] = ids
+        self.categories: list[str] = categories
+        self.trigrams: dict[str, list[int]] = trigram_postings
+        self.words: dict[str, list[int]] = word_postings
+
+    @classmethod
+    def build(cls, cache: dict, version) -> "PromptIndex":
+        ids, categories = [], []
+        trigram_postings: dict[str, list[int]] = {}
+        word_postings: dict[str, list[int]] = {}
+        for n, (prompt_id, info) in enumerate(sorted(iter_prompts(cache), key=lambda p: p[0])):
+            ids.append(prompt_id)
+            categories.append(str(info.get("category", "") or ""))
+            for gram in trigrams(prompt_id):
+                trigram_postings.setdefault(gram, []).append(n)
+            text = " ".join(
+                str(info.get(field, "") or "")
+                for field in ("name", "description", "category")
+            )
+            for word in set(words(prompt_id.replace("_", " ").replace("-", " ") + " " + text)):
+                word_postings.setdefault(word, []).append(n)
+        return cls(version, ids, categories, trigram_postings, word_postings)
+
+    def suggest_ids(self, query: str, limit: int = 3) -> list[str]:
+        """Closest prompt ids to an unknown id, best first."""
+        query = query.lower()
+        grams = trigrams(query)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for n in self.trigrams.get(gram, ()):
+                shared[n] = shared.get(n, 0) + 1
+        if not shared:
+            return []
+
+        max_distance = max(2, len(query) // 3)
+        ranked = []
+        for n, count in heapq.nlargest(TRIGRAM_CANDIDATES, shared.items(), key=lambda kv: kv[1]):
+            candidate = self.ids[n]
+            distance = edit_distance(query, candidate.lower())
+            dice = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if distance <= max_distance or dice >= 0.5:
+                ranked.append((distance, -dice, candidate))
+        ranked.sort()
+        return [candidate for _, _, candidate in ranked[:limit]]
+
+    def match_intent(self, text: str, limit: int = 3) -> list[tuple[str, str]]:
+        """(prompt_id, category) pairs ranked by IDF-weighted word overlap."""
+        total = len(self.ids)
+        scores: dict[int, float] = {}
+        for word in set(words(text)):
+            postings = self.words.get(word)
+            if not postings:
+                continue
+            weight = math.log((total + 1) / len(postings))
+            for n in postings:
+                scores[n] = scores.get(n, 0.0) + weight
+        best = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [(self.ids[n], self.categories[n]) for n, score in best if score > 0]
+
+    def dump(self) -> bytes:
+        return marshal.dumps(
+            (INDEX_FORMAT, self.version, self.ids, self.categories, self.trigrams, self.words)
+        )
+
+    @classmethod
+    def loads(cls, data: bytes) -> "PromptIndex | None":
+        try:
+            fmt, version, ids, categories, trigram_postings, word_postings = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if fmt != INDEX_FORMAT:
+            return None
+        return cls(tuple(version) if version else None, ids, categories, trigram_postings, word_postings)
+
+
+_index: PromptIndex | None = None
+
+
+def _write_atomic(path, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def get_index() -> PromptIndex | None:
+    """
+    Index for the current catalog version.
+
+    Checked in order: this process, the persisted index file, a fresh build
+    from the catalog (which is then persisted for the next process).
+    """
+    global _index
+    version = current_version()
+    if _index is not None and version is not None and _index.version == version:
+        return _index
+
+    index_file = None
+    if version is not None:
+        try:
+            index_file = os.path.join(gemini_state_dir(), INDEX_FILENAME)
+            with open(index_file, "rb") as f:
+                loaded = PromptIndex.loads(f.read())
+            if loaded is not None and loaded.version == version:
+                _index = loaded
+                return _index
+        except OSError:
+            pass
+
+    cache = get_catalog()
+    if not cache:
+        return None
+    _index = PromptIndex.build(cache, version)
+    if index_file is not None:
+        _write_atomic(index_file, _index.dump())
+    return _index
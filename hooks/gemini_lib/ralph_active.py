@@ -0,0 +1,56 @@
+"""
+Slow path of ralph-context-tracker.py's "is a Ralph loop active?" check.
+
+The hook keeps the answer in a marker file: a stat key of verify-state.db
+and its WAL (``<mtime_ns>:<size>`` of each), a newline, then the active
+Ralph session id or nothing. It checks the marker inline with two stat()
+calls and a read, since importing even this module costs more than the
+check, and only comes here once the key has changed.
+
+Size is part of the key because a write can land in the same mtime tick as
+the one the marker was read at. A key whose newest mtime is within
+RACY_WINDOW of the query is not recorded at all, as git does with racily
+clean index entries, so the next check queries the store again.
+"""
+
+import os
+import time
+
+RACY_WINDOW = 2.0  # seconds
+
+
+def query_active_session() -> str | None:
+    """Active Ralph session id from the shared verify_active_store."""
+    from verify_active_store import load_verify_active_state
+
+    state = load_verify_active_state()
+    return state.get("sessionId") if state else None
+
+
+def _racy(key: str, now: float) -> bool:
+    newest = max(int(part.split(":", 1)[0]) for part in key.split())
+    return newest >= (now - RACY_WINDOW) * 1e9
+
+
+def refresh_marker(marker: str, key: str) -> str | None:
+    """
+    Query the store and record the answer for stat key ``key``.
+
+    ``key`` is taken before the query, so a write racing the query leaves
+    the marker stale and the next check queries again.
+    """
+    session = query_active_session()
+    if _racy(key, time.time()):
+        key = "racy"
+    tmp = f"{marker}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(tmp, "w") as f:
+            f.write(f"{key}\n{session or ''}")
+        os.replace(tmp, marker)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    return session
@@ -0,0 +1,273 @@
+"""
+Write-behind journal for Ralph context tracking.
+
+ralph-context-tracker.py fires after every edit/command, so instead of a
+session_tracker round trip per call it appends one JSON line per record to
+``runtime-state/gemini-hooks/ralph-journal/<ralph session>.jsonl``. Each record
+is a single O_APPEND write, so a hook killed at any point leaves either the
+whole line or nothing.
+
+flush() replays journals into session_tracker at natural boundaries
+(pre-compact.py, stop.py) or once a journal grows past FLUSH_THRESHOLD
+records. Repeated edits to the same file are coalesced into one
+record_file_change call, and the paths are added to the session's
+verification fingerprint (gemini_lib.verify_cache). A journal is renamed
+before replay, so appends made during a flush start a new file and an
+interrupted flush is retried on the next one. Each claim gets a name of its
+own (``<journal>.flushing.<time_ns>.<pid>.<n>``), since the hook daemon
+flushes many times from one pid, and a flush finishes older claims before
+it claims the live journal.
+
+Replay keeps a checkpoint next to the claimed journal (``<claim>.applied``):
+the number of coalesced records already applied, rewritten after each one.
+A claimed journal does not change, so coalescing it again gives the same
+records in the same order, and a retried flush skips those the checkpoint
+covers. Only a record applied in the instant before its checkpoint write
+can be replayed twice.
+"""
+
+import json
+import os
+import time
+
+from gemini_lib.paths import gemini_state_dir
+
+JOURNAL_DIR = "ralph-journal"
+FLUSH_THRESHOLD = 200  # records; bounds replay work at the next boundary
+_SUFFIX = ".jsonl"
+_FLUSHING = ".flushing"
+_APPLIED = ".applied"
+
+_claims = 0  # claims made by this process
+
+
+def _journal_dir(create: bool = True) -> str:
+    path = os.path.join(gemini_state_dir(create=create), JOURNAL_DIR)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _journal_path(ralph_session: str, create: bool = True) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in ralph_session)
+    return os.path.join(_journal_dir(create), f"{safe}{_SUFFIX}")
+
+
+def append(ralph_session: str, record: dict) -> None:
+    """Append one record; flush the journal if it has grown large."""
+    record = {"session": ralph_session, "ts": time.time(), **record}
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    path = _journal_path(ralph_session)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, line)
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+    # Cheap size-based trigger: records are ~100-600 bytes
+    if size > FLUSH_THRESHOLD * 256:
+        flush(ralph_session)
+
+
+def record_file_change(ralph_session: str, file_path: str, change_type: str, details: str) -> None:
+    append(ralph_session, {
+        "kind": "file_change", "file_path": file_path,
+        "change_type": change_type, "details": details,
+    })
+
+
+def record_subagent_result(ralph_session: str, agent_type: str, summary: str) -> None:
+    append(ralph_session, {"kind": "subagent", "agent_type": agent_type, "summary": summary})
+
+
+def _read_records(path: str) -> list[dict]:
+    records = []
+    try:
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+    except OSError:
+        pass
+    return records
+
+
+def coalesce(records: list[dict]) -> list[dict]:
+    """Merge file changes per path, keeping first-seen order."""
+    merged: list[dict] = []
+    by_file: dict[str, dict] = {}
+    for record in records:
+        if record.get("kind") != "file_change":
+            merged.append(record)
+            continue
+        path = record.get("file_path", "unknown")
+        existing = by_file.get(path)
+        if existing is None:
+            entry = dict(record, edits=1)
+            by_file[path] = entry
+            merged.append(entry)
+            continue
+        existing["edits"] += 1
+        existing["details"] = record.get("details", "")
+        if existing.get("change_type") != "add":
+            existing["change_type"] = record.get("change_type", "modify")
+    return merged
+
+
+class _Checkpoint:
+    """Coalesced records of one claimed journal already applied, kept in ``<claimed>.applied``."""
+
+    def __init__(self, claimed: str):
+        self.path = claimed + _APPLIED
+        self.applied = 0
+        self.seen = 0
+        self._fd = None
+        try:
+            with open(self.path, "rb") as f:
+                self.applied = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            pass
+
+    def pending(self) -> bool:
+        """Count the next record; False when an earlier flush already applied it."""
+        self.seen += 1
+        return self.seen > self.applied
+
+    def advance(self) -> None:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, b"%20d" % self.seen)
+
+    def remove(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _replay(ralph_session: str, records: list[dict], checkpoint: _Checkpoint) -> int:
+    from session_tracker import get_session_tracker
+
+    tracker = get_session_tracker(ralph_session)
+    merged = coalesce(records)
+    changed = [r.get("file_path", "") for r in merged if r["kind"] == "file_change"]
+    if changed:
+        from gemini_lib.verify_cache import add_files
+
+        add_files(ralph_session, changed)
+    for record in merged:
+        if not checkpoint.pending():
+            continue
+        if record["kind"] == "file_change":
+            details = record.get("details", "")
+            if record.get("edits", 1) > 1:
+                details = f"{details} ({record['edits']} edits)"
+            tracker.record_file_change(
+                file_path=record.get("file_path", "unknown"),
+                change_type=record.get("change_type", "modify"),
+                details=details,
+            )
+        elif record["kind"] == "subagent":
+            tracker.record_subagent_result(
+                agent_type=record.get("agent_type", "unknown"),
+                summary=record.get("summary", ""),
+            )
+            tracker.append_loop_memory(
+                f"Sub-agent `{record.get('agent_type', 'unknown')}` completed: {record.get('summary', '')}"
+            )
+        checkpoint.advance()
+    return len(records)
+
+
+def _claim_name(path: str) -> str:
+    """A claim no other flush uses: ``<journal>.flushing.<time_ns>.<pid>.<n>``, in claim order."""
+    global _claims
+    _claims += 1
+    return f"{path}{_FLUSHING}.{time.time_ns()}.{os.getpid()}.{_claims}"
+
+
+def _owner_alive(name: str) -> bool:
+    """Whether the process that claimed a .flushing file is still running."""
+    try:
+        pid = int(name.rsplit(".", 2)[1])
+        os.kill(pid, 0)
+    except (ValueError, IndexError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return pid != os.getpid()
+
+
+def _replay_claim(claimed: str) -> int:
+    """Replay one claimed journal, then remove it and its checkpoint."""
+    records = _read_records(claimed)
+    by_session: dict[str, list[dict]] = {}
+    for record in records:
+        by_session.setdefault(record.get("session", ""), []).append(record)
+    checkpoint = _Checkpoint(claimed)
+    flushed = 0
+    for session, session_records in by_session.items():
+        if session:
+            flushed += _replay(session, session_records, checkpoint)
+    os.unlink(claimed)
+    checkpoint.remove()
+    return flushed
+
+
+def flush(ralph_session: str | None = None) -> int:
+    """
+    Replay pending journals (one session, or all) into session_tracker.
+
+    Claims left by interrupted flushes are finished first, oldest first,
+    and only then is the live journal claimed, so records are replayed in
+    the order they were written. A replay that fails leaves its claim and
+    checkpoint for the next flush and claims nothing newer.
+    """
+    directory = _journal_dir(create=False)
+    if not os.path.isdir(directory):
+        return 0
+    if ralph_session is None:
+        names = os.listdir(directory)
+    else:
+        base = os.path.basename(_journal_path(ralph_session, create=False))
+        names = [n for n in os.listdir(directory) if n.startswith(base)]
+
+    # journal name -> its leftover claims; the live journal may be gone
+    journals: dict[str, list[str]] = {}
+    for name in names:
+        if name.endswith(_SUFFIX):
+            journals.setdefault(name, [])
+        elif _FLUSHING in name:
+            journal = name.split(_FLUSHING, 1)[0]
+            if name.endswith(_APPLIED):
+                if not os.path.exists(os.path.join(directory, name[:-len(_APPLIED)])):
+                    try:
+                        os.unlink(os.path.join(directory, name))  # its claim was removed just before it
+                    except OSError:
+                        pass
+            else:
+                journals.setdefault(journal, []).append(name)
+
+    flushed = 0
+    for journal, leftovers in sorted(journals.items()):
+        busy = False
+        for name in sorted(leftovers):
+            if _owner_alive(name):
+                busy = True  # still being replayed; newer records wait for it
+                break
+            flushed += _replay_claim(os.path.join(directory, name))
+        if busy:
+            continue
+        path = os.path.join(directory, journal)
+        claimed = _claim_name(path)
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            continue  # no live journal, or another process claimed it
+        flushed += _replay_claim(claimed)
+    return flushed
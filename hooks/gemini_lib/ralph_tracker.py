@@ -0,0 +1,216 @@
+"""
+Ralph context tracking for ralph-context-tracker.py.
+
+Lives in gemini_lib rather than the hook script so the script stays small:
+a ``__main__`` script is recompiled on every run, while this module's
+bytecode is cached, and it is only imported once a Ralph loop is active.
+
+Bash and sub-agent outputs can run to tens of megabytes, but only a few
+hundred characters of them are kept. summarize_chunks() reads the response
+in pieces (HookEvent.response_chunks(), which decodes a large response
+straight from the raw payload a chunk at a time) and keeps a head window, a
+tail window and up to MAX_SIGNATURES distinct error lines. Error lines are
+looked for in the first MAX_SCAN_CHARS of the output and in the tail window,
+so beyond the raw payload neither its memory nor its time grows with the
+output. Only that bounded text is passed to summarize_error(). A response
+that fits in the two windows is passed on whole, as before.
+"""
+
+from gemini_lib import ralph_journal
+from gemini_lib.event import decode
+
+# Substrings that mark a bash command as verification (tests, builds)
+VERIFICATION_INDICATORS = ("test", "npm run", "yarn", "pytest", "cargo test", "go test", "make")
+
+HEAD_CHARS = 2000
+TAIL_CHARS = 2000
+MAX_SIGNATURES = 20
+SIGNATURE_CHARS = 200  # longest error line kept
+MAX_SCAN_CHARS = 8 * 1024 * 1024
+# Error, Exception, Traceback, FAIL, [Ff]ailed, panic:, [Ff]atal:, npm ERR!.
+# A leading character class lets the regex engine skip most positions in C.
+SIGNATURE_PATTERN = r"[EeTFfpn](?:rror|xception|raceback|AIL|ailed|anic:|atal:|pm ERR!)"
+
+_signature_re = None
+
+
+class BoundedSummary:
+    """Head and tail windows plus distinct error lines of a text stream."""
+
+    __slots__ = ("total", "head", "tail", "signatures", "_seen", "_scanned")
+
+    def __init__(self):
+        self.total = 0
+        self.head = ""
+        self.tail = ""
+        self.signatures: list[str] = []
+        self._seen: set[str] = set()
+        self._scanned = 0
+
+    def feed(self, text: str) -> None:
+        self.total += len(text)
+        if len(self.head) < HEAD_CHARS:
+            self.head += text[:HEAD_CHARS - len(self.head)]
+        self.tail = (self.tail + text[-TAIL_CHARS:])[-TAIL_CHARS:]
+        if self._scanned < MAX_SCAN_CHARS:
+            end = min(len(text), MAX_SCAN_CHARS - self._scanned)
+            self._scanned += end
+            self._scan(text, end)
+
+    def _scan(self, text: str, endpos: int) -> None:
+        """Collect error lines before ``endpos``; every find is bounded, whatever the line length."""
+        global _signature_re
+        if _signature_re is None:
+            import re
+
+            _signature_re = re.compile(SIGNATURE_PATTERN)
+        pos = 0
+        while len(self.signatures) < MAX_SIGNATURES:
+            match = _signature_re.search(text, pos, endpos)
+            if match is None:
+                return
+            lower = max(0, match.start() - SIGNATURE_CHARS)
+            start = text.rfind("\n", lower, match.start()) + 1
+            if not start and lower:
+                start = match.start() - SIGNATURE_CHARS // 2  # no line start within reach
+            end = text.find("\n", match.end(), start + SIGNATURE_CHARS)
+            if end < 0:
+                end = min(len(text), start + SIGNATURE_CHARS)
+            line = text[start:end].strip()
+            if line not in self._seen:
+                self._seen.add(line)
+                self.signatures.append(line)
+            pos = max(end, match.end())
+
+    def text(self) -> str:
+        if self.total <= HEAD_CHARS + TAIL_CHARS:
+            return self.head + self.tail[len(self.tail) - (self.total - len(self.head)):]
+        if self._scanned < self.total:
+            self._scan(self.tail, len(self.tail))
+        parts = [self.head, f"\n... [{self.total - HEAD_CHARS - TAIL_CHARS} chars omitted] ..."]
+        if self.signatures:
+            parts.append("Errors:")
+            parts.extend(self.signatures)
+            parts.append("...")
+        parts.append(self.tail)
+        return "\n".join(parts)
+
+
+def summarize_chunks(chunks) -> str:
+    """Consecutive pieces of a response's text, cut down to a bounded summary."""
+    summary = BoundedSummary()
+    for chunk in chunks:
+        summary.feed(chunk)
+    return summary.text()
+
+
+def summarize_blocks(blocks) -> str:
+    """A response's content blocks, joined by spaces, cut down to a bounded summary."""
+    summary = BoundedSummary()
+    for n, block in enumerate(blocks):
+        if n:
+            summary.feed(" ")
+        summary.feed(block)
+    return summary.text()
+
+
+def extract_file_change_details(tool_input: dict, tool_name: str) -> dict | None:
+    """Extract file change details from write_file/replace tool input."""
+    if "replace" in tool_name:
+        return {
+            "file": tool_input.get("file_path", tool_input.get("filePath", "unknown")),
+            "type": "modify",
+            "details": f"Replace: {tool_input.get('old_string', tool_input.get('oldString', ''))[:50]}..."
+        }
+    elif "write_file" in tool_name:
+        content = tool_input.get("content", "")
+        return {
+            "file": tool_input.get("file_path", tool_input.get("filePath", "unknown")),
+            "type": "add",
+            "details": f"Write: {len(content)} chars"
+        }
+    return None
+
+
+def is_verification_command(command: str) -> bool:
+    lowered = command.lower()
+    return any(indicator in lowered for indicator in VERIFICATION_INDICATORS)
+
+
+def extract_bash_details(tool_input: dict, tool_response: str) -> dict | None:
+    """Extract command execution details from bash tool."""
+    from lesson_extractor import summarize_error
+
+    command = tool_input.get("command", "")
+    if not command:
+        return None
+
+    cmd_summary = command[:100] + "..." if len(command) > 100 else command
+
+    return {
+        "command": cmd_summary,
+        "is_verification": is_verification_command(command),
+        "output_summary": summarize_error(tool_response) if tool_response else None
+    }
+
+
+def extract_task_details(tool_input: dict, tool_response: str) -> dict:
+    """Extract delegated sub-agent summary from task_tool payload."""
+    from lesson_extractor import summarize_error
+
+    agent_type = (
+        tool_input.get("subagent_type")
+        or tool_input.get("agent_type")
+        or tool_input.get("subagentType")
+        or "unknown"
+    )
+    response_text = summarize_error(tool_response) if tool_response else "No response captured."
+    if len(response_text) > 500:
+        response_text = response_text[:500] + "..."
+
+    return {
+        "agent_type": str(agent_type),
+        "summary": response_text,
+    }
+
+
+def track(ralph_session: str, raw: str) -> None:
+    """Journal one tool call for the active Ralph session."""
+    event = decode(raw)
+    tool_name = event.tool_name
+    tool_input = event.tool_input
+
+    # Track file changes
+    if "replace" in tool_name or "write_file" in tool_name:
+        change = extract_file_change_details(tool_input, tool_name)
+        if change:
+            ralph_journal.record_file_change(
+                ralph_session,
+                file_path=change["file"],
+                change_type=change["type"],
+                details=change["details"]
+            )
+
+    # Track bash commands
+    if "bash" in tool_name.lower():
+        bash_details = extract_bash_details(tool_input, summarize_chunks(event.response_chunks()))
+        if bash_details and bash_details["is_verification"]:
+            pass  # Verification output captured by ralph-stop.py
+
+    # Track delegated sub-agent outputs (loop memory is appended on flush)
+    if "task_tool" in tool_name or "task" in tool_name.lower():
+        task_details = extract_task_details(tool_input, summarize_chunks(event.response_chunks()))
+        ralph_journal.record_subagent_result(
+            ralph_session,
+            agent_type=task_details["agent_type"],
+            summary=task_details["summary"],
+        )
+
+
+def track_traced(ralph_session: str, raw: str) -> None:
+    """track() for ralph-context-tracker.py's handle(), as one trace span."""
+    from gemini_lib import trace
+
+    trace.note(session=ralph_session)
+    with trace.span("track"):
+        track(ralph_session, raw)
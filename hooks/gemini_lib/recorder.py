@@ -0,0 +1,63 @@
+"""
+Opt-in capture of real hook payloads into a replay corpus.
+
+With ``GEMINI_HOOK_RECORD=<dir>`` every payload a hook receives is appended to
+``<dir>/<session id>.jsonl`` (``no-session.jsonl`` when the payload has none),
+one line per event in arrival order:
+
+    {"ts": 1760000000.12, "hook": "after-tool", "event": "AfterTool", "stdin": "..."}
+
+Each file is one session's event stream, which ``bench/replay.py`` replays
+against the hook scripts. Payloads are stored verbatim: scrub a corpus before
+sharing it.
+"""
+
+import os
+import time
+
+# Hook script name -> Gemini event it is registered for in hooks.json
+HOOK_EVENTS = {
+    "before-agent": "BeforeAgent",
+    "gate-enforce": "BeforeTool",
+    "after-tool": "AfterTool",
+    "ralph-context-tracker": "AfterTool",
+    "pre-compact": "PreCompress",
+    "stop": "SessionEnd",
+}
+
+
+def record_dir() -> str | None:
+    return os.environ.get("GEMINI_HOOK_RECORD") or None
+
+
+def _safe_name(session_id: str) -> str:
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in session_id)
+    return name.strip(".")[:120] or "no-session"
+
+
+def record(hook_name: str, raw: str) -> None:
+    """Append one payload to the corpus; never fails the hook."""
+    directory = record_dir()
+    if not directory:
+        return
+    import json
+
+    from gemini_lib.event import decode
+
+    session_id = decode(raw).session_id
+    line = json.dumps({
+        "ts": round(time.time(), 3),
+        "hook": hook_name,
+        "event": HOOK_EVENTS.get(hook_name, ""),
+        "stdin": raw,
+    }) + "\n"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_safe_name(str(session_id or ''))}.jsonl")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
@@ -0,0 +1,101 @@
+"""
+Chain/gate state from a prompt_engine tool response, without rebuilding its text.
+
+Two sources, cheapest first:
+
+1. Structured metadata. A response that carries a ``chain_state`` (or
+   ``chainState``) object under ``structuredContent`` or ``_meta`` is read
+   directly; no text is scanned::
+
+       {"content": [...], "structuredContent": {"chain_state": {
+           "chain_id": "c#1", "current_step": 2, "total_steps": 3,
+           "pending_gate": "quality", "gate_criteria": ["..."]}}}
+
+2. Text fallback. The content blocks are handed to
+   ``session_state.parse_prompt_engine_response`` one at a time instead of
+   being joined into one string, and results from later blocks only fill
+   fields the earlier ones left empty. Scanning stops once a step counter and
+   a pending gate are both known. Markers are matched within a block, which
+   is how the server emits them.
+"""
+
+# Structured field -> state key; camelCase spellings are accepted as well
+STATE_FIELDS = {
+    "chain_id": "chain_id",
+    "chainId": "chain_id",
+    "current_step": "current_step",
+    "currentStep": "current_step",
+    "total_steps": "total_steps",
+    "totalSteps": "total_steps",
+    "pending_gate": "pending_gate",
+    "pendingGate": "pending_gate",
+    "gate_criteria": "gate_criteria",
+    "gateCriteria": "gate_criteria",
+    "pending_shell_verify": "pending_shell_verify",
+    "pendingShellVerify": "pending_shell_verify",
+}
+
+
+def structured_state(tool_response) -> dict | None:
+    """State from the response's metadata block, or None if it has none."""
+    if not isinstance(tool_response, dict):
+        return None
+    for container in ("structuredContent", "_meta"):
+        meta = tool_response.get(container)
+        if not isinstance(meta, dict):
+            continue
+        block = meta.get("chain_state") or meta.get("chainState")
+        if not isinstance(block, dict):
+            continue
+        state = {
+            "chain_id": "",
+            "current_step": 0,
+            "total_steps": 0,
+            "pending_gate": None,
+            "gate_criteria": [],
+        }
+        for field, key in STATE_FIELDS.items():
+            if block.get(field) is not None:
+                state[key] = block[field]
+        if not state["current_step"] and not state["pending_gate"]:
+            return None
+        return state
+    return None
+
+
+def _complete(state: dict) -> bool:
+    return bool(state.get("current_step")) and bool(state.get("pending_gate"))
+
+
+def scan_blocks(blocks, parse) -> dict | None:
+    """
+    Run ``parse`` over each text block, merging into the first state found.
+
+    Later blocks only fill keys the merged state still has empty, so the first
+    occurrence of each marker wins, as it does in a scan of the joined text.
+    """
+    merged = None
+    for text in blocks:
+        state = parse(text)
+        if not state:
+            continue
+        if merged is None:
+            merged = dict(state)
+        else:
+            for key, value in state.items():
+                if value and not merged.get(key):
+                    merged[key] = value
+        if _complete(merged):
+            break
+    return merged
+
+
+def parse_response(tool_response) -> dict | None:
+    """Chain/gate state for a prompt_engine response, or None."""
+    state = structured_state(tool_response)
+    if state is not None:
+        return state
+    from session_state import parse_prompt_engine_response
+    from gemini_lib.event import text_blocks
+
+    return scan_blocks(text_blocks(tool_response), parse_prompt_engine_response)
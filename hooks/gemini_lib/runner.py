@@ -0,0 +1,200 @@
+"""
+Shared entry point for the Gemini hook scripts.
+
+Each hook script exposes ``handle(raw) -> dict | None`` and calls
+``run_hook(name, handle)`` from ``__main__``. The raw stdin payload is read
+once and forwarded to the hook daemon (see ``hook-daemon.py``) when one is
+listening; otherwise the handler runs in-process. Either way the returned dict
+is printed as the hook's JSON output, so Gemini sees identical behavior.
+
+Keep this module import-light: it runs before any hook knows whether it has
+work to do. A hook's ``precheck(raw)`` runs first and can end the process
+before the daemon is contacted or ``json`` is imported.
+
+With ``GEMINI_HOOK_TRACE=1`` each run is recorded by gemini_lib.trace, and
+with ``GEMINI_HOOK_RECORD=<dir>`` each payload is captured by
+gemini_lib.recorder for replay. Debug lines buffered by gemini_lib.debug_log
+are written after the output. Once the output is written, a run may start
+a detached state sweep (gemini_lib.sweeper) if one is due.
+"""
+
+import os
+import sys
+
+from gemini_lib import trace
+from gemini_lib.paths import HOOKS_DIR
+
+# Environment forwarded to the daemon so handlers see the caller's config. Only
+# the hooks' own settings and the workspace/project locations: never the rest
+# of the caller's environment, which holds API keys.
+FORWARDED_ENV_PREFIXES = ("GEMINI_HOOK_",)
+FORWARDED_ENV_NAMES = frozenset({
+    "MCP_WORKSPACE", "GEMINI_PROJECT_DIR", "GEMINI_SESSION_ID", "GEMINI_CWD",
+    "CLAUDE_PROJECT_DIR", "CLAUDE_PLUGIN_ROOT",
+})
+
+CONNECT_TIMEOUT = 0.2
+RESPONSE_TIMEOUT = 4.5  # below the 5000 ms hooks.json timeout
+
+
+def socket_path() -> str:
+    """
+    Per-user, per-install daemon socket path.
+
+    ``GEMINI_HOOK_DAEMON_SOCKET`` overrides the default, e.g. to run one
+    daemon per session. Either way the socket is only used inside a
+    directory private to this user (see socket_trusted()).
+    """
+    override = os.environ.get("GEMINI_HOOK_DAEMON_SOCKET")
+    if override:
+        return override
+    import zlib
+
+    base = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    install = format(zlib.crc32(HOOKS_DIR.encode()), "08x")
+    return os.path.join(base, f"gemini-prompts-{uid}", f"hooks-{install}.sock")
+
+
+def is_forwarded(name: str) -> bool:
+    return name in FORWARDED_ENV_NAMES or name.startswith(FORWARDED_ENV_PREFIXES)
+
+
+def forwarded_env() -> dict:
+    return {k: v for k, v in os.environ.items() if is_forwarded(k)}
+
+
+def private_dir(directory: str) -> bool:
+    """Whether ``directory`` is a real directory owned by this user that no one else can write."""
+    import stat
+
+    try:
+        st = os.lstat(directory or ".")
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def socket_trusted(path: str) -> bool:
+    """
+    Whether ``path`` is this user's socket in a private directory.
+
+    Anyone who could create the directory or the socket first (a shared
+    /tmp) could otherwise read every payload and answer for the daemon.
+    """
+    if not hasattr(os, "getuid"):
+        return False
+    import stat
+
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        stat.S_ISSOCK(st.st_mode)
+        and st.st_uid == os.getuid()
+        and private_dir(os.path.dirname(path))
+    )
+
+
+def _recv_all(sock) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def forward(hook_name: str, raw: str) -> tuple[bool, dict | None]:
+    """
+    Run a hook in the daemon.
+
+    Returns ``(handled, output)``. ``handled`` is False only when the request
+    never reached a daemon (no trusted socket, connect or send failed) or the
+    daemon declined it without running anything; the caller then runs the
+    hook in-process. Once a request is delivered the hook has run, or is
+    running, in the daemon, so it is never run a second time: a daemon that
+    does not answer within RESPONSE_TIMEOUT, or whose handler failed, gives
+    ``(True, None)`` and the hook exits with no output.
+    """
+    path = socket_path()
+    if os.environ.get("GEMINI_HOOK_DAEMON", "").lower() in {"0", "false", "no"}:
+        return False, None
+    if not socket_trusted(path):
+        return False, None
+
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return False, None
+
+    import json
+
+    request = {
+        "hook": hook_name,
+        "stdin": raw,
+        "cwd": os.getcwd(),
+        "env": forwarded_env(),
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode())
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            return False, None
+        try:
+            sock.settimeout(RESPONSE_TIMEOUT)
+            response = json.loads(_recv_all(sock) or b"{}")
+        except (OSError, ValueError):
+            trace.count("daemon_timeout")
+            return True, None
+    finally:
+        sock.close()
+
+    if not response.get("ok"):
+        return not response.get("declined"), None
+    return True, response.get("output")
+
+
+def run_hook(hook_name: str, handler, precheck=None) -> None:
+    """
+    Read stdin, dispatch to the daemon or ``handler``, print output, exit 0.
+
+    ``precheck(raw) -> bool`` is a cheap test (substring checks, no parsing)
+    that returns False when the hook certainly has nothing to do; the process
+    then exits with no output before anything else is imported.
+    """
+    trace.begin(hook_name)
+    with trace.span("stdin"):
+        raw = sys.stdin.read()
+    if os.environ.get("GEMINI_HOOK_RECORD"):
+        from gemini_lib.recorder import record
+
+        record(hook_name, raw)
+    if precheck is not None and not precheck(raw):
+        trace.note(outcome="skipped")
+        trace.finish()
+        sys.exit(0)
+    with trace.span("forward"):
+        handled, output = forward(hook_name, raw)
+    if not handled:
+        with trace.span("handler"):
+            output = handler(raw)
+    trace.note(outcome="daemon" if handled else "inproc")
+    if output is not None:
+        import json
+
+        print(json.dumps(output))
+    trace.finish()
+    sys.stdout.flush()
+    debug_log = sys.modules.get("gemini_lib.debug_log")
+    if debug_log is not None:
+        debug_log.flush()
+    from gemini_lib import sweeper
+
+    sweeper.maybe_start()
+    sys.exit(0)
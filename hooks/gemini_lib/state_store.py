@@ -0,0 +1,282 @@
+"""
+Chain session state store for the Gemini hooks.
+
+One row per session in a WAL-mode SQLite database keyed by session_id, with a
+version column for compare-and-swap updates. Readers never block writers, and
+parallel hook processes updating the same session retry instead of silently
+overwriting each other.
+
+Migration: the first read of a session this store has never seen copies it
+from the shared lib store (session_state.load_session_state), or records that
+there is nothing to copy. Sessions are remembered in the ``legacy`` table, so
+the legacy store is consulted at most once per session: a session cleared or
+evicted here is not brought back from it. Every committed write also
+refreshes the pending-gate sidecar (gate_index).
+
+Writes and deletions are mirrored back to the shared lib store by default
+because lib-side hooks (ralph-stop) read it; set GEMINI_HOOK_STATE_MIRROR=0 to
+stop mirroring. The mirror runs under the session's lock and copies the row
+as it is at that moment, not the state the caller committed, so a late
+mirror never leaves an older version behind. A row already mirrored (same
+``updated_at``) is not written again.
+
+Rows of abandoned sessions are evicted by gemini_lib.sweeper, least recently
+written first (stale_sessions/evict). ``legacy`` entries of sessions gone from
+the store are kept for SEEN_TTL_DAYS (forget_seen).
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from gemini_lib import gate_index, trace
+from gemini_lib.paths import gemini_state_dir
+
+DB_FILENAME = "session-state.db"
+BUSY_TIMEOUT_MS = 2000
+MAX_CAS_RETRIES = 16
+SEEN_TTL_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id TEXT PRIMARY KEY,
+    version    INTEGER NOT NULL,
+    updated_at REAL    NOT NULL,
+    state      TEXT             -- JSON document; NULL = known to have no state
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS session_state_updated_at ON session_state (updated_at);
+CREATE TABLE IF NOT EXISTS legacy (
+    session_id  TEXT PRIMARY KEY,
+    seen_at     REAL NOT NULL,  -- last migration or mirror
+    mirrored_at REAL NOT NULL   -- updated_at of the row last mirrored; 0 = none or deleted
+) WITHOUT ROWID;
+"""
+
+_conn: sqlite3.Connection | None = None
+_conn_file: tuple[str, int, int] | None = None  # (path, st_dev, st_ino) _conn was opened on
+
+
+def db_path() -> str:
+    return os.path.join(gemini_state_dir(), DB_FILENAME)
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Per-process connection (reused across requests in the hook daemon).
+
+    Reused only while the database file is still the one it was opened on:
+    when runtime-state/ is removed or the file replaced, a cached connection
+    would keep serving the unlinked file while hook processes see a new one.
+    """
+    global _conn, _conn_file
+    path = db_path()
+    if _conn is not None:
+        try:
+            st = os.stat(path)
+            if _conn_file == (path, st.st_dev, st.st_ino):
+                return _conn
+        except OSError:
+            pass
+        _conn.close()
+        _conn = _conn_file = None
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    st = os.stat(path)
+    _conn, _conn_file = conn, (path, st.st_dev, st.st_ino)
+    return conn
+
+
+def _mirror_enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_STATE_MIRROR", "1").lower() not in {"0", "false", "no"}
+
+
+def _migrate(conn: sqlite3.Connection, session_id: str) -> tuple[dict | None, int]:
+    """Copy one session from the shared lib store on first access."""
+    now = time.time()
+    seen = conn.execute(
+        "INSERT OR IGNORE INTO legacy (session_id, seen_at, mirrored_at) VALUES (?, ?, ?)",
+        (session_id, now, now),
+    )
+    if seen.rowcount == 0:
+        # Seen before: cleared or evicted since, or migrated by a racing process
+        return load_versioned(session_id, migrate=False)
+    try:
+        from session_state import load_session_state
+
+        legacy = load_session_state(session_id)
+    except Exception:
+        legacy = None
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO session_state (session_id, version, updated_at, state) "
+        "VALUES (?, 1, ?, ?)",
+        (session_id, now, json.dumps(legacy) if legacy else None),
+    )
+    if cur.rowcount == 1:
+        _committed(session_id, legacy, 1)
+    return load_versioned(session_id, migrate=False)
+
+
+def load_versioned(session_id: str, migrate: bool = True) -> tuple[dict | None, int]:
+    """Return (state, version); version 0 means no row exists yet."""
+    conn = connect()
+    row = conn.execute(
+        "SELECT state, version FROM session_state WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if row is None:
+        return _migrate(conn, session_id) if migrate else (None, 0)
+    state, version = row
+    return (json.loads(state) if state else None), version
+
+
+def load(session_id: str) -> dict | None:
+    return load_versioned(session_id)[0]
+
+
+def compare_and_swap(session_id: str, expected_version: int, state: dict | None) -> bool:
+    """Write state only if the row is still at expected_version."""
+    conn = connect()
+    payload = json.dumps(state) if state else None
+    now = time.time()
+    if expected_version == 0:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO session_state (session_id, version, updated_at, state) "
+            "VALUES (?, 1, ?, ?)",
+            (session_id, now, payload),
+        )
+    else:
+        cur = conn.execute(
+            "UPDATE session_state SET version = version + 1, updated_at = ?, state = ? "
+            "WHERE session_id = ? AND version = ?",
+            (now, payload, session_id, expected_version),
+        )
+    return cur.rowcount == 1
+
+
+def _mirror(session_id: str) -> None:
+    """Copy the session's current row (or its absence) to the shared lib store."""
+    if not _mirror_enabled():
+        return
+    from gemini_lib.locks import SessionLock
+
+    conn = connect()
+    with SessionLock(session_id):
+        row = conn.execute(
+            "SELECT state, updated_at FROM session_state WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        state, updated_at = row if row else (None, 0.0)
+        mirrored = conn.execute(
+            "SELECT mirrored_at FROM legacy WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if mirrored and mirrored[0] == updated_at:
+            return
+        try:
+            if state:
+                from session_state import save_session_state
+
+                save_session_state(session_id, json.loads(state))
+            else:
+                from session_state import clear_session_state
+
+                clear_session_state(session_id)
+        except Exception:
+            updated_at = -1.0  # not mirrored; the entry still stops a re-migration
+        conn.execute(
+            "INSERT INTO legacy (session_id, seen_at, mirrored_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET seen_at = excluded.seen_at, "
+            "mirrored_at = excluded.mirrored_at",
+            (session_id, time.time(), updated_at),
+        )
+
+
+def _committed(session_id: str, state: dict | None, version: int) -> None:
+    """Keep derived per-session indexes in step with a committed write."""
+    gate_index.sync(session_id, state, version)
+
+
+def update(session_id: str, mutate) -> dict | None:
+    """
+    Atomically apply ``mutate(current_state) -> new_state``.
+
+    ``mutate`` receives a fresh copy of the current state (or None) and may be
+    called more than once if another process updates the session first.
+    Raises RuntimeError if the session stays contended for MAX_CAS_RETRIES.
+    Lost swaps are counted as ``cas_retries`` in the hook's trace.
+    """
+    for attempt in range(MAX_CAS_RETRIES):
+        current, version = load_versioned(session_id)
+        new_state = mutate(current)
+        if compare_and_swap(session_id, version, new_state):
+            if attempt:
+                trace.count("cas_retries", attempt)
+            _committed(session_id, new_state, version + 1)
+            _mirror(session_id)
+            return new_state
+    trace.count("cas_retries", MAX_CAS_RETRIES)
+    trace.count("cas_giveups")
+    raise RuntimeError(f"session state for {session_id!r} contended; gave up after {MAX_CAS_RETRIES} tries")
+
+
+def save(session_id: str, state: dict) -> None:
+    """Replace a session's state (last writer wins, but never a torn write)."""
+    update(session_id, lambda _current: state)
+
+
+def delete(session_id: str) -> None:
+    connect().execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+    gate_index.forget(session_id)
+    _mirror(session_id)
+
+
+def stale_sessions(updated_before: float, keep: int, limit: int) -> list[tuple[str, int]]:
+    """
+    (session_id, version) of rows to evict, least recently written first.
+
+    That is every row not written since ``updated_before``, or the oldest rows
+    beyond the newest ``keep`` if that is more, at most ``limit`` of them.
+    """
+    conn = connect()
+    expired = conn.execute(
+        "SELECT COUNT(*) FROM session_state WHERE updated_at < ?", (updated_before,)
+    ).fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM session_state").fetchone()[0]
+    count = min(limit, max(expired, total - keep))
+    if count <= 0:
+        return []
+    return conn.execute(
+        "SELECT session_id, version FROM session_state ORDER BY updated_at LIMIT ?", (count,)
+    ).fetchall()
+
+
+def evict(session_id: str, version: int) -> bool:
+    """Delete a row picked by stale_sessions() unless it was written since."""
+    cur = connect().execute(
+        "DELETE FROM session_state WHERE session_id = ? AND version = ?", (session_id, version)
+    )
+    if cur.rowcount != 1:
+        return False
+    gate_index.forget(session_id)
+    _mirror(session_id)
+    return True
+
+
+def forget_seen(seen_before: float, limit: int) -> int:
+    """Drop up to ``limit`` ``legacy`` entries of sessions gone from the store since ``seen_before``."""
+    cur = connect().execute(
+        "DELETE FROM legacy WHERE session_id IN (SELECT session_id FROM legacy WHERE seen_at < ? "
+        "AND session_id NOT IN (SELECT session_id FROM session_state) LIMIT ?)",
+        (seen_before, limit),
+    )
+    return cur.rowcount
+
+
+def session_ids() -> list[str]:
+    return [row[0] for row in connect().execute("SELECT session_id FROM session_state")]
+
+
+def checkpoint() -> None:
+    """Fold the WAL back into the database file and truncate it."""
+    connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,123 @@
+"""
+Persistent LRU cache of before-agent.py's prompt invocation block.
+
+For one catalog version, ``>>id`` always yields the same ``[MCP] ...`` line and
+``prompt_engine(...)`` call, and ``>>a --> >>b`` the same ``[MCP Chain]``
+block. Users repeat the same few invocations all day, so the formatted lines
+are kept in ``runtime-state/gemini-hooks/suggest-cache.bin`` and shared by all
+hook processes. A hit skips the catalog snapshot and the formatting.
+
+Keys are the normalized invocation (the invoked id and the chain's step ids
+as the syntax scanner reads them, so arguments, gates and whitespace do not
+matter). Entries are stamped with the catalog version (mtime_ns, size of the
+prompts cache), so a hot-reload that rewrites the catalog empties the cache.
+Prompts that were not found are not cached: their suggestions depend on the
+rest of the message.
+
+The file is a marshal-encoded ``(format, version, [(key, lines), ...])``,
+least recently used first, with at most MAX_ENTRIES entries. A hit on an entry
+in the older half moves it to the end and rewrites the file. A hit on a recent
+entry writes nothing, so hot invocations cost one small read.
+
+A process (the hook daemon) keeps the entries it read, and reads the file
+again whenever its mtime or size differs from what it last read or wrote.
+Every write starts from a fresh read of the file, so entries other
+processes added are kept. Writers replace the file atomically; two writes
+racing between read and replace can still drop one of their entries.
+"""
+
+import marshal
+import os
+
+from gemini_lib.paths import gemini_state_dir
+
+CACHE_FILENAME = "suggest-cache.bin"
+CACHE_FORMAT = 2
+MAX_ENTRIES = 128
+
+_version: tuple[int, int] | None = None
+_stamp: tuple[int, int] | None = None  # (mtime_ns, size) of the file _entries came from
+_entries: dict[str, list[str]] = {}
+
+
+def cache_path() -> str:
+    return os.path.join(gemini_state_dir(), CACHE_FILENAME)
+
+
+def key(invoked: str | None, steps: list[str]) -> str:
+    return f"{invoked or ''}|{' --> '.join(steps)}"
+
+
+def _file_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load(version: tuple[int, int]) -> dict[str, list[str]]:
+    global _version, _stamp, _entries
+    path = cache_path()
+    stamp = _file_stamp(path)
+    if _version == version and _stamp == stamp:
+        return _entries
+    entries = {}
+    try:
+        with open(path, "rb") as f:
+            fmt, stored, pairs = marshal.load(f)
+        if fmt == CACHE_FORMAT and tuple(stored) == version:
+            entries = dict(pairs)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    _version, _stamp, _entries = version, stamp, entries
+    return entries
+
+
+def _save(version: tuple[int, int], entries: dict[str, list[str]]) -> None:
+    global _stamp
+    path = cache_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            marshal.dump((CACHE_FORMAT, version, list(entries.items())), f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return
+    _stamp = _file_stamp(path)
+
+
+def current_version() -> tuple[int, int] | None:
+    from gemini_lib.catalog import current_version
+
+    return current_version()
+
+
+def get(cache_key: str, version: tuple[int, int] | None) -> list[str] | None:
+    """Cached lines for an invocation under catalog ``version``, or None."""
+    if version is None:
+        return None
+    entries = _load(version)
+    lines = entries.get(cache_key)
+    if lines is None:
+        return None
+    order = list(entries)
+    if order.index(cache_key) < len(order) // 2:
+        entries[cache_key] = entries.pop(cache_key)
+        _save(version, entries)
+    return lines
+
+
+def put(cache_key: str, version: tuple[int, int] | None, lines: list[str]) -> None:
+    if version is None:
+        return
+    entries = _load(version)
+    entries.pop(cache_key, None)
+    entries[cache_key] = list(lines)
+    while len(entries) > MAX_ENTRIES:
+        del entries[next(iter(entries))]
+    _save(version, entries)
@@ -0,0 +1,412 @@
+"""
+Eviction of state left behind by sessions that never ended cleanly.
+
+Nothing else removes a session's chain state, pending-gate sidecar, lock file
+or Ralph journal, so without this the Gemini state directory and
+session-state.db grow with every crashed or killed session. A sweep:
+
+- evicts session_state rows not written for GEMINI_HOOK_SESSION_TTL_DAYS, and
+  the least recently written rows beyond GEMINI_HOOK_MAX_SESSIONS, drops
+  migration records of sessions long gone, then checkpoints the WAL;
+- removes sidecars and lock files of sessions no longer in the store;
+- flushes Ralph journals idle past the TTL, and removes any that still cannot
+  be replayed, along with verification file lists, context ledgers and
+  chain timelines idle as long;
+- removes ``*.tmp`` files left by writers that were killed mid-write;
+- trims trace.jsonl to its newest half once it passes a size cap, and
+  gzips debug log segments rotated by gemini_lib.debug_log.
+
+Each sweep does at most SWEEP_BATCH evictions and removals per kind. It records
+what it reclaimed in ``gc-last.json``, which ``hook-gc.py status`` prints.
+
+Hooks never sweep inline. After a hook has written its output, run_hook()
+calls maybe_start(). That costs one stat() of ``gc-stamp``. Once the stamp is
+older than SWEEP_INTERVAL, the hook touches it and starts ``hook-gc.py sweep
+--background`` as a detached process. A sweep that hits its batch limit
+backdates the stamp, so the next hook starts another sweep a minute later.
+Set GEMINI_HOOK_GC=0 to turn the automatic sweep off; ``hook-gc.py sweep``
+still works.
+"""
+
+import os
+import time
+
+from gemini_lib.paths import HOOKS_DIR, gemini_state_dir
+
+GC_STAMP = "gc-stamp"
+GC_LOCK = "gc.lock"
+GC_REPORT = "gc-last.json"
+
+SWEEP_INTERVAL = 3600  # seconds between automatic sweeps
+RESWEEP_DELAY = 60  # seconds before continuing a sweep that hit its batch limit
+SWEEP_BATCH = 500  # evictions/removals per kind per sweep
+SESSION_TTL_DAYS = 14
+MAX_SESSIONS = 5000
+ORPHAN_GRACE = 3600  # seconds; never remove a per-session file younger than this
+TMP_TTL = 3600
+TRACE_MAX_BYTES = 20 * 1024 * 1024
+
+
+def _setting(name: str, default: float) -> float:
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def auto_enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_GC", "1").lower() not in {"0", "false", "no"}
+
+
+def _stamp_path() -> str:
+    return os.path.join(gemini_state_dir(create=False), GC_STAMP)
+
+
+def due(now: float | None = None) -> bool:
+    """Whether an automatic sweep should start; one stat() in the common case."""
+    try:
+        return os.stat(_stamp_path()).st_mtime < (now or time.time()) - SWEEP_INTERVAL
+    except FileNotFoundError:
+        # First run of an install with state: sweep. No state yet: nothing to do.
+        return os.path.isdir(os.path.dirname(_stamp_path()))
+    except OSError:
+        return False
+
+
+def _touch_stamp(when: float) -> None:
+    path = _stamp_path()
+    try:
+        with open(path, "a"):
+            pass
+        os.utime(path, (when, when))
+    except OSError:
+        pass
+
+
+def maybe_start() -> bool:
+    """Start a detached background sweep if one is due."""
+    if not auto_enabled() or not due():
+        return False
+    _touch_stamp(time.time())
+    import subprocess
+    import sys
+
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.join(HOOKS_DIR, "hook-gc.py"), "sweep", "--background"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        return False
+    return True
+
+
+def _remove(path: str, report: dict, kind: str) -> None:
+    try:
+        size = os.stat(path).st_size
+        os.unlink(path)
+    except OSError:
+        return
+    report[kind] += 1
+    report["bytes"] += size
+
+
+def _db_bytes(db: str) -> int:
+    total = 0
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            total += os.stat(db + suffix).st_size
+        except OSError:
+            pass
+    return total
+
+
+def sweep_sessions(now: float, report: dict) -> None:
+    from gemini_lib import state_store
+
+    ttl = _setting("GEMINI_HOOK_SESSION_TTL_DAYS", SESSION_TTL_DAYS) * 86400
+    keep = int(_setting("GEMINI_HOOK_MAX_SESSIONS", MAX_SESSIONS))
+    db = state_store.db_path()
+    if not os.path.exists(db):
+        return
+    before = _db_bytes(db)
+    stale = state_store.stale_sessions(now - ttl, keep, SWEEP_BATCH)
+    for session_id, version in stale:
+        if state_store.evict(session_id, version):
+            report["sessions"] += 1
+    if len(stale) == SWEEP_BATCH:
+        report["more"] = True
+    state_store.forget_seen(now - state_store.SEEN_TTL_DAYS * 86400, SWEEP_BATCH)
+    if report["sessions"]:
+        state_store.checkpoint()
+    report["bytes"] += max(0, before - _db_bytes(db))
+
+
+def sweep_orphans(now: float, report: dict) -> None:
+    """Sidecars and lock files of sessions that are no longer in the store."""
+    from gemini_lib import state_store
+    from gemini_lib.locks import remove_unused
+    from gemini_lib.paths import session_filename
+
+    live = None
+    for subdir, kind in (("pending-gates", "sidecars"), ("locks", "locks")):
+        directory = os.path.join(gemini_state_dir(create=False), subdir)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        removed = 0
+        for entry in entries:
+            if entry.name.endswith(".tmp"):
+                continue  # sweep_tmp_files
+            try:
+                if entry.stat().st_mtime > now - ORPHAN_GRACE:
+                    continue
+            except OSError:
+                continue
+            if live is None:
+                live = {session_filename(sid) for sid in state_store.session_ids()}
+            if entry.name in live:
+                continue
+            if removed == SWEEP_BATCH:
+                report["more"] = True
+                break
+            if kind == "locks":
+                # Lock files are never written, so their mtime says nothing
+                # about use: only remove one nobody holds
+                if remove_unused(entry.path):
+                    report["locks"] += 1
+            else:
+                _remove(entry.path, report, kind)
+            removed += 1
+
+
+def sweep_journals(now: float, report: dict) -> None:
+    """Replay Ralph journals idle past the TTL; drop those that cannot be."""
+    from gemini_lib import ralph_journal
+
+    ttl = _setting("GEMINI_HOOK_SESSION_TTL_DAYS", SESSION_TTL_DAYS) * 86400
+    directory = os.path.join(gemini_state_dir(create=False), ralph_journal.JOURNAL_DIR)
+    try:
+        stale = [e.path for e in os.scandir(directory) if e.stat().st_mtime < now - ttl]
+    except OSError:
+        return
+    if not stale:
+        return
+    try:
+        ralph_journal.flush()
+    except Exception:
+        pass  # shared lib unavailable; the journals are dropped below
+    for path in stale[:SWEEP_BATCH]:
+        if os.path.exists(path):
+            _remove(path, report, "journals")
+        else:
+            report["journals"] += 1  # replayed and removed by flush()
+    if len(stale) > SWEEP_BATCH:
+        report["more"] = True
+
+
+def sweep_idle_files(now: float, report: dict) -> None:
+    """
+    Per-session files idle past the TTL: Ralph loops' tracked-file lists
+    (gemini_lib.verify_cache), context ledgers (gemini_lib.context_ledger)
+    and chain timelines (gemini_lib.timeline).
+    """
+    from gemini_lib.context_ledger import LEDGER_DIR
+    from gemini_lib.timeline import TIMELINE_DIR
+    from gemini_lib.verify_cache import FILES_DIR
+
+    ttl = _setting("GEMINI_HOOK_SESSION_TTL_DAYS", SESSION_TTL_DAYS) * 86400
+    subdirs = ((FILES_DIR, "verify_files"), (LEDGER_DIR, "ledgers"), (TIMELINE_DIR, "timelines"))
+    for subdir, kind in subdirs:
+        directory = os.path.join(gemini_state_dir(create=False), subdir)
+        try:
+            stale = [e.path for e in os.scandir(directory) if e.stat().st_mtime < now - ttl]
+        except OSError:
+            continue
+        for path in stale[:SWEEP_BATCH]:
+            _remove(path, report, kind)
+        if len(stale) > SWEEP_BATCH:
+            report["more"] = True
+
+
+def sweep_tmp_files(now: float, report: dict) -> None:
+    """``<name>.<pid>.tmp`` files from writers killed between write and rename."""
+    root = gemini_state_dir(create=False)
+    for subdir in ("", "pending-gates", "verify-files", "context", "timeline"):
+        directory = os.path.join(root, subdir)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.endswith(".tmp"):
+                continue
+            try:
+                if entry.stat().st_mtime < now - TMP_TTL:
+                    _remove(entry.path, report, "tmp_files")
+            except OSError:
+                pass
+
+
+def trim_file(path: str, max_bytes: int) -> int:
+    """Keep the newest half of an append-only line log past ``max_bytes``; bytes freed."""
+    try:
+        size = os.stat(path).st_size
+        if size <= max_bytes:
+            return 0
+        with open(path, "rb") as f:
+            f.seek(size - max_bytes // 2)
+            f.readline()  # drop the partial first line
+            tail = f.read()
+    except OSError:
+        return 0
+    # Lines appended between the read and the replace are lost; these are
+    # diagnostic logs, so that is preferred to locking their writers.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(tail)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return 0
+    return size - len(tail)
+
+
+def compress_debug_segments(report: dict) -> None:
+    """Gzip debug log segments that debug_log has rotated out."""
+    import gzip
+    import shutil
+
+    from gemini_lib import debug_log
+
+    try:
+        names = os.listdir(debug_log.LOG_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not (name.startswith(f"{debug_log.LOG_NAME}.") and name.endswith(".log")):
+            continue
+        if name == f"{debug_log.LOG_NAME}.log":
+            continue
+        path = os.path.join(debug_log.LOG_DIR, name)
+        tmp = f"{path}.gz.{os.getpid()}.tmp"
+        try:
+            size = os.stat(path).st_size
+            with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, f"{path}.gz")
+            os.unlink(path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            continue
+        freed = max(0, size - os.stat(f"{path}.gz").st_size)
+        report["log_bytes"] += freed
+        report["bytes"] += freed
+
+
+def trim_logs(report: dict) -> None:
+    from gemini_lib.trace import trace_path
+
+    freed = trim_file(trace_path(), TRACE_MAX_BYTES)
+    if freed:
+        report["log_bytes"] += freed
+        report["bytes"] += freed
+    compress_debug_segments(report)
+
+
+def sweep(now: float | None = None) -> dict | None:
+    """
+    Run one sweep and return what it reclaimed.
+
+    Returns None without doing anything if another sweep holds the GC lock.
+    """
+    now = now or time.time()
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - non-POSIX
+        fcntl = None
+    lock_fd = os.open(os.path.join(gemini_state_dir(), GC_LOCK), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        report = {"started": round(now, 3), "sessions": 0, "sidecars": 0, "locks": 0,
+                  "journals": 0, "verify_files": 0, "ledgers": 0, "timelines": 0, "tmp_files": 0,
+                  "log_bytes": 0, "bytes": 0, "more": False}
+        for step in (sweep_sessions, sweep_orphans, sweep_journals, sweep_idle_files, sweep_tmp_files):
+            try:
+                step(now, report)
+            except Exception as exc:
+                report.setdefault("errors", []).append(f"{step.__name__}: {exc}")
+        trim_logs(report)
+        report["elapsed_ms"] = round((time.time() - now) * 1000, 1)
+        _write_report(report)
+        _touch_stamp(now - SWEEP_INTERVAL + RESWEEP_DELAY if report["more"] else now)
+        return report
+    finally:
+        os.close(lock_fd)
+
+
+def _write_report(report: dict) -> None:
+    import json
+
+    path = os.path.join(gemini_state_dir(), GC_REPORT)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(report, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def last_report() -> dict | None:
+    import json
+
+    try:
+        with open(os.path.join(gemini_state_dir(create=False), GC_REPORT)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Gemini hook state garbage collection")
+    parser.add_argument("command", nargs="?", default="status", choices=["sweep", "status"])
+    parser.add_argument("--background", action="store_true", help="quiet; used by the hooks")
+    args = parser.parse_args(argv)
+
+    if args.command == "sweep":
+        report = sweep()
+        if args.background:
+            return 0
+        if report is None:
+            print("another sweep is running")
+            return 1
+        print(json.dumps(report, indent=2))
+        return 0
+
+    report = last_report()
+    if report is None:
+        print("no sweep has run yet")
+    else:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(report["started"]))
+        print(f"last sweep {when}:")
+        print(json.dumps(report, indent=2))
+    print(f"automatic sweeps {'on' if auto_enabled() else 'off (GEMINI_HOOK_GC=0)'}, "
+          f"next {'due' if due() else 'not due'}")
+    return 0
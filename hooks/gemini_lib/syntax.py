@@ -0,0 +1,173 @@
+"""
+Scanner for the symbolic prompt syntax.
+
+    >>prompt_id key:value @FRAMEWORK :: 'gate criteria' :: gate_id --> >>next
+
+scan() finds gates and arrows with compiled regexes that only match
+well-formed gates and arrows joined to a step, so pasted diffs and logs
+(``std::vector``, stray arrows) are skipped inside the regex engine and
+Python only sees the sigils that change the result. The arrows are then
+walked once, left to right, to join them into chains. It returns a
+ParsedMessage, or None when the message contains neither ``>>`` nor ``::``.
+
+Rules that differ from the old per-feature regexes:
+- Text inside a quoted gate is consumed with it, so ``:: 'a :: b'`` is one gate
+  and a ``>>`` or ``-->`` inside quotes is not a step or an arrow.
+- ``::`` only opens a gate at the start of a word, so ``std::vector`` in a
+  pasted log is not a gate. Quoted gates end at the line end.
+- Chain steps are ``>>id`` tokens joined by ``-->``/``→``; arguments between
+  a step and its arrow no longer break the chain.
+- key:value arguments and @FRAMEWORK markers are read from the rest of a
+  step's line, up to the next ``>>``.
+"""
+
+import re
+from bisect import bisect_right
+
+_COMMAND = re.compile(
+    r"(?P<stop>>>)"
+    r"|'[^'\n]*'|\"[^\"\n]*\""
+    r"|(?<![\w@.])@(?P<fw>[A-Za-z][A-Za-z0-9_-]*)"
+    r"|(?<![\w:/.-])(?P<key>[A-Za-z_][A-Za-z0-9_-]*):(?![:/])"
+    r"(?P<value>\"[^\"\n]*\"|'[^'\n]*'|[^\s'\"]+)"
+)
+# A prompt id; a dash that starts an unspaced ``-->`` ends it (``>>a-->>>b``)
+_ID = r"((?:[A-Za-z0-9_]|-(?!->))+)"
+_STEP = re.compile(r"\s*>>\s*" + _ID)
+# A gate at the start of a word (the lookbehind sits after the ``::`` so the
+# pattern keeps its literal prefix), and an arrow joined to the step after it.
+# Each starts with a literal, which the regex engine searches for itself, so
+# ``std::vector`` in a pasted log or a dangling arrow never reaches Python.
+_GATE = re.compile(r"::(?<!\S::)\s*(?:['\"]([^'\"\n]+)['\"]|([A-Za-z][A-Za-z0-9_-]*)\b)")
+_DASH_ARROW = re.compile(r"-->\s*>>\s*" + _ID)
+_UNI_ARROW = re.compile(r"→\s*>>\s*" + _ID)
+
+
+class ParsedMessage:
+    """Structured result of scan()."""
+
+    __slots__ = ("invoked", "steps", "gates", "frameworks", "arguments")
+
+    def __init__(self):
+        self.invoked: str | None = None          # >>id at the start of the message
+        self.steps: list[str] = []               # first chain of 2+ steps, in order
+        self.gates: list[str] = []               # inline gates, in source order
+        self.frameworks: list[str] = []          # @FRAMEWORK markers
+        self.arguments: dict[str, dict] = {}     # prompt id -> {key: value}
+
+    def __repr__(self) -> str:
+        return (
+            f"ParsedMessage(invoked={self.invoked!r}, steps={self.steps!r}, "
+            f"gates={self.gates!r}, frameworks={self.frameworks!r}, "
+            f"arguments={self.arguments!r})"
+        )
+
+
+def has_syntax(message: str) -> bool:
+    return ">>" in message or "::" in message
+
+
+def _scan_command(parsed: ParsedMessage, message: str, pid: str, start: int) -> None:
+    """Collect @FRAMEWORK markers and key:value args on a step's line."""
+    end = message.find("\n", start)
+    if end == -1:
+        end = len(message)
+    for m in _COMMAND.finditer(message, start, end):
+        if m.group("stop"):
+            break
+        if m.group("fw"):
+            parsed.frameworks.append(m.group("fw"))
+        elif m.group("key"):
+            value = m.group("value")
+            if value[:1] in {'"', "'"}:
+                value = value[1:-1]
+            parsed.arguments.setdefault(pid, {})[m.group("key")] = value
+
+
+def _arrows(message: str, pos: int) -> list:
+    """Arrow matches after ``pos``, in order and without overlaps."""
+    if "→" not in message:
+        return list(_DASH_ARROW.finditer(message, pos))
+    # Two literal-prefixed searches beat one pattern without a prefix. Each
+    # search restarts after the match taken last, so arrows never overlap.
+    arrows = []
+    dash = _DASH_ARROW.search(message, pos)
+    uni = _UNI_ARROW.search(message, pos)
+    while dash or uni:
+        m = dash if uni is None or (dash and dash.start() < uni.start()) else uni
+        arrows.append(m)
+        end = m.end()
+        if dash and dash.start() < end:
+            dash = _DASH_ARROW.search(message, end)
+        if uni and uni.start() < end:
+            uni = _UNI_ARROW.search(message, end)
+    return arrows
+
+
+def _previous_step(message: str, lower: int, arrow: int, quoted: list[tuple[int, int]], starts: list[int]):
+    """Match the last >>id after ``lower`` on the arrow's line, outside quoted gates."""
+    line_start = max(lower, message.rfind("\n", lower, arrow) + 1)
+    end = arrow
+    while True:
+        prev = message.rfind(">>", line_start, end)
+        if prev == -1:
+            return None
+        n = bisect_right(starts, prev) - 1
+        if n < 0 or quoted[n][1] <= prev:
+            return _STEP.match(message, prev)
+        end = quoted[n][0]
+
+
+def scan(message: str) -> ParsedMessage | None:
+    """Parse prompt/chain/gate/framework/argument syntax."""
+    if not message or not has_syntax(message):
+        return None
+
+    parsed = ParsedMessage()
+    commands: dict[str, int] = {}  # prompt id -> offset where its args start
+    pos = 0
+
+    invocation = _STEP.match(message)
+    if invocation:
+        parsed.invoked = invocation.group(1)
+        commands[parsed.invoked] = pos = invocation.end()
+
+    gates = list(_GATE.finditer(message, pos))
+    parsed.gates = [m.group(1) or m.group(2) for m in gates]
+    arrows = _arrows(message, pos)
+
+    # Only arrows joined to a step are visited: a >>id that is neither the
+    # invocation nor joined to an arrow cannot affect the result.
+    chain: list[str] = []
+    step_end = 0  # end of the last chain step
+    if arrows:
+        quoted = [m.span() for m in gates if m.group(1)]  # quoted gates hide >> and arrows
+        starts = [span[0] for span in quoted]
+        gate_ends = [m.end() for m in gates]
+    for m in arrows:
+        start = m.start()
+        n = bisect_right(starts, start) - 1
+        if n >= 0 and quoted[n][1] > start:
+            continue
+        n = bisect_right(gate_ends, start)
+        floor = max(step_end, gate_ends[n - 1] if n else 0)  # end of the last chain step or gate
+        step = m.group(1)
+        if chain and message.find(">>", floor, start) == -1:
+            chain.append(step)
+        else:
+            if len(chain) > 1 and not parsed.steps:
+                parsed.steps = chain
+            prev_step = _previous_step(message, step_end, start, quoted, starts)
+            chain = [step]
+            if prev_step:
+                chain.insert(0, prev_step.group(1))
+                commands.setdefault(prev_step.group(1), prev_step.end())
+        step_end = m.end()
+        commands.setdefault(step, step_end)
+
+    if not parsed.steps and len(chain) > 1:
+        parsed.steps = chain
+    for pid in [parsed.invoked, *parsed.steps]:
+        if pid in commands:
+            _scan_command(parsed, message, pid, commands.pop(pid))
+    return parsed
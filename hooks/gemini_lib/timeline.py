@@ -0,0 +1,98 @@
+"""
+Per-session timeline of chain execution: steps, gate verdicts, denies, compactions.
+
+The hooks see every phase boundary of a chain. Each boundary is appended as
+one short JSON line to ``runtime-state/gemini-hooks/timeline/<session>``:
+
+    {"t":1760000000.12,"e":"step","c":"chain-analyze#1","s":2,"n":3,"p":"review","g":"quality"}
+    {"t":1760000042.80,"e":"verdict","c":"chain-analyze#1","v":"FAIL","r":"missing tests"}
+    {"t":1760000042.81,"e":"deny","c":"chain-analyze#1","r":"Gate FAIL: missing tests. ..."}
+    {"t":1760000097.35,"e":"compact","c":"chain-analyze#1","s":2}
+    {"t":1760000120.02,"e":"end","c":"chain-analyze#1"}
+
+- ``step`` (after-tool.py): the server rendered step ``s`` of ``n``, whose
+  prompt id is ``p`` when the chain's step ids are known and whose pending
+  gate is ``g``. A step is running from its first ``step`` event until the
+  chain's next event with another step, or its ``end``. A repeated event for
+  the same step is a re-render, e.g. after a server-side gate failure.
+- ``end`` (after-tool.py): a prompt_engine call on the chain came back with no
+  step or gate left, which is how the chain's last step completes.
+- ``verdict`` (gate-enforce.py): a ``gate_verdict`` of PASS or FAIL, with
+  its reason.
+- ``deny`` (gate-enforce.py): a call blocked for a FAIL verdict or a missing
+  verdict. Each deny costs one more round trip.
+- ``compact`` (pre-compact.py): a context compaction during the chain.
+
+Keys are kept to one letter and empty fields are left out, so an event is
+well under a hundred bytes. An append is one O_APPEND write, which needs no
+lock. Past MAX_BYTES a timeline is cut to its newest half, and the state
+sweeper removes timelines idle past the session TTL.
+
+``hook-timeline.py`` (gemini_lib.timeline_report) aggregates the timelines
+per prompt id and per chain: step durations, gate-failure rates and retries.
+Set GEMINI_HOOK_TIMELINE=0 to record nothing.
+"""
+
+import os
+
+from gemini_lib.paths import gemini_state_dir, session_filename
+
+TIMELINE_DIR = "timeline"
+MAX_BYTES = 256 * 1024
+
+
+def enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_TIMELINE", "1").lower() not in {"0", "false", "no"}
+
+
+def timeline_dir(create: bool = True) -> str:
+    return os.path.join(gemini_state_dir(create), TIMELINE_DIR)
+
+
+def timeline_path(session_id: str) -> str:
+    return os.path.join(timeline_dir(), session_filename(session_id))
+
+
+def record(session_id: str | None, event: str, **fields) -> None:
+    """Append one event to the session's timeline; empty fields are left out."""
+    if not session_id or not enabled():
+        return
+    import json
+    import time
+
+    entry = {"t": round(time.time(), 3), "e": event}
+    entry.update((key, value) for key, value in fields.items() if value not in (None, ""))
+    line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+    path = timeline_path(session_id)
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        try:
+            fd = os.open(path, flags, 0o600)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, flags, 0o600)
+        try:
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    except OSError:
+        return
+    if size > MAX_BYTES:
+        from gemini_lib.sweeper import trim_file
+
+        trim_file(path, MAX_BYTES)
+
+
+def record_step(session_id: str | None, state: dict) -> None:
+    """A ``step`` event for the chain state after-tool.py has just saved."""
+    step = state.get("current_step", 0)
+    if not step:
+        return
+    prompts = state.get("chain_prompts") or []
+    record(
+        session_id, "step",
+        c=state.get("chain_id"), s=step, n=state.get("total_steps"),
+        p=prompts[step - 1] if step <= len(prompts) else None,
+        g=state.get("pending_gate"),
+    )
@@ -0,0 +1,235 @@
+"""
+Aggregate chain timelines (gemini_lib.timeline) per prompt id and per chain.
+
+Each session's events are replayed in order into step runs: one per step of
+one chain run, from the step's first ``step`` event until the chain moved to
+another step or ended. Gate verdicts, denies and compactions are charged to
+the step their chain was on. If an event carries no chain id (a FAIL verdict
+on a call without one), it goes to the step seen last in the session.
+
+Reported per prompt id (``<chain> step <n>`` when the chain's step ids are
+not known): how many times the step ran, p50/p95/max wall time of the runs
+that finished, gate verdicts and the share that failed, and retries. Retries
+are the extra round trips: denied calls plus re-renders of the same step.
+Per chain (chain id without its ``#<run>`` suffix): runs, finished runs,
+p50/p95/max end-to-end time, steps, FAIL share, retries and compactions. The
+slowest come first.
+"""
+
+import json
+import os
+import time
+
+from gemini_lib.paths import session_filename
+from gemini_lib.timeline import enabled, timeline_dir
+from gemini_lib.trace_report import percentile
+
+
+def chain_name(chain_id: str) -> str:
+    return chain_id.split("#", 1)[0] if chain_id else "?"
+
+
+def only_chain(events: list[dict], chain: str) -> list[dict]:
+    """Events of ``chain`` (a chain id, or a name matching every run), plus chainless ones."""
+    return [e for e in events if not e.get("c") or chain in (e["c"], chain_name(e["c"]))]
+
+
+def load_events(path: str, since: float | None = None) -> list[dict]:
+    events = []
+    try:
+        f = open(path, encoding="utf-8")
+    except OSError:
+        return events
+    with f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # first line of a trimmed timeline
+            if since and event.get("t", 0) < since:
+                continue
+            events.append(event)
+    return events
+
+
+def load_sessions(session: str | None = None, since: float | None = None) -> dict[str, list[dict]]:
+    """Session file name -> its events, oldest first."""
+    directory = timeline_dir(create=False)
+    try:
+        names = sorted(n for n in os.listdir(directory) if not n.endswith(".tmp"))
+    except OSError:
+        return {}
+    if session:
+        names = [n for n in names if n == session_filename(session)]
+    sessions = {}
+    for name in names:
+        events = load_events(os.path.join(directory, name), since)
+        if events:
+            sessions[name] = events
+    return sessions
+
+
+def step_runs(events: list[dict]) -> list[dict]:
+    """Replay one session's events into step runs."""
+    runs: list[dict] = []
+    current: dict[str, dict] = {}  # chain id -> step run in progress
+    last = None
+    for event in events:
+        kind, chain, at = event.get("e"), event.get("c", ""), event.get("t", 0.0)
+        if kind == "step":
+            run = current.get(chain)
+            if run is not None and run["step"] == event.get("s"):
+                run["renders"] += 1
+            else:
+                if run is not None:
+                    run["end"] = at
+                run = {
+                    "chain": chain, "step": event.get("s"), "total": event.get("n"),
+                    "prompt": event.get("p") or f"{chain_name(chain)} step {event.get('s')}",
+                    "start": at, "end": None, "renders": 0, "pass": 0, "fail": 0,
+                    "denies": 0, "compactions": 0, "last": False,
+                }
+                runs.append(run)
+                current[chain] = run
+            last = run
+        elif kind == "end":
+            run = current.pop(chain, None)
+            if run is not None:
+                run["end"] = at
+                run["last"] = True
+        elif kind in ("verdict", "deny", "compact"):
+            run = current.get(chain) if chain else last
+            if run is None:
+                continue
+            if kind == "verdict":
+                run["fail" if event.get("v") == "FAIL" else "pass"] += 1
+            elif kind == "deny":
+                run["denies"] += 1
+            else:
+                run["compactions"] += 1
+    return runs
+
+
+def _durations(values: list[float]) -> str:
+    if not values:
+        return f"{'-':>8} {'-':>8} {'-':>8}"
+    values = sorted(values)
+    return f"{percentile(values, 50):8.1f} {percentile(values, 95):8.1f} {values[-1]:8.1f}"
+
+
+def _fail_share(passed: int, failed: int) -> str:
+    verdicts = passed + failed
+    return f"{failed * 100 / verdicts:5.0f}%" if verdicts else f"{'-':>6}"
+
+
+def by_prompt(runs: list[dict]) -> list[tuple[str, dict]]:
+    groups: dict[str, dict] = {}
+    for run in runs:
+        group = groups.setdefault(run["prompt"], {"runs": 0, "durations": [], "pass": 0, "fail": 0,
+                                                  "retries": 0})
+        group["runs"] += 1
+        if run["end"] is not None:
+            group["durations"].append(run["end"] - run["start"])
+        group["pass"] += run["pass"]
+        group["fail"] += run["fail"]
+        group["retries"] += run["denies"] + run["renders"]
+    return sorted(groups.items(), key=lambda item: -_median(item[1]["durations"]))
+
+
+def by_chain(runs: list[dict]) -> list[tuple[str, dict]]:
+    chain_runs: dict[str, list[dict]] = {}
+    for run in runs:
+        chain_runs.setdefault(run["chain"], []).append(run)
+    groups: dict[str, dict] = {}
+    for chain, steps in chain_runs.items():
+        group = groups.setdefault(chain_name(chain), {"runs": 0, "durations": [], "steps": 0, "pass": 0,
+                                                      "fail": 0, "retries": 0, "compactions": 0})
+        group["runs"] += 1
+        if steps[-1]["last"]:
+            group["durations"].append(steps[-1]["end"] - steps[0]["start"])
+        group["steps"] += len(steps)
+        for run in steps:
+            group["pass"] += run["pass"]
+            group["fail"] += run["fail"]
+            group["retries"] += run["denies"] + run["renders"]
+            group["compactions"] += run["compactions"]
+    return sorted(groups.items(), key=lambda item: -_median(item[1]["durations"]))
+
+
+def _median(values: list[float]) -> float:
+    return percentile(sorted(values), 50) if values else -1.0
+
+
+def format_prompts(groups: list[tuple[str, dict]]) -> str:
+    header = (f"{'prompt':32} {'runs':>5} {'done':>5} {'p50 s':>8} {'p95 s':>8} {'max s':>8}"
+              f" {'verdicts':>8} {'fail':>6} {'retries':>7}")
+    lines = [header, "-" * len(header)]
+    for prompt, group in groups:
+        verdicts = group["pass"] + group["fail"]
+        lines.append(f"{prompt[:32]:32} {group['runs']:5} {len(group['durations']):5} "
+                     f"{_durations(group['durations'])} {verdicts:8} "
+                     f"{_fail_share(group['pass'], group['fail'])} {group['retries']:7}")
+    return "\n".join(lines)
+
+
+def format_chains(groups: list[tuple[str, dict]]) -> str:
+    header = (f"{'chain':32} {'runs':>5} {'done':>5} {'p50 s':>8} {'p95 s':>8} {'max s':>8}"
+              f" {'steps':>6} {'fail':>6} {'retries':>7} {'compact':>7}")
+    lines = [header, "-" * len(header)]
+    for chain, group in groups:
+        lines.append(f"{chain[:32]:32} {group['runs']:5} {len(group['durations']):5} "
+                     f"{_durations(group['durations'])} {group['steps']:6} "
+                     f"{_fail_share(group['pass'], group['fail'])} {group['retries']:7} "
+                     f"{group['compactions']:7}")
+    return "\n".join(lines)
+
+
+def format_events(events: list[dict]) -> str:
+    """One session's timeline, one line per event, with time since the first."""
+    if not events:
+        return ""
+    origin = events[0].get("t", 0.0)
+    lines = []
+    for event in events:
+        at = time.strftime("%H:%M:%S", time.localtime(event.get("t", 0.0)))
+        offset = event.get("t", 0.0) - origin
+        detail = " ".join(f"{k}={v}" for k, v in event.items() if k not in ("t", "e"))
+        lines.append(f"{at} +{offset:8.1f}s  {event.get('e', '?'):8} {detail}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chain step durations, gate failures and retries")
+    parser.add_argument("command", nargs="?", default="report", choices=["report", "show"])
+    parser.add_argument("--session", default=None, help="only this session id (required for show)")
+    parser.add_argument("--chain", default=None, help="only this chain (id, with or without #<run>)")
+    parser.add_argument("--since", type=float, default=None, help="only the last N hours")
+    args = parser.parse_args(argv)
+    if args.command == "show" and not args.session:
+        parser.error("show needs --session")
+
+    since = time.time() - args.since * 3600 if args.since else None
+    sessions = load_sessions(args.session, since)
+    if args.chain:
+        sessions = {name: only_chain(events, args.chain) for name, events in sessions.items()}
+        sessions = {name: events for name, events in sessions.items() if events}
+    if not sessions:
+        print("no chain timeline recorded" + ("" if enabled() else " (GEMINI_HOOK_TIMELINE=0)"))
+        return 0
+
+    if args.command == "show":
+        for events in sessions.values():
+            print(format_events(events))
+        return 0
+
+    runs = [run for events in sessions.values() for run in step_runs(events)]
+    if not runs:
+        print(f"{len(sessions)} sessions, no chain steps recorded")
+        return 0
+    print(f"{len(runs)} steps, {len(sessions)} sessions\n")
+    print(format_prompts(by_prompt(runs)))
+    print()
+    print(format_chains(by_chain(runs)))
+    return 0
@@ -0,0 +1,145 @@
+"""
+Opt-in per-phase latency tracing for the hooks.
+
+With ``GEMINI_HOOK_TRACE=1`` every hook invocation appends one JSON line to
+``runtime-state/gemini-hooks/trace.jsonl`` (``GEMINI_HOOK_TRACE_FILE``
+overrides the path):
+
+    {"ts": 1760000000.12, "hook": "before-agent", "where": "inproc", "pid": 4242,
+     "session": "s1", "outcome": "inproc", "total_ms": 41.2,
+     "phases": {"stdin": 0.1, "parse": 0.3, "scan": 0.1, "state_load": 6.2},
+     "counters": {"cas_retries": 1}}
+
+run_hook() (and the daemon, for requests it serves) opens the trace; hook code
+marks phases with ``with trace.span("name"):``. Phases are timed with
+time.perf_counter() and summed if a name repeats. With tracing off begin()
+leaves no active trace and span() returns a shared no-op context manager, so
+instrumented code pays a global lookup and a call per phase. Contention is
+recorded with ``trace.count("name", n)``; counters are summed per invocation
+and omitted when none were bumped.
+
+A hook killed by Gemini's timeout writes no record. ``hook-trace.py report``
+aggregates the file into p50/p95/p99 per hook and phase.
+"""
+
+import os
+import time
+
+TRACE_FILENAME = "trace.jsonl"
+
+_active: "Trace | None" = None
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("phases", "name", "start")
+
+    def __init__(self, phases: dict, name: str):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        elapsed = (time.perf_counter() - self.start) * 1000
+        self.phases[self.name] = self.phases.get(self.name, 0.0) + elapsed
+        return False
+
+
+class Trace:
+    """Timings for one hook invocation."""
+
+    __slots__ = ("hook", "where", "start", "phases", "counters", "fields")
+
+    def __init__(self, hook: str, where: str):
+        self.hook = hook
+        self.where = where
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.counters: dict[str, float] = {}
+        self.fields: dict = {}
+
+    def record(self) -> dict:
+        record = {
+            "ts": round(time.time(), 3),
+            "hook": self.hook,
+            "where": self.where,
+            "pid": os.getpid(),
+            **self.fields,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "phases": {name: round(ms, 3) for name, ms in self.phases.items()},
+        }
+        if self.counters:
+            record["counters"] = {name: round(n, 3) for name, n in self.counters.items()}
+        return record
+
+
+def enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_TRACE", "").lower() in {"1", "true", "yes"}
+
+
+def trace_path() -> str:
+    override = os.environ.get("GEMINI_HOOK_TRACE_FILE")
+    if override:
+        return override
+    from gemini_lib.paths import gemini_state_dir
+
+    return os.path.join(gemini_state_dir(), TRACE_FILENAME)
+
+
+def begin(hook: str, where: str = "inproc") -> None:
+    """Start tracing one invocation if GEMINI_HOOK_TRACE is set."""
+    global _active
+    _active = Trace(hook, where) if enabled() else None
+
+
+def span(name: str):
+    """Context manager timing one phase of the current invocation."""
+    if _active is None:
+        return _NO_SPAN
+    return _Span(_active.phases, name)
+
+
+def count(name: str, n: float = 1) -> None:
+    """Add ``n`` to a named counter (retries, lock waits) of the current record."""
+    if _active is not None:
+        _active.counters[name] = _active.counters.get(name, 0) + n
+
+
+def note(**fields) -> None:
+    """Attach fields (session id, outcome, ...) to the current record."""
+    if _active is not None:
+        _active.fields.update(fields)
+
+
+def finish() -> None:
+    """Append the current invocation's record to the sink and clear it."""
+    global _active
+    trace, _active = _active, None
+    if trace is None:
+        return
+    import json
+
+    line = (json.dumps(trace.record(), separators=(",", ":")) + "\n").encode()
+    try:
+        fd = os.open(trace_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
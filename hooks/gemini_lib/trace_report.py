@@ -0,0 +1,141 @@
+"""
+Aggregate gemini_lib.trace records into per-hook, per-phase latency percentiles.
+
+Records are grouped by hook and by where they ran: ``inproc`` and ``daemon``
+records of the same hook time different work (a forwarded run's client record
+covers stdin and the socket round trip, the daemon's record covers the
+handler), so they are reported separately.
+
+Counters (CAS retries, lock waits) get their own table: how many runs bumped
+each counter at all, its total, and its largest single-run value.
+"""
+
+import json
+import math
+import os
+import time
+
+from gemini_lib.trace import trace_path
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_records(path: str, hook: str | None = None, session: str | None = None,
+                 since: float | None = None) -> list[dict]:
+    records = []
+    try:
+        f = open(path, encoding="utf-8")
+    except OSError:
+        return records
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn line from a killed hook
+            if hook and record.get("hook") != hook:
+                continue
+            if session and record.get("session") != session:
+                continue
+            if since and record.get("ts", 0) < since:
+                continue
+            records.append(record)
+    return records
+
+
+def aggregate(records: list[dict]) -> dict[tuple[str, str], dict[str, list[float]]]:
+    """(hook, where) -> phase -> sorted samples; ``total`` is the whole run."""
+    groups: dict[tuple[str, str], dict[str, list[float]]] = {}
+    for record in records:
+        key = (record.get("hook", "?"), record.get("where", "?"))
+        phases = groups.setdefault(key, {})
+        phases.setdefault("total", []).append(record.get("total_ms", 0.0))
+        for name, ms in (record.get("phases") or {}).items():
+            phases.setdefault(name, []).append(ms)
+    for phases in groups.values():
+        for samples in phases.values():
+            samples.sort()
+    return groups
+
+
+def aggregate_counters(records: list[dict]) -> dict[tuple[str, str], dict[str, list[float]]]:
+    """(hook, where) -> counter -> nonzero per-run values."""
+    groups: dict[tuple[str, str], dict[str, list[float]]] = {}
+    for record in records:
+        counters = record.get("counters")
+        if not counters:
+            continue
+        key = (record.get("hook", "?"), record.get("where", "?"))
+        for name, value in counters.items():
+            if value:
+                groups.setdefault(key, {}).setdefault(name, []).append(value)
+    return groups
+
+
+def format_counters(groups: dict[tuple[str, str], dict[str, list[float]]], runs: dict) -> str:
+    header = f"{'hook':24} {'where':7} {'counter':16} {'runs':>11} {'total':>9} {'max':>9}"
+    lines = [header, "-" * len(header)]
+    for (hook, where), counters in sorted(groups.items()):
+        for name, values in sorted(counters.items()):
+            share = f"{len(values)}/{runs.get((hook, where), 0)}"
+            lines.append(f"{hook:24} {where:7} {name:16} {share:>11} {sum(values):9.2f} {max(values):9.2f}")
+    return "\n".join(lines)
+
+
+def format_report(groups: dict[tuple[str, str], dict[str, list[float]]]) -> str:
+    header = f"{'hook':24} {'where':7} {'phase':16} {'n':>6}" + "".join(f" {f'p{p}':>9}" for p in PERCENTILES)
+    lines = [header, "-" * len(header)]
+    for (hook, where), phases in sorted(groups.items()):
+        # total first, then phases by descending p95
+        names = ["total"] + sorted(
+            (n for n in phases if n != "total"), key=lambda n: -percentile(phases[n], 95)
+        )
+        for name in names:
+            samples = phases[name]
+            cells = "".join(f" {percentile(samples, p):9.2f}" for p in PERCENTILES)
+            label = name if name == "total" else f"  {name}"
+            lines.append(f"{hook:24} {where:7} {label:16} {len(samples):6}{cells}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gemini hook latency report (ms)")
+    parser.add_argument("command", nargs="?", default="report", choices=["report", "clear"])
+    parser.add_argument("--file", default=None, help="trace file (default: GEMINI_HOOK_TRACE_FILE or runtime-state)")
+    parser.add_argument("--hook", default=None, help="only this hook")
+    parser.add_argument("--session", default=None, help="only this session id")
+    parser.add_argument("--since", type=float, default=None, help="only the last N hours")
+    args = parser.parse_args(argv)
+    path = args.file or trace_path()
+
+    if args.command == "clear":
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        print(f"cleared {path}")
+        return 0
+
+    since = time.time() - args.since * 3600 if args.since else None
+    records = load_records(path, args.hook, args.session, since)
+    if not records:
+        print(f"no trace records in {path} (set GEMINI_HOOK_TRACE=1 to record)")
+        return 1
+    sessions = {r.get("session") for r in records if r.get("session")}
+    print(f"{len(records)} runs, {len(sessions)} sessions, {path}\n")
+    groups = aggregate(records)
+    print(format_report(groups))
+    counters = aggregate_counters(records)
+    if counters:
+        runs = {key: len(phases["total"]) for key, phases in groups.items()}
+        print("\ncontention\n")
+        print(format_counters(counters, runs))
+    return 0
@@ -0,0 +1,131 @@
+"""
+Up-front validation of a message's chain steps and @framework references.
+
+before-agent.py used to resolve only the invoked ``>>id``. A typo in a later
+chain step was found by the MCP server only after it had run the steps before
+it. check_steps() resolves every step in one batched catalog lookup
+(Snapshot.missing: one hash-slot probe per id that never decodes a record),
+so a six-step chain costs about what one get() does. The prompt index, which
+is heavier, is loaded only when something is unknown, to suggest
+replacements. A step is never corrected to the id of a step next to it, which
+would turn a typo into a chain like ``>>summary --> >>summary``.
+
+Frameworks are checked against the methodologies the MCP server loads: one
+directory with a ``methodology.yaml`` per methodology under
+``<resources>/methodologies`` (MCP_RESOURCES_PATH, by default the installed
+claude-prompts package) and ``<workspace>/resources/methodologies``, plus
+any listed in GEMINI_HOOK_FRAMEWORKS (comma-separated). When no methodology
+definition is found, frameworks are not checked at all: a guessed list
+would flag valid names once the server's list moved on. Inline gate ids are not checked. The hooks have no gate registry to check
+them against, and the server reports unknown gates before it runs anything.
+"""
+
+import os
+
+METHODOLOGIES_DIR = "methodologies"
+METHODOLOGY_FILES = ("methodology.yaml", "methodology.yml")
+
+
+def _suggest(unknown: str, known: list[str]) -> str | None:
+    from gemini_lib.prompt_index import edit_distance
+
+    query = unknown.lower()
+    best = min(known, key=lambda k: edit_distance(query, k.lower()), default=None)
+    if best is None or edit_distance(query, best.lower()) > max(2, len(query) // 3):
+        return None
+    return best
+
+
+def check_steps(catalog, steps: list[str]) -> dict[str, str | None]:
+    """Unknown step ids -> closest known id (or None), from one batched lookup."""
+    unknown = catalog.missing(steps)
+    if not unknown:
+        return {}
+    from gemini_lib.prompt_index import get_index
+
+    index = get_index()
+    suggestions = {}
+    for step in unknown:
+        similar = index.suggest_ids(step) if index is not None else []
+        neighbours = _neighbours(steps, step)
+        suggestions[step] = next((s for s in similar if s.lower() not in neighbours), None)
+    return suggestions
+
+
+def _neighbours(steps: list[str], step: str) -> set[str]:
+    """Lower-cased ids of the steps just before and after each occurrence of ``step``."""
+    found = set()
+    for i, other in enumerate(steps):
+        if other == step:
+            found.update(s.lower() for s in steps[max(i - 1, 0):i + 2] if s != step)
+    return found
+
+
+def _methodology_dirs() -> list[str]:
+    from gemini_lib.paths import HOOKS_DIR, workspace_root
+
+    resources = os.environ.get("MCP_RESOURCES_PATH") or os.path.join(
+        os.path.dirname(HOOKS_DIR), "node_modules", "claude-prompts", "resources")
+    return [os.path.join(resources, METHODOLOGIES_DIR),
+            os.path.join(workspace_root(), "resources", METHODOLOGIES_DIR)]
+
+
+def _methodology_names(directory: str) -> list[str]:
+    """The ``methodology`` and ``id`` of one definition, then its directory name; [] if none."""
+    for filename in METHODOLOGY_FILES:
+        try:
+            f = open(os.path.join(directory, filename), encoding="utf-8")
+        except OSError:
+            continue
+        fields = {}
+        with f:
+            for line in f:
+                key, sep, value = line.partition(":")
+                if sep and key in ("methodology", "id"):
+                    fields.setdefault(key, value.strip().strip("'\""))
+        names = [fields.get("methodology"), fields.get("id"), os.path.basename(directory)]
+        return [name for name in names if name]
+    return []
+
+
+def server_frameworks() -> list[str]:
+    """Framework names from the methodology definitions the server loads; [] if none found."""
+    names = []
+    for directory in _methodology_dirs():
+        try:
+            entries = sorted(e.path for e in os.scandir(directory) if e.is_dir())
+        except OSError:
+            continue
+        for entry in entries:
+            names.extend(_methodology_names(entry))
+    return list(dict.fromkeys(names))
+
+
+def known_frameworks() -> list[str]:
+    """Known framework names; [] when the server's are not available."""
+    server = server_frameworks()
+    if not server:
+        return []
+    extra = os.environ.get("GEMINI_HOOK_FRAMEWORKS", "")
+    return [*server, *(f.strip() for f in extra.split(",") if f.strip())]
+
+
+def check_frameworks(frameworks: list[str]) -> dict[str, str | None]:
+    """Unknown @framework names (case-insensitive) -> closest known name; {} if unknowable."""
+    known = known_frameworks()
+    if not known:
+        return {}
+    lowered = {k.lower() for k in known}
+    return {
+        name: _suggest(name, known)
+        for name in dict.fromkeys(frameworks)
+        if name.lower() not in lowered
+    }
+
+
+def format_unknown(kind: str, sigil: str, unknown: dict[str, str | None]) -> list[str]:
+    lines = []
+    for name, suggestion in unknown.items():
+        hint = f" (did you mean {sigil}{suggestion}?)" if suggestion else ""
+        lines.append(f"  Unknown {kind}: {sigil}{name}{hint}")
+    return lines
@@ -0,0 +1,393 @@
+"""
+Change-fingerprinted cache of Ralph's shell verification results.
+
+ralph-stop.py reruns its verification command (``npm test``, ``pytest``,
+``cargo test``, ...) at every SessionEnd, even when nothing has changed since
+the last run. stop.py hands ralph-stop a ``subprocess`` stand-in whose run()
+goes through cached_run(). ralph-stop still decides what a result means and
+updates its own loop state, but the command itself only runs when the tree
+has changed.
+
+Fingerprint: when the command's cwd is in a git work tree, the workspace
+itself is fingerprinted (workspace_fingerprint): a BLAKE2 digest over the
+command, its cwd, HEAD, ``git status --porcelain=v2`` with untracked files,
+and the content digest of every path that status lists. Any edit to a
+tracked or untracked file changes it, however it was made (``sed -i``, ``git
+checkout``, an editor), so a verdict is reused for VERDICT_TTL. Only files
+git ignores are not seen; the TTL bounds how long such a change can hide.
+
+Outside git, the files the Ralph loop has touched are the only evidence:
+ralph_journal.flush() adds them to
+``runtime-state/gemini-hooks/verify-files/<ralph session>`` as it replays
+file_change records, and the digest covers those files. Edits made any other
+way are not seen, so only FAIL verdicts are cached that way, for
+FALLBACK_TTL: a stale FAIL costs one more loop iteration, a stale PASS would
+end the loop on a broken tree. With no recorded files nothing is cached.
+
+File digests are cached by (mtime_ns, size) the way git's index is; a file
+modified within the last RACY_WINDOW seconds is always re-read. Verdicts
+(return code and captured output) are kept in
+``runtime-state/gemini-hooks/verify-cache.bin`` as a marshal-encoded
+``(format, files, verdicts)``. At most MAX_VERDICTS are kept, and each output
+stream is cut to its last MAX_OUTPUT bytes. Set GEMINI_HOOK_VERIFY_CACHE=0 to
+always run.
+
+Only shell commands that look like verification (ralph_tracker's
+indicators), and whose output is captured, are cached. Anything else goes
+straight to subprocess.run().
+
+On a miss the command runs with the caller's own Popen arguments (stdin,
+env, close_fds, ...) under an overall deadline: the smaller of the caller's
+timeout and GEMINI_HOOK_VERIFY_DEADLINE (default 240 s). Unless the caller
+chose a session or process group, it gets a session of its own, so that past
+the deadline every process it started is killed; subprocess.TimeoutExpired
+is then raised, as subprocess.run() would. With
+GEMINI_HOOK_VERIFY_WORKERS above 1, a plain ``a && b && c`` (no quoting,
+pipes or substitutions) is treated as independent commands. They run on up
+to that many workers, and the result is that of the first command, in
+order, that failed. This is opt-in, because ``build && test`` is not
+independent.
+"""
+
+import marshal
+import os
+import subprocess
+import time
+
+from gemini_lib.paths import gemini_state_dir, session_filename
+
+FILES_DIR = "verify-files"
+CACHE_FILENAME = "verify-cache.bin"
+CACHE_FORMAT = 2
+MAX_VERDICTS = 32
+MAX_OUTPUT = 256 * 1024  # bytes kept per stream
+VERDICT_TTL = 3600  # workspace fingerprint (git)
+FALLBACK_TTL = 300  # Ralph-touched files only; FAIL verdicts only
+GIT_TIMEOUT = 10.0
+DEADLINE = 240.0  # seconds
+RACY_WINDOW = 2.0  # seconds; newer files are always re-hashed
+UNSPLITTABLE = set("'\"`$()|;<>\\\n")
+# subprocess.run() arguments that Popen does not take, or that execute() sets itself
+RUN_ONLY_ARGS = frozenset({
+    "input", "capture_output", "timeout", "check", "stdout", "stderr",
+    "text", "universal_newlines", "encoding", "errors",
+})
+
+
+def enabled() -> bool:
+    return os.environ.get("GEMINI_HOOK_VERIFY_CACHE", "1").lower() not in {"0", "false", "no"}
+
+
+def _setting(name: str, default: float) -> float:
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _files_path(ralph_session: str) -> str:
+    return os.path.join(gemini_state_dir(), FILES_DIR, session_filename(ralph_session))
+
+
+def tracked_files(ralph_session: str) -> list[str]:
+    try:
+        with open(_files_path(ralph_session)) as f:
+            return [line for line in f.read().splitlines() if line]
+    except OSError:
+        return []
+
+
+def add_files(ralph_session: str, paths: list[str]) -> None:
+    """Add ``paths`` to the session's tracked files (called by ralph_journal.flush)."""
+    known = tracked_files(ralph_session)
+    new = [p for p in dict.fromkeys(paths) if p and p not in set(known)]
+    if not new:
+        return
+    path = _files_path(ralph_session)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w") as f:
+            f.write("".join(f"{p}\n" for p in [*known, *new]))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _load() -> tuple[dict, dict]:
+    try:
+        with open(os.path.join(gemini_state_dir(), CACHE_FILENAME), "rb") as f:
+            fmt, files, verdicts = marshal.load(f)
+        if fmt == CACHE_FORMAT:
+            return files, verdicts
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return {}, {}
+
+
+def _save(files: dict, verdicts: dict) -> None:
+    path = os.path.join(gemini_state_dir(), CACHE_FILENAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            marshal.dump((CACHE_FORMAT, files, verdicts), f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _file_digest(path: str, files: dict, now: float) -> bytes:
+    """Content digest of ``path``, reusing ``files[path]`` while its stat is unchanged."""
+    import hashlib
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        files.pop(path, None)
+        return b"missing"
+    cached = files.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+    except OSError:
+        return b"unreadable"
+    value = digest.digest()
+    if st.st_mtime_ns < (now - RACY_WINDOW) * 1e9:
+        files[path] = (st.st_mtime_ns, st.st_size, value)
+    return value
+
+
+def fingerprint(command: str, cwd: str | None, paths: list[str], files: dict) -> str:
+    """Digest of the command and the current content of ``paths``."""
+    import hashlib
+
+    now = time.time()
+    base = cwd or os.getcwd()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{command}\0{base}\0".encode())
+    for path in sorted(set(paths)):
+        full = os.path.join(base, path)
+        digest.update(full.encode() + b"\0" + _file_digest(full, files, now))
+    return digest.hexdigest()
+
+
+def _git(base: str, *args: str) -> bytes | None:
+    env = dict(os.environ, GIT_OPTIONAL_LOCKS="0", LC_ALL="C")
+    try:
+        result = subprocess.run(
+            ["git", "-C", base, *args], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, env=env, timeout=GIT_TIMEOUT, check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _status_paths(status: bytes) -> list[bytes]:
+    """Paths (relative to the top level) listed by ``git status --porcelain=v2 -z``."""
+    paths = []
+    entries = iter(status.split(b"\0"))
+    for entry in entries:
+        kind = entry[:1]
+        if kind == b"1":
+            paths.append(entry.split(b" ", 8)[-1])
+        elif kind == b"2":
+            paths.append(entry.split(b" ", 9)[-1])
+            next(entries, None)  # the rename's original path
+        elif kind == b"u":
+            paths.append(entry.split(b" ", 10)[-1])
+        elif kind == b"?":
+            paths.append(entry[2:])
+    return paths
+
+
+def workspace_fingerprint(command: str, cwd: str | None, files: dict) -> str | None:
+    """Digest of the command and the git work tree it runs in; None outside git."""
+    import hashlib
+
+    base = cwd or os.getcwd()
+    top = _git(base, "rev-parse", "--show-toplevel")
+    if not top:
+        return None
+    status = _git(base, "status", "--porcelain=v2", "--branch", "-z", "--untracked-files=all")
+    if status is None:
+        return None
+    top = os.fsdecode(top.rstrip(b"\n"))
+    now = time.time()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{command}\0{base}\0".encode() + status)
+    for path in sorted(set(_status_paths(status))):
+        full = os.path.join(top, os.fsdecode(path))
+        digest.update(path + b"\0" + _file_digest(full, files, now))
+    return digest.hexdigest()
+
+
+def is_verification(args, kwargs: dict) -> bool:
+    """Whether a subprocess.run() call is a cacheable verification command."""
+    from gemini_lib.ralph_tracker import is_verification_command
+
+    if not (kwargs.get("shell") and isinstance(args, str)):
+        return False
+    captured = kwargs.get("capture_output") or kwargs.get("stdout") == subprocess.PIPE
+    if not captured or kwargs.get("input") is not None or kwargs.get("stdin") is not None:
+        return False
+    return is_verification_command(args)
+
+
+def split_independent(command: str, workers: int) -> list[str]:
+    if workers < 2 or UNSPLITTABLE & set(command) or "||" in command:
+        return [command]
+    parts = [part.strip() for part in command.split("&&")]
+    return parts if len(parts) > 1 and all(parts) else [command]
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, 9)
+    except OSError:
+        proc.kill()
+
+
+def execute(command: str, kwargs: dict, timeout: float) -> tuple[int, bytes, bytes]:
+    """
+    Run ``command`` (split into independent parts when enabled) within ``timeout``.
+
+    Returns (return code, stdout, stderr) as bytes; raises TimeoutExpired.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    deadline = time.monotonic() + timeout
+    workers = int(_setting("GEMINI_HOOK_VERIFY_WORKERS", 1))
+    parts = split_independent(command, workers)
+    running: list[subprocess.Popen] = []
+    results: list[tuple[int, bytes, bytes] | None] = [None] * len(parts)
+    popen_args = {k: v for k, v in kwargs.items() if k not in RUN_ONLY_ARGS}
+    popen_args["stdout"] = subprocess.PIPE
+    popen_args["stderr"] = subprocess.PIPE if kwargs.get("capture_output") else kwargs.get("stderr")
+    if "start_new_session" not in kwargs and "process_group" not in kwargs:
+        popen_args["start_new_session"] = True
+
+    def run_part(n: int) -> None:
+        if time.monotonic() >= deadline:
+            return
+        proc = subprocess.Popen(parts[n], **popen_args)
+        running.append(proc)
+        try:
+            out, err = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            proc.communicate()
+            return
+        results[n] = (proc.returncode, out, err or b"")
+
+    if len(parts) == 1:
+        run_part(0)
+    else:
+        pool = ThreadPoolExecutor(max_workers=min(workers, len(parts)))
+        try:
+            for future in [pool.submit(run_part, n) for n in range(len(parts))]:
+                future.result()
+        finally:
+            for proc in running:
+                if proc.poll() is None:
+                    _kill(proc)
+            pool.shutdown(wait=True)
+
+    if any(result is None for result in results):
+        raise subprocess.TimeoutExpired(command, timeout)
+    returncode = next((code for code, _, _ in results if code), 0)
+    return (
+        returncode,
+        b"".join(out for _, out, _ in results),
+        b"".join(err for _, _, err in results),
+    )
+
+
+def _completed(args, kwargs: dict, returncode: int, out: bytes, err: bytes) -> subprocess.CompletedProcess:
+    if kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding") or kwargs.get("errors"):
+        encoding = kwargs.get("encoding") or "utf-8"
+        errors = kwargs.get("errors") or "replace"
+        out, err = out.decode(encoding, errors), err.decode(encoding, errors)
+    if not (kwargs.get("capture_output") or kwargs.get("stderr") == subprocess.PIPE):
+        err = None  # merged into stdout, or never captured
+    result = subprocess.CompletedProcess(args, returncode, out, err)
+    if kwargs.get("check"):
+        result.check_returncode()
+    return result
+
+
+def cached_run(ralph_session: str | None, args, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() that reuses the verdict of an unchanged tree."""
+    if not is_verification(args, kwargs):
+        return subprocess.run(args, **kwargs)
+
+    from gemini_lib import trace
+
+    deadline = _setting("GEMINI_HOOK_VERIFY_DEADLINE", DEADLINE)
+    if kwargs.get("timeout") is not None:
+        deadline = min(deadline, kwargs["timeout"])
+    if not enabled():
+        code, out, err = execute(args, kwargs, deadline)
+        return _completed(args, kwargs, code, out, err)
+
+    files, verdicts = _load()
+    ttl, fail_only = VERDICT_TTL, False
+    with trace.span("verify_fingerprint"):
+        key = workspace_fingerprint(args, kwargs.get("cwd"), files)
+        if key is None:
+            paths = tracked_files(ralph_session) if ralph_session else []
+            key = fingerprint(args, kwargs.get("cwd"), paths, files) if paths else None
+            ttl, fail_only = FALLBACK_TTL, True
+    if key is None:
+        code, out, err = execute(args, kwargs, deadline)
+        return _completed(args, kwargs, code, out, err)
+    hit = verdicts.get(key)
+    if hit and hit[0] > time.time() - ttl:
+        trace.count("verify_cache_hit")
+        verdicts[key] = verdicts.pop(key)
+        _save(files, verdicts)
+        return _completed(args, kwargs, hit[1], hit[2], hit[3])
+
+    trace.count("verify_cache_miss")
+    with trace.span("verify_run"):
+        code, out, err = execute(args, kwargs, deadline)
+    verdicts.pop(key, None)
+    if fail_only and not code:
+        _save(files, verdicts)
+        return _completed(args, kwargs, code, out, err)
+    verdicts[key] = (time.time(), code, out[-MAX_OUTPUT:], err[-MAX_OUTPUT:])
+    while len(verdicts) > MAX_VERDICTS:
+        del verdicts[next(iter(verdicts))]
+    _save(files, verdicts)
+    return _completed(args, kwargs, code, out, err)
+
+
+class CachedSubprocess:
+    """The ``subprocess`` module, with run() going through cached_run()."""
+
+    def __init__(self, ralph_session: str | None):
+        self._session = ralph_session
+
+    def __getattr__(self, name: str):
+        return getattr(subprocess, name)
+
+    def run(self, args, **kwargs) -> subprocess.CompletedProcess:
+        return cached_run(self._session, args, **kwargs)
+
+
+def install(module, ralph_session: str | None) -> None:
+    """Route ``module``'s subprocess.run() calls through the cache."""
+    if getattr(module, "subprocess", None) is subprocess:
+        module.subprocess = CachedSubprocess(ralph_session)
+    if getattr(module, "run", None) is subprocess.run:
+        module.run = CachedSubprocess(ralph_session).run
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Precompiled hook bundles: build | status | clean
+
+Packs each hook script and the gemini_lib and shared lib modules it imports,
+compiled, into hooks/dist/<hook>.pyz. run-hook.py starts the bundle instead
+of the source script when it exists. npm install builds them (postinstall);
+rebuild after editing a hook, or let a stale bundle fall back to source.
+
+    python3 hooks/hook-bundle.py build
+    python3 hooks/hook-bundle.py status
+    python3 hooks/hook-bundle.py clean
+"""
+
+import os
+import sys
+
+# Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+from gemini_lib.bundle import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+additionalContext per session: injected, skipped as duplicate, cut by budget.
+
+Characters the hooks did not inject, and the estimated tokens that saved,
+from the ledgers kept by gemini_lib.context_ledger.
+
+    python3 hooks/hook-context.py
+    python3 hooks/hook-context.py --session <session id>
+"""
+
+import os
+import sys
+
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gemini_lib.context_ledger import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Hook daemon control: start | stop | status | run
+
+Keeps the hooks warm in one long-lived process listening on a per-user Unix
+socket. Hook scripts forward to it when it is running and fall back to
+in-process execution when it is not, so starting it is always optional.
+
+    python3 hooks/hook-daemon.py start
+    GEMINI_HOOK_DAEMON_SOCKET="$XDG_RUNTIME_DIR/my-session.sock" python3 hooks/hook-daemon.py start
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "lib"))
+
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", str(Path(__file__).resolve().parents[1]))
+
+from gemini_lib.daemon import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Hook state garbage collection: sweep | status
+
+Evicts chain state, pending-gate sidecars, lock files and Ralph journals of
+sessions that ended without a clean SessionEnd, and trims the trace and debug
+logs. Hooks start a background sweep on their own about once an hour; run it
+by hand to reclaim space now.
+
+    python3 hooks/hook-gc.py sweep
+    python3 hooks/hook-gc.py status
+    GEMINI_HOOK_SESSION_TTL_DAYS=3 python3 hooks/hook-gc.py sweep
+"""
+
+import os
+import sys
+
+# Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gemini_lib.sweeper import main
+
+if __name__ == "__main__":
+    sys.exit(main())
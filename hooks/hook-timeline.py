@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Chain execution timeline: report | show
+
+Step wall-clock time, gate-failure rates and retries per prompt id and per
+chain, from the per-session timelines the hooks record (gemini_lib.timeline).
+
+    python3 hooks/hook-timeline.py report --since 24
+    python3 hooks/hook-timeline.py report --chain chain-analyze
+    python3 hooks/hook-timeline.py show --session <session id>
+"""
+
+import os
+import sys
+
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gemini_lib.timeline_report import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Hook latency report: report | clear
+
+Reads the per-invocation records written when GEMINI_HOOK_TRACE=1 and prints
+p50/p95/p99 per hook and phase.
+
+    GEMINI_HOOK_TRACE=1 gemini
+    python3 hooks/hook-trace.py report --since 24
+    python3 hooks/hook-trace.py report --hook before-agent --session <id>
+"""
+
+import os
+import sys
+
+# Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gemini_lib.trace_report import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+#!/usr/bin/env node
+// npm postinstall: build the precompiled hook bundles (hooks/dist/*.pyz).
+// Best effort only. Hooks run from source without the bundles, so a machine
+// without Python (a CI image that only runs `npm ci`) must not fail the install.
+import { spawnSync } from "node:child_process";
+import path from "node:path";
+import { fileURLToPath } from "node:url";
+
+const script = path.join(path.dirname(fileURLToPath(import.meta.url)), "hook-bundle.py");
+const interpreters = process.platform === "win32" ? ["python3", "python"] : ["python3"];
+
+for (const python of interpreters) {
+  const result = spawnSync(python, [script, "build", "--quiet"], { stdio: "inherit" });
+  if (result.error?.code === "ENOENT") {
+    continue;
+  }
+  if (result.error || result.status !== 0) {
+    console.warn("hook bundles not built; hooks run from source");
+  }
+  process.exit(0);
+}
+console.warn("python3 not found; hook bundles not built, hooks run from source");
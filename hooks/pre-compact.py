@@ -11,42 +11,55 @@ Gemini adaptation of Claude's pre-compact.py — uses shared lib directly
 instead of importlib dynamic import.
 """
 
-import json
 import sys
 import os
-from pathlib import Path
 
 # Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
-sys.path.insert(0, str(Path(__file__).parent / "lib"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
 
 # Default workspace root to extension root, without overriding user config
-os.environ.setdefault("MCP_WORKSPACE", str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-from session_state import load_session_state, format_chain_reminder
+from gemini_lib import trace
+from gemini_lib.runner import run_hook
 
 
-def parse_hook_input() -> dict:
-    """Parse JSON input from Gemini hook system."""
+def flush_ralph_journal() -> None:
+    """Compaction is a natural boundary: push buffered Ralph records to the tracker."""
+    from gemini_lib import ralph_journal
+
     try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
-        return {}
+        ralph_journal.flush()
+    except Exception:
+        pass  # journal is kept and retried at the next boundary
 
 
-def main():
-    hook_input = parse_hook_input()
-    session_id = (
-        hook_input.get("session_id", "")
-        or hook_input.get("sessionId", "")
-    )
+def handle(raw: str) -> dict | None:
+    from gemini_lib.event import decode
+
+    with trace.span("parse"):
+        event = decode(raw)
+    with trace.span("journal_flush"):
+        flush_ralph_journal()
+    session_id = event.session_id
+    trace.note(session=session_id)
 
     if not session_id:
-        sys.exit(0)
+        return None
+
+    from session_state import format_chain_reminder
+    from gemini_lib import state_store
 
-    state = load_session_state(session_id)
+    with trace.span("state_load"):
+        state = state_store.load(session_id)
+
+    from gemini_lib import timeline
+
+    timeline.record(session_id, "compact", c=(state or {}).get("chain_id"),
+                    s=(state or {}).get("current_step"))
 
     if not state:
-        sys.exit(0)
+        return None
 
     # Only inject if there's active chain/gate/verify state
     has_chain = state.get("current_step", 0) > 0
@@ -54,19 +67,26 @@ def main():
     has_verify = state.get("pending_shell_verify") is not None
 
     if not has_chain and not has_gate and not has_verify:
-        sys.exit(0)
+        return None
 
+    from gemini_lib import context_ledger
+
+    # Always injected; the next hook after compaction re-injects the state too
     reminder = format_chain_reminder(state)
+    block = ["## Chain State (preserve across compaction)", reminder]
+    lines = context_ledger.admit(
+        session_id, "pre-compact", [("required", block, context_ledger.compact_state(state) or block[:1])]
+    )
+    context_ledger.compacted(session_id)
 
     hook_response = {
         "hookSpecificOutput": {
             "hookEventName": "PreCompress",
-            "additionalContext": f"## Chain State (preserve across compaction)\n{reminder}"
+            "additionalContext": "\n".join(lines)
         }
     }
-    print(json.dumps(hook_response))
-    sys.exit(0)
+    return hook_response
 
 
 if __name__ == "__main__":
-    main()
+    run_hook("pre-compact", handle)
@@ -10,169 +10,88 @@ Records:
 3. Delegated sub-agent summaries (task_tool)
 
 Gemini adaptation of Claude's ralph-context-tracker.py — uses Gemini
-tool name conventions. No output (silent tracking).
+tool name conventions. No output (silent tracking). Records go to a
+write-behind journal (gemini_lib.ralph_journal) that pre-compact.py and
+stop.py flush into session_tracker.
+
+Most calls happen with no Ralph loop running. As ``__main__`` this script is
+compiled on every run, so it holds only the idle check, which imports
+nothing, and ends with os._exit() rather than a full interpreter teardown.
+The store query is in gemini_lib.ralph_active and the tracking in
+gemini_lib.ralph_tracker, whose bytecode is cached. hooks.json starts the
+script directly rather than through run-hook.py, which would compile a
+second script and import zipimport first.
 """
 
-import json
 import os
 import sys
-from pathlib import Path
+
+# os.path rather than pathlib: this hook fires on every edit and usually exits
+# straight away, so the idle path imports nothing.
 
 # Add shared lib to path (lib/ is symlinked to core/hooks/lib/)
-sys.path.insert(0, str(Path(__file__).parent / "lib"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
 
 # Default workspace root to extension root, without overriding user config
-os.environ.setdefault("MCP_WORKSPACE", str(Path(__file__).resolve().parents[1]))
-
-from session_tracker import get_session_tracker
-from lesson_extractor import summarize_error
-from verify_active_store import load_verify_active_state
-
-
-def parse_hook_input() -> dict:
-    """Parse JSON input from Gemini hook system."""
-    try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
-        return {}
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+os.environ.setdefault("MCP_WORKSPACE", EXTENSION_ROOT)
 
 
 def get_active_ralph_session() -> str | None:
     """
     Get the currently active Ralph session ID.
 
-    Checks verify-state.db via shared verify_active_store.
+    Cached in runtime-state/gemini-hooks/ralph-active after the stat key of
+    verify-state.db and its WAL (see gemini_lib.ralph_active). Without a
+    store this is one stat(); when idle, two stat()s and a read.
     """
-    state = load_verify_active_state()
-    if not state:
-        return None
-    return state.get("sessionId")
-
-
-def extract_file_change_details(tool_input: dict, tool_name: str) -> dict | None:
-    """Extract file change details from write_file/replace tool input."""
-    if "replace" in tool_name:
-        return {
-            "file": tool_input.get("file_path", tool_input.get("filePath", "unknown")),
-            "type": "modify",
-            "details": f"Replace: {tool_input.get('old_string', tool_input.get('oldString', ''))[:50]}..."
-        }
-    elif "write_file" in tool_name:
-        content = tool_input.get("content", "")
-        return {
-            "file": tool_input.get("file_path", tool_input.get("filePath", "unknown")),
-            "type": "add",
-            "details": f"Write: {len(content)} chars"
-        }
-    return None
+    runtime = os.path.join(os.environ.get("MCP_WORKSPACE") or EXTENSION_ROOT, "runtime-state")
+    db = os.path.join(runtime, "verify-state.db")
+    key = ""
+    try:
+        st = os.stat(db)
+        key = f"{st.st_mtime_ns}:{st.st_size}"
+        st = os.stat(db + "-wal")
+        key += f" {st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        if not key:
+            return None
+    marker = os.path.join(runtime, "gemini-hooks", "ralph-active")
+    try:
+        with open(marker, "rb") as f:
+            seen, _, session = f.read().decode().partition("\n")
+        if seen == key:
+            return session or None
+    except OSError:
+        pass
+
+    from gemini_lib.ralph_active import refresh_marker
 
+    return refresh_marker(marker, key)
 
-def extract_bash_details(tool_input: dict, tool_response: str) -> dict | None:
-    """Extract command execution details from bash tool."""
-    command = tool_input.get("command", "")
-    if not command:
-        return None
-
-    cmd_summary = command[:100] + "..." if len(command) > 100 else command
-
-    verification_indicators = ["test", "npm run", "yarn", "pytest", "cargo test", "go test", "make"]
-    is_verification = any(ind in command.lower() for ind in verification_indicators)
-
-    return {
-        "command": cmd_summary,
-        "is_verification": is_verification,
-        "output_summary": summarize_error(tool_response) if tool_response else None
-    }
-
-
-def extract_task_details(tool_input: dict, tool_response: str) -> dict:
-    """Extract delegated sub-agent summary from task_tool payload."""
-    agent_type = (
-        tool_input.get("subagent_type")
-        or tool_input.get("agent_type")
-        or tool_input.get("subagentType")
-        or "unknown"
-    )
-    response_text = summarize_error(tool_response) if tool_response else "No response captured."
-    if len(response_text) > 500:
-        response_text = response_text[:500] + "..."
-
-    return {
-        "agent_type": str(agent_type),
-        "summary": response_text,
-    }
-
-
-def main():
-    hook_input = parse_hook_input()
-
-    tool_name = (
-        hook_input.get("tool_name", "")
-        or hook_input.get("toolName", "")
-        or hook_input.get("name", "")
-    )
-
-    # Only track during active Ralph sessions
-    ralph_session = get_active_ralph_session()
-    if not ralph_session:
-        sys.exit(0)
-
-    tool_input = (
-        hook_input.get("tool_input", {})
-        or hook_input.get("toolInput", {})
-        or {}
-    )
-    tool_response = (
-        hook_input.get("tool_response", {})
-        or hook_input.get("toolResponse", {})
-        or hook_input.get("result", {})
-    )
-
-    # Convert response to string if needed
-    if isinstance(tool_response, dict):
-        content = tool_response.get("content", "")
-        if isinstance(content, list):
-            tool_response = " ".join(
-                block.get("text", "") if isinstance(block, dict) else str(block)
-                for block in content
-            )
-        else:
-            tool_response = str(content)
-    else:
-        tool_response = str(tool_response)
-
-    tracker = get_session_tracker(ralph_session)
-
-    # Track file changes
-    if "replace" in tool_name or "write_file" in tool_name:
-        change = extract_file_change_details(tool_input, tool_name)
-        if change:
-            tracker.record_file_change(
-                file_path=change["file"],
-                change_type=change["type"],
-                details=change["details"]
-            )
-
-    # Track bash commands
-    if "bash" in tool_name.lower():
-        bash_details = extract_bash_details(tool_input, tool_response)
-        if bash_details and bash_details["is_verification"]:
-            pass  # Verification output captured by ralph-stop.py
-
-    # Track delegated sub-agent outputs
-    if "task_tool" in tool_name or "task" in tool_name.lower():
-        task_details = extract_task_details(tool_input, tool_response)
-        tracker.record_subagent_result(
-            agent_type=task_details["agent_type"],
-            summary=task_details["summary"],
-        )
-        tracker.append_loop_memory(
-            f"Sub-agent `{task_details['agent_type']}` completed: {task_details['summary']}"
-        )
 
+def handle(raw: str, ralph_session: str | None = None) -> dict | None:
+    # Only track during active Ralph sessions (checked before parsing the payload)
+    if ralph_session is None:
+        ralph_session = get_active_ralph_session()
+    if ralph_session:
+        from gemini_lib.ralph_tracker import track_traced
+
+        track_traced(ralph_session, raw)
     # No output needed — silent tracking
-    sys.exit(0)
+    return None
 
 
 if __name__ == "__main__":
-    main()
+    # Idle fast path: no Ralph loop, so skip the daemon round trip and the parse
+    # (unless payloads are being recorded, which run_hook does). Nothing has
+    # been written or opened, so skip interpreter teardown too.
+    session = get_active_ralph_session()
+    if not session and not os.environ.get("GEMINI_HOOK_RECORD"):
+        sys.stdin.buffer.read()
+        os._exit(0)
+
+    from gemini_lib.runner import run_hook
+
+    # The in-process handler reuses this check ("" = no loop)
+    run_hook("ralph-context-tracker", lambda raw: handle(raw, session or ""))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Start a hook: its prebuilt bundle when there is one, else its source script.
+
+    python3 hooks/run-hook.py <hook>
+
+hooks.json runs every hook through this launcher. hooks/dist/<hook>.pyz is
+built by hook-bundle.py (npm postinstall) and falls back to the source
+script by itself when stale. A missing bundle is not an error: pointing
+hooks.json at the .pyz directly would make python3 exit 2 without one,
+which Gemini treats as a blocking hook failure.
+
+Kept minimal on purpose: as ``__main__`` this file is compiled on every run.
+"""
+
+import os
+import sys
+
+HOOKS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or not sys.argv[1].replace("-", "").isalnum():
+        print("usage: run-hook.py <hook>", file=sys.stderr)
+        sys.exit(1)
+    hook = sys.argv[1]
+    bundle = os.path.join(HOOKS_DIR, "dist", f"{hook}.pyz")
+    script = os.path.join(HOOKS_DIR, f"{hook}.py")
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    if os.path.exists(bundle):
+        import zipimport
+
+        sys.path[0] = bundle
+        sys.argv[1:2] = []
+        sys.argv[0] = bundle
+        namespace["__file__"] = os.path.join(bundle, "__main__.py")
+        code = zipimport.zipimporter(bundle).get_code("__main__")
+    elif os.path.exists(script):
+        sys.argv[1:2] = []
+        sys.argv[0] = script
+        namespace["__file__"] = script
+        with open(script, "rb") as f:
+            code = compile(f.read(), script, "exec")
+    else:
+        print(f"run-hook.py: no hook named {hook}", file=sys.stderr)
+        sys.exit(1)
+    exec(code, namespace)
+
+
+main()
@@ -7,26 +7,87 @@ source hook. The lib/ symlink points to claude-prompts/hooks/lib/,
 so the parent of that resolved path contains ralph-stop.py.
 
 Output format is already Gemini-compatible (decision/block/reason at top level).
+
+ralph-stop's subprocess.run() is routed through gemini_lib.verify_cache, so
+a verification command reuses its last verdict while the workspace is
+unchanged, and otherwise runs under a deadline.
 """
+import os
 import sys
-import importlib.util
-from pathlib import Path
 
 # Resolve hooks directory from lib symlink target
 # lib/ -> ../node_modules/claude-prompts/hooks/lib/ -> parent = hooks/
-SHARED_LIB = Path(__file__).resolve().parent / "lib"
-CORE_HOOKS_DIR = SHARED_LIB.resolve().parent
+SHARED_LIB = os.path.join(os.path.dirname(os.path.realpath(__file__)), "lib")
+CORE_HOOKS_DIR = os.path.dirname(os.path.realpath(SHARED_LIB))
 
-ralph_stop_path = CORE_HOOKS_DIR / "ralph-stop.py"
+sys.path.insert(0, SHARED_LIB)
 
-if not ralph_stop_path.exists():
-    # Hook source not found — allow stop silently
-    sys.exit(0)
+# Default workspace root to extension root, without overriding user config
+os.environ.setdefault("MCP_WORKSPACE", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-spec = importlib.util.spec_from_file_location("ralph_stop", ralph_stop_path)
-ralph_stop = importlib.util.module_from_spec(spec)
-sys.modules["ralph_stop"] = ralph_stop
-spec.loader.exec_module(ralph_stop)
 
-if __name__ == "__main__":
+def flush_ralph_journal() -> None:
+    """Push buffered Ralph records to the tracker before ralph-stop reads it."""
+    from gemini_lib import ralph_journal
+
+    try:
+        ralph_journal.flush()
+    except Exception:
+        pass  # journal is kept and retried at the next boundary
+
+
+def install_verify_cache(module) -> None:
+    """Serve ralph-stop's verification runs from the fingerprinted cache."""
+    from gemini_lib import verify_cache
+    from gemini_lib.ralph_active import query_active_session
+
+    try:
+        session = query_active_session()
+    except Exception:
+        session = None  # no active loop known; verification still gets the deadline
+    verify_cache.install(module, session)
+
+
+def record_payload() -> None:
+    """With GEMINI_HOOK_RECORD set, capture stdin and hand ralph-stop a copy."""
+    if not os.environ.get("GEMINI_HOOK_RECORD"):
+        return
+    import io
+
+    from gemini_lib.recorder import record
+
+    raw = sys.stdin.read()
+    record("stop", raw)
+    sys.stdin = io.StringIO(raw)
+
+
+def load_ralph_stop():
+    """Import ralph-stop.py as ``ralph_stop``, or None when it is not installed."""
+    import importlib.util
+
+    # hook-bundle.py packs ralph-stop.py into the stop bundle as ralph_stop
+    spec = importlib.util.find_spec("ralph_stop")
+    if spec is None:
+        ralph_stop_path = os.path.join(CORE_HOOKS_DIR, "ralph-stop.py")
+        if not os.path.exists(ralph_stop_path):
+            return None
+        spec = importlib.util.spec_from_file_location("ralph_stop", ralph_stop_path)
+    ralph_stop = importlib.util.module_from_spec(spec)
+    sys.modules["ralph_stop"] = ralph_stop
+    spec.loader.exec_module(ralph_stop)
+    return ralph_stop
+
+
+def main() -> None:
+    record_payload()
+    flush_ralph_journal()
+    ralph_stop = load_ralph_stop()
+    if ralph_stop is None:
+        # Hook source not found — allow stop silently
+        sys.exit(0)
+    install_verify_cache(ralph_stop)
     ralph_stop.main()
+
+
+if __name__ == "__main__":
+    main()
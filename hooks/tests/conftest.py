@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the hook tests.
+
+Run from the repository root with ``python3 -m pytest hooks/tests``. Every
+test gets a throwaway MCP_WORKSPACE. Nothing here needs the shared lib
+(hooks/lib); tests that run a hook end to end skip when it is missing.
+"""
+
+import os
+import sys
+
+import pytest
+
+HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HOOKS_DIR)
+sys.path.insert(0, os.path.join(HOOKS_DIR, "bench"))
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    """A fresh MCP_WORKSPACE, and no cached store connection from the last test."""
+    from gemini_lib import state_store
+
+    monkeypatch.setenv("MCP_WORKSPACE", str(tmp_path))
+    monkeypatch.setenv("GEMINI_HOOK_DAEMON", "0")
+    monkeypatch.setenv("GEMINI_HOOK_STATE_MIRROR", "0")
+    monkeypatch.setattr(state_store, "_conn", None)
+    monkeypatch.setattr(state_store, "_conn_file", None)
+    return tmp_path
@@ -0,0 +1,85 @@
+"""
+The import and idle-latency budgets of bench/, as tests.
+
+What an early exit imports is checked on every run: it does not depend on
+the machine. The millisecond budgets do, so they only run with
+GEMINI_HOOK_BENCH_BUDGETS=1, on a quiet machine; GEMINI_HOOK_BENCH_SCALE
+multiplies them (the budgets were calibrated on a slow dev VM). Scenarios
+that need the shared lib skip when the hook cannot run without it.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+
+import bench_import_time
+import bench_ralph_idle
+
+TIMED = os.environ.get("GEMINI_HOOK_BENCH_BUDGETS", "").lower() in {"1", "true", "yes"}
+SCALE = float(os.environ.get("GEMINI_HOOK_BENCH_SCALE", "1.0"))
+RUNS = 5
+IDLE_RUNS = 60
+IDLE_BUDGET_MS = 1.0
+
+timed = pytest.mark.skipif(not TIMED, reason="timing budget; set GEMINI_HOOK_BENCH_BUDGETS=1")
+
+EARLY_EXITS = [scenario for scenario in bench_import_time.SCENARIOS if scenario[4]]
+
+
+def scenario_ids(scenarios) -> list[str]:
+    return [f"{script}: {name}" for script, name, *_ in scenarios]
+
+
+@pytest.fixture(scope="module")
+def bench_env():
+    env = bench_import_time.bench_env()
+    baseline = set(bench_import_time.importtime(["-c", "pass"], "", env)[0])
+    return env, baseline
+
+
+@pytest.mark.parametrize("script, scenario, payload, budget, early_exit", EARLY_EXITS,
+                         ids=scenario_ids(EARLY_EXITS))
+def test_early_exit_imports(bench_env, script, scenario, payload, budget, early_exit):
+    env, baseline = bench_env
+    totals, seen, rc = bench_import_time.measure(script, payload, env, 1, baseline)
+    assert totals, f"{script} exited {rc} on its early-exit path"
+    assert sorted(set(seen) - bench_import_time.EARLY_EXIT_ALLOWED) == []
+
+
+@timed
+@pytest.mark.parametrize("script, scenario, payload, budget, early_exit", bench_import_time.SCENARIOS,
+                         ids=scenario_ids(bench_import_time.SCENARIOS))
+def test_import_time_budget(bench_env, script, scenario, payload, budget, early_exit):
+    env, baseline = bench_env
+    totals, _, rc = bench_import_time.measure(script, payload, env, RUNS, baseline)
+    if not totals:
+        pytest.skip(f"{script} exited {rc}; shared lib missing?")
+    assert statistics.median(totals) <= budget * SCALE
+
+
+@timed
+@pytest.mark.parametrize("marker", [False, True], ids=["no verify-state.db", "cached idle marker"])
+def test_ralph_idle_overhead(workspace, monkeypatch, marker):
+    if marker:
+        runtime = workspace / "runtime-state"
+        runtime.mkdir()
+        db = runtime / "verify-state.db"
+        db.touch()
+        # Old enough for the marker to cache it (ralph_active.RACY_WINDOW)
+        os.utime(db, (time.time() - 60, time.time() - 60))
+        # The store is unreadable without the shared lib: seed the idle marker directly
+        from gemini_lib import ralph_active
+
+        monkeypatch.setattr(ralph_active, "query_active_session", lambda: None)
+        assert bench_ralph_idle.load_tracker().get_active_ralph_session() is None
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    hook = [sys.executable, str(bench_ralph_idle.HOOKS_DIR / "ralph-context-tracker.py")]
+    subprocess.run(hook, input=bench_ralph_idle.PAYLOAD, env=env, check=True)  # warm bytecode
+    _, deltas = bench_ralph_idle.paired(hook, [sys.executable, "-c", "pass"], IDLE_RUNS, env)
+    assert statistics.median(deltas) <= IDLE_BUDGET_MS * SCALE
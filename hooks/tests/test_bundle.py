@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from gemini_lib import bundle
+from gemini_lib.paths import HOOKS_DIR
+
+PAYLOAD = json.dumps({"tool_name": "prompt_engine", "session_id": "s1",
+                      "tool_input": {"chain_id": "c#1", "gate_verdict": "GATE_REVIEW: FAIL - no tests"}})
+
+
+@pytest.fixture
+def hooks_copy(tmp_path, monkeypatch):
+    """A copy of the hooks the bundle is built from, so sources can be edited."""
+    hooks = tmp_path / "hooks"
+    shutil.copytree(os.path.join(HOOKS_DIR, "gemini_lib"), hooks / "gemini_lib",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    for script in ("gate-enforce.py", "run-hook.py"):
+        shutil.copy2(os.path.join(HOOKS_DIR, script), hooks / script)
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    monkeypatch.setattr(bundle, "HOOKS_DIR", str(hooks))
+    monkeypatch.setattr(bundle, "DIST_DIR", str(hooks / "dist"))
+    return hooks, str(lib)
+
+
+def run(hooks, workspace) -> str:
+    env = dict(os.environ, MCP_WORKSPACE=str(workspace), PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, str(hooks / "run-hook.py"), "gate-enforce"],
+                            input=PAYLOAD, capture_output=True, text=True, env=env, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_status_goes_from_missing_to_fresh_to_stale(hooks_copy):
+    hooks, lib = hooks_copy
+    assert bundle.status("gate-enforce") == "missing"
+    result = bundle.build_one("gate-enforce", lib)
+    assert "gemini_lib.runner" in result["modules"]
+    assert "gemini_lib.timeline" in result["modules"]  # imported inside a function
+    assert bundle.status("gate-enforce") == "fresh"
+
+    source = hooks / "gemini_lib" / "timeline.py"
+    source.write_text(source.read_text() + "\n")
+    assert bundle.status("gate-enforce") == "stale"
+
+
+def test_bundle_output_matches_the_source_script(hooks_copy, workspace):
+    hooks, lib = hooks_copy
+    from_source = run(hooks, workspace / "a")
+    assert json.loads(from_source)["decision"] == "deny"
+
+    bundle.build_one("gate-enforce", lib)
+    assert run(hooks, workspace / "b") == from_source
+
+    # A stale bundle runs the edited source
+    script = hooks / "gate-enforce.py"
+    script.write_text(script.read_text().replace("Improve and retry with PASS.", "Edited."))
+    assert bundle.status("gate-enforce") == "stale"
+    assert json.loads(run(hooks, workspace / "c"))["reason"].endswith("Edited.")
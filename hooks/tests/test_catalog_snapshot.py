@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import types
+
+import pytest
+
+from gemini_lib import catalog, catalog_snapshot
+from gemini_lib.catalog_snapshot import Snapshot, build
+
+CACHE = {
+    "prompts": {
+        "Review": {"id": "Review", "category": "a", "description": "long text", "template": "..."},
+        "review": {"id": "review", "category": "b", "is_chain": True, "chain_steps": [{"id": "x"}]},
+        "plan": {"id": "plan", "arguments": [{"name": "goal", "default": "ship", "type": "string"}, "bad"]},
+    }
+}
+
+
+def snapshot(cache: dict = CACHE) -> Snapshot:
+    return Snapshot.from_buffer(build(cache, (1, 2)))
+
+
+def test_lookup_exact_then_case_insensitive():
+    snap = snapshot()
+    assert snap.version == (1, 2) and len(snap) == 3
+    assert snap.get("review")["category"] == "b"
+    assert snap.get("Review")["category"] == "a"
+    # No exact match: the first of the case variants in catalog order
+    assert snap.get("REVIEW")["category"] == "a"
+    assert snap.get("nope") is None
+
+
+def test_records_keep_only_hook_fields():
+    record = snapshot().get("plan")
+    assert record == {"id": "plan", "arguments": [{"name": "goal", "default": "ship"}]}
+    assert "template" not in snapshot().get("Review")
+
+
+def test_missing_keeps_order_and_drops_duplicates():
+    assert snapshot().missing(["b", "PLAN", "a", "b", "review"]) == ["b", "a"]
+
+
+def test_every_id_is_found_in_a_crowded_table():
+    ids = [f"prompt_{n}" for n in range(1000)]
+    snap = snapshot({"prompts": [{"id": i} for i in ids] + [{"no": "id"}]})
+    assert len(snap) == 1000
+    assert all(snap.get(i)["id"] == i for i in ids)
+    assert snap.missing(ids + ["prompt_1000"]) == ["prompt_1000"]
+
+
+def test_empty_catalog_still_answers():
+    snap = snapshot({"prompts": {}})
+    assert snap and snap.get("x") is None
+
+
+def test_foreign_or_truncated_data_is_rejected():
+    data = build(CACHE, (1, 2))
+    assert Snapshot.from_buffer(b"XXXX" + data[4:]) is None
+    assert Snapshot.from_buffer(data[:catalog_snapshot.HEADER.size + 4]) is None
+    assert Snapshot.from_buffer(b"") is None
+
+
+@pytest.fixture
+def server_cache(tmp_path, monkeypatch):
+    """A prompts cache file written as the server would, read through a stand-in cache_manager."""
+    path = tmp_path / "cache" / catalog.CACHE_FILENAME
+    path.parent.mkdir()
+    loads = []
+
+    def load_prompts_cache():
+        loads.append(1)
+        return json.loads(path.read_text())
+
+    module = types.ModuleType("cache_manager")
+    module.get_cache_dir = lambda: str(path.parent)
+    module.load_prompts_cache = load_prompts_cache
+    monkeypatch.setitem(sys.modules, "cache_manager", module)
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(catalog, "_version", None)
+    monkeypatch.setattr(catalog_snapshot, "_snapshot", None)
+    return path, loads
+
+
+def test_snapshot_is_rebuilt_only_for_a_new_catalog(server_cache, monkeypatch):
+    path, loads = server_cache
+    path.write_text(json.dumps(CACHE))
+    assert catalog_snapshot.get_snapshot().get("plan")["id"] == "plan"
+    assert os.path.exists(catalog_snapshot.snapshot_path())
+
+    # A fresh process reads the snapshot file, not the catalog
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(catalog_snapshot, "_snapshot", None)
+    assert catalog_snapshot.get_snapshot().get("Review")["category"] == "a"
+    assert len(loads) == 1
+
+    path.write_text(json.dumps({"prompts": {"new": {"id": "new"}}}))
+    snap = catalog_snapshot.get_snapshot()
+    assert snap.get("new") and snap.get("plan") is None
+    assert len(loads) == 2
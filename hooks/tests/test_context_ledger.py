@@ -0,0 +1,80 @@
+from gemini_lib import context_ledger
+
+STATE = {"chain_id": "c#1", "current_step": 1, "total_steps": 3}
+BLOCKS = [("state", ["[Chain] step 1/3"]), ("required", [">>analyze"])]
+
+
+def test_state_block_is_deduplicated():
+    assert context_ledger.admit("s1", "before-agent", BLOCKS, STATE) == ["[Chain] step 1/3", ">>analyze"]
+    assert context_ledger.admit("s1", "before-agent", BLOCKS, STATE) == [">>analyze"]
+    ledger = context_ledger.load("s1")
+    assert ledger["saved"] == len("[Chain] step 1/3") + 1
+    assert ledger["runs"] == 2
+
+
+def test_changed_state_is_injected_again():
+    context_ledger.admit("s1", "before-agent", BLOCKS, STATE)
+    moved = {**STATE, "current_step": 2}
+    assert context_ledger.admit("s1", "before-agent", BLOCKS, moved)[0] == "[Chain] step 1/3"
+
+
+def test_digests_are_per_hook():
+    context_ledger.admit("s1", "before-agent", BLOCKS, STATE)
+    assert context_ledger.admit("s1", "after-tool", BLOCKS, STATE)[0] == "[Chain] step 1/3"
+
+
+def test_compaction_clears_digests():
+    context_ledger.admit("s1", "before-agent", BLOCKS, STATE)
+    context_ledger.compacted("s1")
+    assert context_ledger.admit("s1", "before-agent", BLOCKS, STATE)[0] == "[Chain] step 1/3"
+
+
+def test_dedup_disabled(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_CONTEXT_DEDUP", "0")
+    context_ledger.admit("s1", "before-agent", BLOCKS, STATE)
+    assert context_ledger.admit("s1", "before-agent", BLOCKS, STATE)[0] == "[Chain] step 1/3"
+
+
+def test_budget_counts_every_block(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_CONTEXT_BUDGET", "1000")
+    context_ledger.admit("s1", "before-agent", BLOCKS, STATE)
+    assert context_ledger.load("s1")["chars"] == len("[Chain] step 1/3") + 1 + len(">>analyze") + 1
+
+
+def test_past_the_budget_optional_blocks_are_dropped(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_CONTEXT_BUDGET", "10")
+    blocks = [("optional", ["framework warning"]), ("required", [">>analyze"])]
+    assert context_ledger.admit("s1", "before-agent", blocks, STATE) == [">>analyze"]
+    assert context_ledger.load("s1")["dropped"] == len("framework warning") + 1
+
+
+def test_past_the_budget_state_and_required_blocks_are_shortened(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_CONTEXT_BUDGET", "20")
+    state = {**STATE, "pending_gate": "quality", "next_step": {"call": 'prompt_engine(chain_id:"c#1")'}}
+    blocks = [
+        ("state", ["[Chain] c#1 step 1/3", "  Gate: quality", "  Criteria: tests pass", "  call it"]),
+        ("required", ["[MCP] >>analyze (analysis)", "  prompt_engine(command:\">>analyze\")", "[MCP Chain] 3 steps"],
+         ["[MCP] >>analyze (analysis)", "  prompt_engine(command:\">>analyze\")"]),
+        ("required", ["[Gates] cite sources", "  Respond: GATE_REVIEW: PASS|FAIL - <reason>"]),
+    ]
+    out = context_ledger.admit("s1", "before-agent", blocks, state)
+    assert out == [
+        "[Chain] c#1 step 1/3 [Gate] quality", '  prompt_engine(chain_id:"c#1")',
+        "[MCP] >>analyze (analysis)", '  prompt_engine(command:">>analyze")',
+        "[Gates] cite sources",
+    ]
+    full = sum(len(line) + 1 for _, lines, *_ in blocks for line in lines)
+    ledger = context_ledger.load("s1")
+    assert ledger["chars"] == sum(len(line) + 1 for line in out)
+    assert ledger["dropped"] == full - ledger["chars"]
+
+
+def test_compact_state():
+    assert context_ledger.compact_state(None) == []
+    assert context_ledger.compact_state({"chain_id": "c#1", "current_step": 2, "total_steps": 3}) == [
+        "[Chain] c#1 step 2/3"]
+
+
+def test_no_session_passes_everything_through():
+    assert context_ledger.admit(None, "before-agent", BLOCKS, STATE) == ["[Chain] step 1/3", ">>analyze"]
+    assert context_ledger.admit(None, "before-agent", BLOCKS, STATE) == ["[Chain] step 1/3", ">>analyze"]
@@ -0,0 +1,151 @@
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from gemini_lib import daemon, runner, state_store
+from gemini_lib.paths import HOOKS_DIR
+
+
+def load_hook(name: str):
+    spec = importlib.util.spec_from_file_location(f"test_hook_{name.replace('-', '_')}",
+                                                  os.path.join(HOOKS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def wait_for(path: str) -> None:
+    deadline = time.monotonic() + 10
+    while not daemon.send({"op": "ping"}, path, timeout=0.5):
+        if time.monotonic() > deadline:
+            pytest.fail("daemon did not start")
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def socket_dir(monkeypatch):
+    # AF_UNIX paths are short; pytest's tmp_path may not fit
+    directory = tempfile.mkdtemp(prefix="ghd-")
+    path = os.path.join(directory, "d.sock")
+    monkeypatch.delenv("GEMINI_HOOK_DAEMON", raising=False)
+    monkeypatch.setenv("GEMINI_HOOK_DAEMON_SOCKET", path)
+    yield path
+    daemon.send({"op": "shutdown"}, path)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon_process(socket_dir, tmp_path):
+    """A real daemon process whose own workspace and cwd differ from the caller's."""
+    env = {k: v for k, v in os.environ.items() if not runner.is_forwarded(k)}
+    env["MCP_WORKSPACE"] = str(tmp_path / "daemon-workspace")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HOOKS_DIR, "hook-daemon.py"), "run",
+         "--socket", socket_dir, "--idle-timeout", "30"],
+        env=env, cwd="/", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(socket_dir)
+        yield socket_dir
+    finally:
+        daemon.send({"op": "shutdown"}, socket_dir)
+        proc.wait(timeout=10)
+
+
+@pytest.fixture
+def daemon_thread(socket_dir):
+    """An in-process daemon, for swapping its hook modules."""
+    server = daemon.HookDaemon(socket_dir, idle_timeout=30)
+    server.preload = lambda: None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    wait_for(socket_dir)
+    yield server
+    daemon.send({"op": "shutdown"}, socket_dir)
+    thread.join(timeout=10)
+
+
+GATE_PAYLOADS = [
+    {"tool_name": "read_file", "tool_input": {}},
+    {"tool_name": "prompt_engine", "session_id": "s1", "tool_input": {"chain_id": "c#1"}},
+    {"tool_name": "prompt_engine", "session_id": "s1",
+     "tool_input": {"chain_id": "c#1", "gate_verdict": "GATE_REVIEW: FAIL - no tests"}},
+    {"toolName": "prompt_engine", "sessionId": "s2", "toolInput": {"chain_id": "c#2"}},
+]
+
+
+def test_forwarded_output_matches_in_process(daemon_process, workspace):
+    state_store.save("s1", {"chain_id": "c#1", "pending_gate": "quality",
+                            "next_step": {"call": 'prompt_engine(chain_id="c#1")'}})
+    hook = load_hook("gate-enforce")
+    outputs = []
+    for payload in GATE_PAYLOADS:
+        raw = json.dumps(payload)
+        expected = hook.handle(raw)
+        outputs.append(expected)
+        assert runner.forward("gate-enforce", raw) == (True, expected)
+    assert [o and o["decision"] for o in outputs] == [None, "deny", "deny", "allow"]
+    # The daemon ran against the caller's workspace, not its own
+    assert not os.path.exists(workspace / "daemon-workspace")
+
+
+def test_unknown_hook_is_declined_and_runs_in_process(daemon_process):
+    assert runner.forward("stop", "{}") == (False, None)
+
+
+def test_handler_error_is_not_rerun(daemon_thread, socket_dir):
+    calls = []
+
+    class Failing:
+        @staticmethod
+        def handle(raw):
+            calls.append(raw)
+            raise RuntimeError("boom")
+
+    daemon_thread.load = lambda name: Failing
+    assert runner.forward("gate-enforce", "{}") == (True, None)
+    assert calls == ["{}"]
+
+
+def test_request_sees_only_forwarded_env_and_cwd(daemon_thread, socket_dir, tmp_path):
+    seen = {}
+
+    class Echo:
+        @staticmethod
+        def handle(raw):
+            seen.update(cwd=os.getcwd(), setting=os.environ.get("GEMINI_HOOK_X"))
+            return {"ok": raw}
+
+    daemon_thread.load = lambda name: Echo
+    response = daemon.send({"hook": "gate-enforce", "stdin": "in", "cwd": str(tmp_path),
+                            "env": {"GEMINI_HOOK_X": "1", "SECRET_TOKEN": "t"}}, socket_dir)
+    assert response == {"ok": True, "output": {"ok": "in"}}
+    assert seen == {"cwd": str(tmp_path), "setting": "1"}
+    assert "SECRET_TOKEN" not in os.environ
+    assert "GEMINI_HOOK_X" not in os.environ
+    assert os.getcwd() != str(tmp_path)
+
+
+def test_only_hook_settings_are_forwarded(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_TRACE", "1")
+    monkeypatch.setenv("GEMINI_API_KEY", "secret")
+    env = runner.forwarded_env()
+    assert env["GEMINI_HOOK_TRACE"] == "1"
+    assert "GEMINI_API_KEY" not in env
+
+
+def test_untrusted_socket_is_not_used(daemon_thread, socket_dir):
+    daemon_thread.load = lambda name: pytest.fail("untrusted socket was used")
+    os.chmod(os.path.dirname(socket_dir), 0o777)
+    try:
+        assert runner.forward("gate-enforce", "{}") == (False, None)
+    finally:
+        os.chmod(os.path.dirname(socket_dir), 0o700)
@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+from gemini_lib import debug_log
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "gemini"
+    monkeypatch.setattr(debug_log, "LOG_DIR", str(directory))
+    monkeypatch.setattr(debug_log, "_buffer", [])
+    monkeypatch.setattr(debug_log, "_buffered", 0)
+    monkeypatch.setattr(debug_log, "_dropped", 0)
+    monkeypatch.setattr(debug_log, "_dir_ready", False)
+    monkeypatch.setenv("GEMINI_HOOK_DEBUG", "1")
+    return directory
+
+
+def read() -> str:
+    with open(debug_log.log_path()) as f:
+        return f.read()
+
+
+def test_nothing_is_written_until_flush():
+    debug_log.log("AfterTool", "one")
+    debug_log.log("AfterTool", "two")
+    assert not os.path.exists(debug_log.log_path())
+    debug_log.flush()
+    lines = read().splitlines()
+    assert [line.split("] ", 1)[1] for line in lines] == ["AfterTool: one", "AfterTool: two"]
+    debug_log.flush()
+    assert len(read().splitlines()) == 2
+
+
+def test_disabled_logs_nothing(monkeypatch):
+    monkeypatch.delenv("GEMINI_HOOK_DEBUG")
+    debug_log.log("x", "y")
+    debug_log.flush()
+    assert not os.path.exists(debug_log.log_path())
+
+
+def test_full_buffer_notes_the_dropped_messages(monkeypatch):
+    monkeypatch.setattr(debug_log, "MAX_BUFFER", 100)
+    for n in range(10):
+        debug_log.log("x", f"message {n}")
+    debug_log.flush()
+    lines = read().splitlines()
+    assert "dropped" in lines[-1] and "message 0" in lines[0]
+    assert len(lines) < 10
+
+
+def test_sampled_messages_follow_the_rate(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_DEBUG_SAMPLE", "0")
+    debug_log.log("x", "preview", sampled=True)
+    debug_log.log("x", "kept")
+    debug_log.flush()
+    assert "preview" not in read() and "kept" in read()
+
+
+def test_old_log_is_rotated(log_dir):
+    log_dir.mkdir()
+    stale = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - debug_log.MAX_AGE - 60))
+    with open(debug_log.log_path(), "w") as f:
+        f.write(f"[{stale}] x: old\n")
+    debug_log.log("x", "new")
+    debug_log.flush()
+    assert not os.path.exists(debug_log.log_path())
+    (segment,) = os.listdir(log_dir)
+    assert segment.startswith("hook-debug.") and "new" in (log_dir / segment).read_text()
+
+    debug_log.log("x", "fresh")
+    debug_log.flush()
+    assert "fresh" in read()
+    assert len(os.listdir(log_dir)) == 2
+
+
+def test_large_log_is_rotated_and_old_segments_pruned(log_dir, monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_DEBUG_MAX_MB", "0")
+    log_dir.mkdir()
+    for n in range(debug_log.MAX_SEGMENTS + 2):
+        (log_dir / f"hook-debug.2020010{n}-000000.1.log").write_text("x\n")
+    debug_log.log("x", "big")
+    debug_log.flush()
+    segments = sorted(os.listdir(log_dir))
+    assert len(segments) == debug_log.MAX_SEGMENTS
+    assert "big" in (log_dir / segments[-1]).read_text()
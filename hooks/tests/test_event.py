@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from gemini_lib import event
+
+
+def lazy(payload: dict) -> event.HookEvent:
+    raw = json.dumps(payload)
+    ev = event.decode(raw + " " * event.LAZY_THRESHOLD)
+    assert ev._offsets is not None
+    return ev
+
+
+def test_small_payload_is_decoded_whole():
+    ev = event.decode('{"toolName": "x", "sessionId": "s"}')
+    assert ev.valid and ev._offsets is None
+    assert ev.tool_name == "x"
+    assert ev.session_id == "s"
+
+
+def test_invalid_payloads():
+    assert not event.decode("not json").valid
+    assert not event.decode("[1, 2]").valid
+    assert event.decode("").valid
+
+
+def test_index_spans_match_json():
+    payload = {
+        "a": "q\"uote\\",
+        "b": [1, {"c": "]}"}, "\\\""],
+        "d": {"e": None, "f": -1.5e3},
+        "g": True,
+        "": "",
+    }
+    raw = json.dumps(payload, indent=1)
+    offsets = event.index_object(raw)
+    assert set(offsets) == set(payload)
+    for key, (start, end) in offsets.items():
+        assert json.loads(raw[start:end]) == payload[key]
+
+
+def test_lazy_fields_decode_on_first_read():
+    ev = lazy({"tool_name": "t", "tool_input": {"k": [1, 2]}, "tool_response": {"content": "x"}})
+    assert ev._fields == {}
+    assert ev.tool_input == {"k": [1, 2]}
+    assert set(ev._fields) == {"tool_input"}
+    assert ev.tool_name == "t"
+
+
+def test_escaped_quotes_inside_skipped_containers():
+    text = 'say \\"}]\\" and \\\\' + "x" * 100
+    payload = {"tool_response": {"content": [{"type": "text", "text": text}, ["a\"]", "}"]]}, "after": 1}
+    ev = lazy(payload)
+    assert ev.get("after") == 1
+    assert ev.tool_response == payload["tool_response"]
+
+
+def test_dense_payload_falls_back_to_full_decode(monkeypatch):
+    monkeypatch.setattr(event, "MAX_SKIPPED_TOKENS", 8)
+    payload = {"tool_response": {"content": [{"text": str(n)} for n in range(20)]}}
+    ev = event.decode(json.dumps(payload) + " " * event.LAZY_THRESHOLD)
+    assert ev.valid and ev._offsets is None
+    assert ev.response_text() == " ".join(str(n) for n in range(20))
+
+
+def test_truncated_lazy_payload_is_invalid():
+    raw = json.dumps({"a": "x" * event.LAZY_THRESHOLD, "b": [1, 2]})
+    assert not event.decode(raw[:-3]).valid
+
+
+@pytest.mark.parametrize("response", [
+    {"content": [{"type": "text", "text": "one"}, {"type": "image"}, "raw", {"text": "té\\n\"😀" * 50}]},
+    {"content": "plain \"string\""},
+    {"content": 42},
+    {"content": [], "other": "x"},
+    {"content": [{"text": "first"}], "content2": 1, "x": {"content": "nested"}},
+    {"content": [{"text": "a", "text2": "b"}, 7, None, {"text": ""}]},
+])
+def test_response_chunks_equal_response_text(response):
+    ev = lazy({"tool_response": response})
+    assert ev._raw_response() is not None
+    streamed = "".join(ev.response_chunks(chunk_chars=7))
+    assert ev._fields == {}
+    assert streamed == ev.response_text()
+    assert streamed == " ".join(event.text_blocks(response))
+
+
+def test_string_chunks_never_cut_an_escape():
+    text = "é\\\"" * 40 + "😀" * 40
+    raw = json.dumps(text)
+    for size in (1, 5, 13, 64):
+        pieces = list(event._string_chunks(raw, 0, len(raw), size))
+        assert "".join(pieces) == text
+
+
+def test_duplicate_response_keys_last_wins():
+    raw = '{"tool_response": {"content": "old", "content": [{"text": "new"}]}}'
+    ev = event.decode(raw + " " * event.LAZY_THRESHOLD)
+    assert "".join(ev.response_chunks()) == "new" == ev.response_text()
+
+
+def test_decoded_response_is_yielded_as_is():
+    ev = event.decode(json.dumps({"result": {"content": [{"text": "a"}, {"text": "b"}]}}))
+    assert list(ev.response_chunks()) == ["a", " ", "b"]
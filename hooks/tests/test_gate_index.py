@@ -0,0 +1,50 @@
+from gemini_lib import gate_index
+
+
+def sidecar(session_id: str) -> bytes:
+    with open(gate_index._sidecar(session_id), "rb") as f:
+        return f.read()
+
+
+def test_not_indexed():
+    assert gate_index.pending_gate("s1") == (False, None)
+    assert gate_index.has_state("s1") is None
+
+
+def test_pending_gate():
+    gate_index.sync("s1", {"pending_gate": "quality"}, 3)
+    assert sidecar("s1") == b"3\tquality"
+    assert gate_index.pending_gate("s1") == (True, "quality")
+    assert gate_index.has_state("s1") is True
+
+
+def test_state_without_gate():
+    gate_index.sync("s1", {"chain_id": "c#1"}, 1)
+    assert sidecar("s1") == b"1\t"
+    assert gate_index.pending_gate("s1") == (True, None)
+    assert gate_index.has_state("s1") is True
+
+
+def test_no_state_has_no_tab():
+    gate_index.sync("s1", None, 2)
+    assert sidecar("s1") == b"2"
+    assert gate_index.pending_gate("s1") == (True, None)
+    assert gate_index.has_state("s1") is False
+
+
+def test_older_version_never_overwrites():
+    gate_index.sync("s1", {"pending_gate": "newer"}, 5)
+    gate_index.sync("s1", {"pending_gate": "older"}, 4)
+    gate_index.sync("s1", None, 3)
+    assert gate_index.pending_gate("s1") == (True, "newer")
+
+
+def test_forget():
+    gate_index.sync("s1", {"pending_gate": "quality"}, 1)
+    gate_index.forget("s1")
+    assert gate_index.pending_gate("s1") == (False, None)
+
+
+def test_unsafe_session_id():
+    gate_index.sync("../s 1", {"pending_gate": "quality"}, 1)
+    assert gate_index.pending_gate("../s 1") == (True, "quality")
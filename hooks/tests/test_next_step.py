@@ -0,0 +1,74 @@
+import pytest
+
+from gemini_lib import catalog_snapshot, next_step
+from gemini_lib.catalog_snapshot import Snapshot, build
+
+CACHE = {
+    "prompts": {
+        "analyze": {"category": "analysis"},
+        "review": {"category": "quality", "arguments": [{"name": "focus", "default": "security"},
+                                                        {"name": "depth"}]},
+    }
+}
+
+
+@pytest.fixture(autouse=True)
+def snapshot(monkeypatch):
+    snap = Snapshot.from_buffer(build(CACHE, (1, 1)))
+    monkeypatch.setattr(catalog_snapshot, "get_snapshot", lambda: snap)
+
+
+def chain(step: int, total: int = 3, gate: str | None = "quality") -> dict:
+    return {"chain_id": "chain-analyze#1", "current_step": step, "total_steps": total,
+            "pending_gate": gate, "gate_criteria": ["has tests"] if gate else []}
+
+
+def test_format_tool_call():
+    assert next_step.format_tool_call("a", {}) == 'prompt_engine(command:">>a")'
+    assert next_step.format_tool_call("review", CACHE["prompts"]["review"]) == (
+        'prompt_engine(command:">>review", options:{"focus": "security", "depth": "<depth>"})'
+    )
+
+
+def test_continue_call():
+    assert next_step.continue_call("c#1", 1, None) == (
+        'prompt_engine(chain_id:"c#1", user_response:"<step 1 output>")'
+    )
+    assert 'gate_verdict:"GATE_REVIEW: PASS|FAIL - <reason>"' in next_step.continue_call("c#1", 1, "g")
+
+
+def test_resolve_from_the_starting_command():
+    state = next_step.resolve(chain(1), None, {"command": ">>analyze --> >>review depth:high --> >>missing"})
+    assert state["chain_prompts"] == ["analyze", "review", "missing"]
+    assert state["next_step"] == {
+        "step": 2, "total": 3, "prompt_id": "review", "category": "quality",
+        "arguments": [{"name": "focus", "default": "security"}, {"name": "depth", "default": "high"}],
+        "gate": "quality", "gate_criteria": ["has tests"],
+        "call": next_step.continue_call("chain-analyze#1", 1, "quality"),
+    }
+    assert next_step.describe(state["next_step"]) == [
+        '  Next: >>review (quality) focus="security", depth="high"',
+        f"  {state['next_step']['call']}",
+    ]
+
+
+def test_continuation_keeps_the_chain_prompts():
+    first = next_step.resolve(chain(1), None, {"command": ">>analyze --> >>review --> >>missing"})
+    state = next_step.resolve(chain(2, gate=None), first, {"chain_id": "chain-analyze#1"})
+    assert state["next_step"]["prompt_id"] == "missing"
+    assert state["next_step"]["category"] == "unknown"
+    assert "gate" not in state["next_step"]
+    # Another chain does not inherit them
+    other = dict(chain(1), chain_id="chain-other#1")
+    assert "prompt_id" not in next_step.resolve(other, first, {})["next_step"]
+
+
+def test_last_step_clears_next_step():
+    state = next_step.resolve(dict(chain(3), next_step={"step": 3}), None, {})
+    assert "next_step" not in state
+
+
+def test_single_prompt_chain_has_no_step_id():
+    state = next_step.resolve(chain(1), None, {"command": ">>analyze"})
+    assert "prompt_id" not in state["next_step"]
+    assert next_step.describe(state["next_step"]) == [f"  {state['next_step']['call']}"]
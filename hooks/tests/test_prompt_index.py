@@ -0,0 +1,49 @@
+import pytest
+
+from gemini_lib.prompt_index import PromptIndex, edit_distance
+
+CACHE = {
+    "prompts": {
+        "code_review": {"name": "Code Review", "description": "Review a pull request", "category": "dev"},
+        "security_audit": {"name": "Security Audit", "description": "Find vulnerabilities", "category": "security"},
+        "release_notes": {"name": "Release Notes", "description": "Summarize the changes for a release",
+                          "category": "docs"},
+        "refactor": {"description": "Restructure code without changing behavior", "category": "dev"},
+    }
+}
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("", "", 0),
+    ("abc", "", 3),
+    ("kitten", "sitting", 3),
+    ("review", "reveiw", 1),  # adjacent swap
+    ("ca", "abc", 3),  # OSA, not full Damerau: no edits inside a swapped pair
+    ("refactor", "refactor", 0),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b) == distance
+    assert edit_distance(b, a) == distance
+
+
+def test_suggest_ids_finds_typos():
+    index = PromptIndex.build(CACHE, (1, 1))
+    assert index.suggest_ids("code_reveiw")[0] == "code_review"
+    assert index.suggest_ids("REFACTR") == ["refactor"]
+    assert index.suggest_ids("release") == ["release_notes"]
+    assert index.suggest_ids("zzz") == []
+
+
+def test_match_intent_ranks_rare_words_first():
+    index = PromptIndex.build(CACHE, (1, 1))
+    assert index.match_intent("please find vulnerabilities")[0] == ("security_audit", "security")
+    assert [p for p, _ in index.match_intent("review this code")][0] == "code_review"
+    assert index.match_intent("the and of") == []
+
+
+def test_dump_round_trip():
+    index = PromptIndex.build(CACHE, (1, 1))
+    loaded = PromptIndex.loads(index.dump())
+    assert loaded.version == (1, 1)
+    assert loaded.suggest_ids("securty_audit") == index.suggest_ids("securty_audit")
+    assert PromptIndex.loads(b"garbage") is None
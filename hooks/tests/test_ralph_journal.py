@@ -0,0 +1,118 @@
+import os
+import sys
+import types
+
+import pytest
+
+from gemini_lib import ralph_journal
+
+
+class Tracker:
+    """Stands in for the shared lib's session_tracker; fails on request."""
+
+    def __init__(self, calls: list, fail_at: list):
+        self.calls = calls
+        self.fail_at = fail_at
+
+    def _call(self, *record):
+        if self.fail_at and len(self.calls) == self.fail_at[0]:
+            self.fail_at.pop(0)
+            raise RuntimeError("tracker unavailable")
+        self.calls.append(record)
+
+    def record_file_change(self, file_path, change_type, details):
+        self._call("file", file_path, details)
+
+    def record_subagent_result(self, agent_type, summary):
+        self._call("agent", agent_type, summary)
+
+    def append_loop_memory(self, text):
+        pass
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    calls, fail_at = [], []
+    module = types.ModuleType("session_tracker")
+    module.get_session_tracker = lambda session: Tracker(calls, fail_at)
+    monkeypatch.setitem(sys.modules, "session_tracker", module)
+    return calls, fail_at
+
+
+def journal_files() -> list[str]:
+    return sorted(os.listdir(ralph_journal._journal_dir()))
+
+
+def edit(path: str, details: str = "edit"):
+    ralph_journal.record_file_change("r1", path, "modify", details)
+
+
+def test_flush_coalesces_in_order(tracker):
+    calls, _ = tracker
+    edit("a.py", "first")
+    ralph_journal.record_subagent_result("r1", "explorer", "found 3")
+    edit("a.py", "second")
+    edit("b.py")
+    assert ralph_journal.flush("r1") == 4
+    assert calls == [("file", "a.py", "second (2 edits)"), ("agent", "explorer", "found 3"),
+                     ("file", "b.py", "edit")]
+    assert journal_files() == []
+
+
+def test_interrupted_replay_resumes_before_newer_records(tracker):
+    calls, fail_at = tracker
+    for name in ("a.py", "b.py", "c.py"):
+        edit(name)
+    fail_at.append(1)  # the second record fails
+    with pytest.raises(RuntimeError):
+        ralph_journal.flush("r1")
+    assert calls == [("file", "a.py", "edit")]
+    leftover = journal_files()
+    assert len(leftover) == 2 and leftover[1].endswith(".applied")
+
+    # Same process (as in the daemon): new records go to a new live journal
+    edit("d.py")
+    ralph_journal.flush("r1")
+    assert [call[1] for call in calls] == ["a.py", "b.py", "c.py", "d.py"]
+    assert journal_files() == []
+
+
+def test_failed_leftover_blocks_the_live_journal(tracker):
+    calls, fail_at = tracker
+    edit("a.py")
+    edit("b.py")
+    fail_at.append(1)
+    with pytest.raises(RuntimeError):
+        ralph_journal.flush("r1")
+    edit("c.py")
+    fail_at.append(1)  # the retry fails again
+    with pytest.raises(RuntimeError):
+        ralph_journal.flush("r1")
+    assert any(name.endswith(".jsonl") for name in journal_files())  # not claimed
+    ralph_journal.flush("r1")
+    assert [call[1] for call in calls] == ["a.py", "b.py", "c.py"]
+
+
+def test_claim_of_a_live_process_is_left_alone(tracker):
+    calls, _ = tracker
+    edit("a.py")
+    path = ralph_journal._journal_path("r1")
+    os.rename(path, f"{path}.flushing.{10 ** 18}.{os.getppid()}.1")
+    edit("b.py")
+    assert ralph_journal.flush("r1") == 0
+    assert calls == []
+    assert len(journal_files()) == 2
+
+
+def test_claims_are_unique_within_a_process():
+    path = ralph_journal._journal_path("r1")
+    assert ralph_journal._claim_name(path) != ralph_journal._claim_name(path)
+
+
+def test_torn_line_is_skipped(tracker):
+    calls, _ = tracker
+    edit("a.py")
+    with open(ralph_journal._journal_path("r1"), "ab") as f:
+        f.write(b'{"session":"r1","kind":"file_cha')
+    assert ralph_journal.flush("r1") == 1
+    assert calls == [("file", "a.py", "edit")]
@@ -0,0 +1,60 @@
+import re
+import sys
+import types
+
+from gemini_lib import response_state
+
+STEP = re.compile(r"Step (\d+)/(\d+)")
+GATE = re.compile(r"Gate: (\w+)")
+
+
+def parse(text: str) -> dict | None:
+    """Stands in for session_state.parse_prompt_engine_response."""
+    step, gate = STEP.search(text), GATE.search(text)
+    if not step and not gate:
+        return None
+    return {
+        "chain_id": "c#1" if step else "",
+        "current_step": int(step.group(1)) if step else 0,
+        "total_steps": int(step.group(2)) if step else 0,
+        "pending_gate": gate.group(1) if gate else None,
+    }
+
+
+def test_structured_state_is_read_without_text():
+    response = {"content": [{"text": "Step 9/9"}],
+                "structuredContent": {"chainState": {"chainId": "c#2", "currentStep": 1, "totalSteps": 2}}}
+    assert response_state.structured_state(response) == {
+        "chain_id": "c#2", "current_step": 1, "total_steps": 2, "pending_gate": None, "gate_criteria": [],
+    }
+    meta = {"_meta": {"chain_state": {"pending_gate": "quality", "gate_criteria": ["x"]}}}
+    assert response_state.structured_state(meta)["pending_gate"] == "quality"
+
+
+def test_structured_state_without_progress_is_ignored():
+    assert response_state.structured_state({"_meta": {"chain_state": {"chain_id": "c"}}}) is None
+    assert response_state.structured_state({"structuredContent": "x"}) is None
+    assert response_state.structured_state("text") is None
+
+
+def test_first_marker_wins_and_later_blocks_fill_gaps():
+    seen = []
+
+    def tracking(text):
+        seen.append(text)
+        return parse(text)
+
+    blocks = ["intro", "Step 1/3", "Step 2/3", "Gate: quality", "Gate: other"]
+    state = response_state.scan_blocks(blocks, tracking)
+    assert state["current_step"] == 1 and state["pending_gate"] == "quality"
+    assert seen == blocks[:4]  # stops once step and gate are both known
+    assert response_state.scan_blocks(["none"], parse) is None
+
+
+def test_parse_response_falls_back_to_text(monkeypatch):
+    module = types.ModuleType("session_state")
+    module.parse_prompt_engine_response = parse
+    monkeypatch.setitem(sys.modules, "session_state", module)
+    response = {"content": [{"type": "text", "text": "Gate: review"}, {"text": "Step 2/4"}]}
+    state = response_state.parse_response(response)
+    assert (state["current_step"], state["total_steps"], state["pending_gate"]) == (2, 4, "review")
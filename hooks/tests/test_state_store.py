@@ -0,0 +1,68 @@
+import pytest
+
+from gemini_lib import gate_index, state_store
+
+
+def test_missing_session_is_version_zero():
+    assert state_store.load_versioned("s1", migrate=False) == (None, 0)
+    # Without a shared lib store to migrate from, the first load records an empty row
+    assert state_store.load_versioned("s1") == (None, 1)
+
+
+def test_compare_and_swap():
+    assert state_store.compare_and_swap("s1", 0, {"chain_id": "c#1"})
+    assert not state_store.compare_and_swap("s1", 0, {"chain_id": "c#2"})
+    assert state_store.load_versioned("s1") == ({"chain_id": "c#1"}, 1)
+
+    assert not state_store.compare_and_swap("s1", 2, {"chain_id": "c#3"})
+    assert state_store.compare_and_swap("s1", 1, {"chain_id": "c#3"})
+    assert state_store.load_versioned("s1") == ({"chain_id": "c#3"}, 2)
+
+
+def test_update_retries_a_lost_swap():
+    calls = []
+    state_store.save("s1", {"n": 0})
+    _, version = state_store.load_versioned("s1")
+
+    def mutate(current):
+        calls.append(current)
+        if len(calls) == 1:
+            # Another process commits between this load and its swap
+            assert state_store.compare_and_swap("s1", version, {"n": 10})
+        return {"n": current["n"] + 1}
+
+    assert state_store.update("s1", mutate) == {"n": 11}
+    assert calls == [{"n": 0}, {"n": 10}]
+    assert state_store.load_versioned("s1") == ({"n": 11}, version + 2)
+
+
+def test_update_gives_up_when_contended(monkeypatch):
+    monkeypatch.setattr(state_store, "compare_and_swap", lambda *args: False)
+    with pytest.raises(RuntimeError):
+        state_store.update("s1", lambda current: {"n": 1})
+
+
+def test_update_keeps_gate_index_in_step():
+    state_store.save("s1", {"chain_id": "c#1", "pending_gate": "quality"})
+    assert gate_index.pending_gate("s1") == (True, "quality")
+    state_store.update("s1", lambda current: {**current, "pending_gate": None})
+    assert gate_index.pending_gate("s1") == (True, None)
+    assert gate_index.has_state("s1") is True
+
+
+def test_delete():
+    state_store.save("s1", {"chain_id": "c#1"})
+    state_store.delete("s1")
+    assert state_store.load("s1") is None
+    assert gate_index.pending_gate("s1") == (False, None)
+
+
+def test_reconnects_when_the_database_is_removed(workspace):
+    import shutil
+
+    state_store.save("s1", {"chain_id": "c#1"})
+    first = state_store.connect()
+    shutil.rmtree(workspace / "runtime-state")
+    assert state_store.load_versioned("s1", migrate=False) == (None, 0)
+    assert state_store.connect() is not first
+    assert state_store.connect() is state_store.connect()
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+import pytest
+
+from gemini_lib import suggest_cache
+
+V1, V2 = (1, 10), (2, 20)
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(suggest_cache, "_version", None)
+    monkeypatch.setattr(suggest_cache, "_stamp", None)
+    monkeypatch.setattr(suggest_cache, "_entries", {})
+
+
+@contextmanager
+def other_process():
+    """Run as another hook process: with its own in-memory view of the file."""
+    saved = suggest_cache._version, suggest_cache._stamp, suggest_cache._entries
+    suggest_cache._version, suggest_cache._stamp, suggest_cache._entries = None, None, {}
+    try:
+        yield
+    finally:
+        suggest_cache._version, suggest_cache._stamp, suggest_cache._entries = saved
+
+
+def test_key_ignores_everything_but_ids():
+    assert suggest_cache.key("a", ["a", "b"]) == "a|a --> b"
+    assert suggest_cache.key(None, []) == "|"
+
+
+def test_round_trip_and_version_stamp():
+    suggest_cache.put("k", V1, ["[MCP] k"])
+    assert suggest_cache.get("k", V1) == ["[MCP] k"]
+    assert suggest_cache.get("k", V2) is None
+    assert suggest_cache.get("k", None) is None
+    with other_process():
+        assert suggest_cache.get("k", V1) == ["[MCP] k"]
+
+
+def test_reloads_when_another_process_writes():
+    suggest_cache.put("a", V1, ["A"])
+    assert suggest_cache.get("b", V1) is None
+    with other_process():
+        suggest_cache.put("b", V1, ["B"])
+    assert suggest_cache.get("b", V1) == ["B"]
+
+
+def test_put_keeps_entries_other_processes_added():
+    suggest_cache.put("a", V1, ["A"])
+    with other_process():
+        suggest_cache.put("b", V1, ["B"])
+    suggest_cache.put("c", V1, ["C"])
+    with other_process():
+        assert [suggest_cache.get(k, V1) for k in "abc"] == [["A"], ["B"], ["C"]]
+
+
+def test_least_recently_used_is_evicted(monkeypatch):
+    monkeypatch.setattr(suggest_cache, "MAX_ENTRIES", 4)
+    for k in "abcd":
+        suggest_cache.put(k, V1, [k])
+    assert suggest_cache.get("a", V1) == ["a"]  # old half: moved to the end
+    suggest_cache.put("e", V1, ["e"])
+    assert list(suggest_cache._entries) == ["c", "d", "a", "e"]
+    with other_process():
+        assert suggest_cache.get("b", V1) is None
+        assert suggest_cache.get("a", V1) == ["a"]
+
+
+def test_corrupt_file_is_ignored():
+    with open(suggest_cache.cache_path(), "wb") as f:
+        f.write(b"\x00junk")
+    assert suggest_cache.get("a", V1) is None
+    suggest_cache.put("a", V1, ["A"])
+    with other_process():
+        assert suggest_cache.get("a", V1) == ["A"]
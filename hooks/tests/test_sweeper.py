@@ -0,0 +1,129 @@
+import os
+import time
+
+from gemini_lib import gate_index, locks, state_store, sweeper
+from gemini_lib.paths import gemini_state_dir
+
+OLD = time.time() - 2 * sweeper.ORPHAN_GRACE
+
+
+def report() -> dict:
+    return {"sessions": 0, "sidecars": 0, "locks": 0, "journals": 0, "verify_files": 0,
+            "ledgers": 0, "timelines": 0, "tmp_files": 0, "bytes": 0, "more": False}
+
+
+def age(path: str, when: float = OLD) -> str:
+    os.utime(path, (when, when))
+    return path
+
+
+def test_orphans_are_removed_after_the_grace_period():
+    state_store.save("live", {"chain_id": "c#1"})
+    gate_index.sync("gone", {"pending_gate": "quality"}, 1)
+    sidecar = age(gate_index._sidecar("gone"))
+    young = gate_index._sidecar("young")
+    gate_index.sync("young", None, 1)
+    live = age(gate_index._sidecar("live"))
+    lock = locks.lock_path("gone")
+    open(lock, "w").close()
+    age(lock)
+
+    result = report()
+    sweeper.sweep_orphans(time.time(), result)
+    assert not os.path.exists(sidecar)
+    assert not os.path.exists(lock)
+    assert os.path.exists(young)
+    assert os.path.exists(live)
+    assert result["sidecars"] == 1 and result["locks"] == 1
+
+
+def test_held_lock_is_never_removed():
+    with locks.SessionLock("gone"):
+        path = age(locks.lock_path("gone"))
+        result = report()
+        sweeper.sweep_orphans(time.time(), result)
+        assert os.path.exists(path)
+        assert result["locks"] == 0
+    assert locks.remove_unused(path)
+    assert not os.path.exists(path)
+
+
+def test_lock_removed_while_waiting_is_reopened():
+    import fcntl
+    import threading
+
+    path = locks.lock_path("s1")
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    locked = {}
+
+    def writer():
+        with locks.SessionLock("s1") as lock:
+            locked["ino"] = os.fstat(lock._fd).st_ino
+            locked["path"] = os.stat(path).st_ino
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.1)  # the writer now waits on the file about to be removed
+    os.unlink(path)  # as remove_unused() does, holding the lock
+    os.close(fd)
+    thread.join(5)
+    assert locked["ino"] == locked["path"]
+
+
+def test_stale_sessions_are_evicted(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_MAX_SESSIONS", "1")
+    state_store.save("old", {"chain_id": "c#1"})
+    state_store.save("new", {"chain_id": "c#2"})
+    state_store.connect().execute("UPDATE session_state SET updated_at = 0 WHERE session_id = 'old'")
+    result = report()
+    sweeper.sweep_sessions(time.time(), result)
+    assert result["sessions"] == 1
+    assert state_store.session_ids() == ["new"]
+    assert gate_index.pending_gate("old") == (False, None)
+
+
+def test_tmp_and_idle_files():
+    root = gemini_state_dir()
+    tmp = os.path.join(root, "x.123.tmp")
+    open(tmp, "w").close()
+    age(tmp, time.time() - 2 * sweeper.TMP_TTL)
+    ledger_dir = os.path.join(root, "context")
+    os.makedirs(ledger_dir)
+    ledger = os.path.join(ledger_dir, "s1")
+    open(ledger, "w").close()
+    age(ledger, time.time() - (sweeper.SESSION_TTL_DAYS + 1) * 86400)
+    result = report()
+    sweeper.sweep_tmp_files(time.time(), result)
+    sweeper.sweep_idle_files(time.time(), result)
+    assert not os.path.exists(tmp)
+    assert not os.path.exists(ledger)
+    assert result["tmp_files"] == 1 and result["ledgers"] == 1
+
+
+def test_trim_file_keeps_the_newest_half():
+    path = os.path.join(gemini_state_dir(), "log.jsonl")
+    with open(path, "w") as f:
+        f.writelines(f"line {n}\n" for n in range(1000))
+    freed = sweeper.trim_file(path, 4000)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert freed > 0
+    assert lines[-1] == "line 999"
+    assert all(line.startswith("line ") for line in lines)
+    assert os.path.getsize(path) <= 2000
+
+
+def test_one_sweep_at_a_time(workspace, monkeypatch):
+    import fcntl
+
+    from gemini_lib import debug_log
+
+    monkeypatch.setattr(debug_log, "LOG_DIR", str(workspace / ".gemini"))
+    fd = os.open(os.path.join(gemini_state_dir(), sweeper.GC_LOCK), os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        assert sweeper.sweep() is None
+    finally:
+        os.close(fd)
+    assert sweeper.sweep()["more"] is False
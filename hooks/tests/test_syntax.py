@@ -0,0 +1,51 @@
+from gemini_lib.syntax import has_syntax, scan
+
+
+def test_plain_text_has_no_syntax():
+    assert not has_syntax("hello there")
+    assert scan("hello there") is None
+
+
+def test_full_chain():
+    parsed = scan(">>analyze code @CAGEERF :: 'has tests' :: quality --> >>review --> >>fix")
+    assert parsed.invoked == "analyze"
+    assert parsed.steps == ["analyze", "review", "fix"]
+    assert parsed.gates == ["has tests", "quality"]
+    assert parsed.frameworks == ["CAGEERF"]
+
+
+def test_unicode_arrow():
+    assert scan(">>a → >>b").steps == ["a", "b"]
+
+
+def test_arguments():
+    parsed = scan('>>a key:val other:"x y"')
+    assert parsed.invoked == "a"
+    assert parsed.steps == []
+    assert parsed.arguments == {"a": {"key": "val", "other": "x y"}}
+
+
+def test_scope_operator_is_not_a_gate():
+    parsed = scan("std::vector<int> x")
+    assert parsed.gates == []
+    assert parsed.invoked is None
+
+
+def test_quoted_gate_consumes_its_text():
+    assert scan(":: 'a :: b'").gates == ["a :: b"]
+    parsed = scan(":: 'see >>a --> >>b'")
+    assert parsed.steps == []
+    assert parsed.invoked is None
+
+
+def test_arrow_must_join_steps():
+    parsed = scan("see >>a --> and >>b")
+    assert parsed.steps == []
+    assert parsed.invoked is None
+
+
+def test_unspaced_arrow_ends_the_id():
+    parsed = scan(">>a-->>>b")
+    assert parsed.invoked == "a"
+    assert parsed.steps == ["a", "b"]
+    assert scan(">>my-prompt --> >>next-one").steps == ["my-prompt", "next-one"]
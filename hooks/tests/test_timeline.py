@@ -0,0 +1,72 @@
+import json
+import os
+
+from gemini_lib import timeline, timeline_report
+
+
+def events(session: str = "s1") -> list[dict]:
+    return timeline_report.load_events(timeline.timeline_path(session))
+
+
+def test_record_leaves_out_empty_fields():
+    timeline.record("s1", "verdict", c="c#1", v="PASS", r="", x=None)
+    timeline.record_step("s1", {"chain_id": "c#1", "current_step": 2, "total_steps": 3,
+                                "chain_prompts": ["a", "b", "c"], "pending_gate": None})
+    timeline.record_step("s1", {"current_step": 0})
+    timeline.record(None, "step", c="c#1")
+    recorded = events()
+    assert [{k: v for k, v in e.items() if k != "t"} for e in recorded] == [
+        {"e": "verdict", "c": "c#1", "v": "PASS"},
+        {"e": "step", "c": "c#1", "s": 2, "n": 3, "p": "b"},
+    ]
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_TIMELINE", "0")
+    timeline.record("s1", "end", c="c#1")
+    assert events() == []
+
+
+def test_long_timeline_is_cut_to_its_newest_half(monkeypatch):
+    monkeypatch.setattr(timeline, "MAX_BYTES", 2000)
+    for n in range(100):
+        timeline.record("s1", "step", c="c#1", s=n)
+    recorded = events()
+    assert recorded[-1]["s"] == 99
+    assert 0 < len(recorded) < 50
+    assert [e["s"] for e in recorded] == list(range(100 - len(recorded), 100))
+
+
+def test_step_runs_charge_events_to_their_step():
+    session = [
+        {"t": 0, "e": "step", "c": "c#1", "s": 1, "n": 2, "p": "analyze"},
+        {"t": 1, "e": "step", "c": "c#2", "s": 1, "n": 1},
+        {"t": 2, "e": "verdict", "c": "c#1", "v": "FAIL"},
+        {"t": 3, "e": "deny", "c": "c#1"},
+        {"t": 4, "e": "step", "c": "c#1", "s": 1, "n": 2, "p": "analyze"},
+        {"t": 5, "e": "verdict", "v": "PASS"},  # no chain id: the step seen last
+        {"t": 6, "e": "step", "c": "c#1", "s": 2, "n": 2, "p": "review"},
+        {"t": 7, "e": "compact", "c": "c#1"},
+        {"t": 10, "e": "end", "c": "c#1"},
+    ]
+    analyze, other, review = timeline_report.step_runs(session)
+    assert (analyze["start"], analyze["end"], analyze["renders"]) == (0, 6, 1)
+    assert (analyze["pass"], analyze["fail"], analyze["denies"]) == (1, 1, 1)
+    assert other["prompt"] == "c step 1" and other["end"] is None
+    assert (review["end"], review["compactions"], review["last"]) == (10, 1, True)
+
+    chains = dict(timeline_report.by_chain([analyze, other, review]))
+    assert chains["c"]["runs"] == 2 and chains["c"]["durations"] == [10]
+    assert chains["c"]["retries"] == 2
+    prompts = dict(timeline_report.by_prompt([analyze, other, review]))
+    assert prompts["analyze"]["durations"] == [6] and prompts["analyze"]["retries"] == 2
+
+
+def test_load_skips_a_trimmed_first_line():
+    path = timeline.timeline_path("s1")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write('1,"e":"step"}\n' + json.dumps({"t": 5, "e": "end", "c": "c#1"}) + "\n")
+    assert events() == [{"t": 5, "e": "end", "c": "c#1"}]
+    assert timeline_report.load_events(path, since=6) == []
+    assert list(timeline_report.load_sessions("s1")) == [os.path.basename(path)]
@@ -0,0 +1,42 @@
+import pytest
+
+from gemini_lib import validate
+
+
+@pytest.fixture
+def methodologies(workspace, monkeypatch):
+    resources = workspace / "server-resources"
+    monkeypatch.setenv("MCP_RESOURCES_PATH", str(resources))
+    for directory, body in (("cageerf", "id: cageerf\nmethodology: CAGEERF\n"),
+                            ("react", "id: react\nmethodology: 'ReACT'\n"),
+                            ("notes", None)):
+        path = resources / "methodologies" / directory
+        path.mkdir(parents=True)
+        if body:
+            (path / "methodology.yaml").write_text(body)
+    return resources
+
+
+def test_frameworks_come_from_the_server_definitions(methodologies, workspace):
+    custom = workspace / "resources" / "methodologies" / "triz"
+    custom.mkdir(parents=True)
+    (custom / "methodology.yml").write_text("methodology: TRIZ\n")
+    assert validate.server_frameworks() == ["CAGEERF", "cageerf", "ReACT", "react", "TRIZ", "triz"]
+
+
+def test_check_frameworks(methodologies, monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_FRAMEWORKS", "Custom")
+    assert validate.check_frameworks(["cageerf", "REACT", "custom"]) == {}
+    assert validate.check_frameworks(["CAGERF", "nothing-like-it"]) == {"CAGERF": "CAGEERF",
+                                                                       "nothing-like-it": None}
+
+
+def test_no_definitions_skips_the_check(workspace, monkeypatch):
+    monkeypatch.setenv("MCP_RESOURCES_PATH", str(workspace / "missing"))
+    monkeypatch.setenv("GEMINI_HOOK_FRAMEWORKS", "Custom")
+    assert validate.known_frameworks() == []
+    assert validate.check_frameworks(["SCAMPER", "typo"]) == {}
+
+
+def test_neighbours():
+    assert validate._neighbours(["summary", "sumary", "review"], "sumary") == {"summary", "review"}
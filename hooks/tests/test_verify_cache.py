@@ -0,0 +1,106 @@
+import os
+import subprocess
+
+import pytest
+
+from gemini_lib import verify_cache
+
+# Looks like verification ("test"); counts its runs in a file outside the tree
+COMMAND = "echo testing && echo run >> ../runs"
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                   check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(workspace):
+    path = workspace / "repo"
+    path.mkdir()
+    git(path, "init", "-q")
+    (path / "app.py").write_text("x = 1\n")
+    git(path, "add", "app.py")
+    git(path, "commit", "-qm", "init")
+    return path
+
+
+def run(repo, session="ralph-1"):
+    return verify_cache.cached_run(session, COMMAND, shell=True, capture_output=True, cwd=str(repo))
+
+
+def runs(repo) -> int:
+    try:
+        return (repo.parent / "runs").read_text().count("run")
+    except OSError:
+        return 0
+
+
+def test_unchanged_tree_reuses_the_verdict(repo):
+    first = run(repo)
+    second = run(repo)
+    assert first.stdout == second.stdout == b"testing\n"
+    assert second.returncode == 0
+    assert runs(repo) == 1
+
+
+def test_any_edit_invalidates(repo):
+    run(repo)
+    (repo / "app.py").write_text("x = 2\n")
+    run(repo)
+    (repo / "new.py").write_text("y = 1\n")
+    run(repo)
+    assert runs(repo) == 3
+
+
+def test_workspace_fingerprint_sees_untracked_files(repo):
+    before = verify_cache.workspace_fingerprint(COMMAND, str(repo), {})
+    (repo / "new.py").write_text("y = 1\n")
+    assert verify_cache.workspace_fingerprint(COMMAND, str(repo), {}) != before
+    assert verify_cache.workspace_fingerprint(COMMAND, str(repo.parent), {}) is None
+
+
+def test_outside_git_only_fail_verdicts_are_cached(workspace):
+    tree = workspace / "tree"
+    tree.mkdir()
+    (tree / "app.py").write_text("x = 1\n")
+    verify_cache.add_files("ralph-1", ["app.py"])
+    run(tree)
+    run(tree)
+    assert runs(tree) == 2  # PASS: never reused
+
+    failing = "test -e missing.txt; echo run >> ../runs; exit 1"
+    for _ in range(2):
+        result = verify_cache.cached_run("ralph-1", failing, shell=True, capture_output=True, cwd=str(tree))
+        assert result.returncode == 1
+    assert runs(tree) == 3
+
+
+def test_disabled(repo, monkeypatch):
+    monkeypatch.setenv("GEMINI_HOOK_VERIFY_CACHE", "0")
+    run(repo)
+    run(repo)
+    assert runs(repo) == 2
+
+
+def test_other_commands_go_straight_through(repo, monkeypatch):
+    monkeypatch.setattr(verify_cache, "_load", lambda: pytest.fail("cache consulted"))
+    assert verify_cache.cached_run(None, ["echo", "hi"], capture_output=True).stdout == b"hi\n"
+    assert not verify_cache.is_verification("echo test", {"shell": True})  # output not captured
+
+
+def test_text_mode_and_check(repo):
+    run(repo)
+    hit = verify_cache.cached_run("ralph-1", COMMAND, shell=True, capture_output=True, text=True,
+                                  cwd=str(repo))
+    assert hit.stdout == "testing\n"
+    with pytest.raises(subprocess.CalledProcessError):
+        verify_cache.cached_run("ralph-1", "echo test; exit 3", shell=True, capture_output=True,
+                                check=True, cwd=str(repo))
+
+
+def test_tracked_files(workspace):
+    verify_cache.add_files("ralph-1", ["a.py", "b.py", "a.py"])
+    verify_cache.add_files("ralph-1", ["b.py", "c.py"])
+    assert verify_cache.tracked_files("ralph-1") == ["a.py", "b.py", "c.py"]
+    assert os.path.basename(verify_cache._files_path("ralph-1")) == "ralph-1"